@@ -0,0 +1,54 @@
+"""add session list indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行，避免建索引期间锁表
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sessions_created_at_id', 'sessions', ['created_at', 'id'],
+            postgresql_include=['status', 'video_url', 'language', 'updated_at'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_sessions_status_created_at_id', 'sessions', ['status', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_sessions_video_url_created_at_id', 'sessions', ['video_url', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_sessions_active_created_at_id', 'sessions', ['created_at', 'id'],
+            postgresql_where=sa.text("status IN ('created', 'processing')"),
+            postgresql_concurrently=True,
+        )
+        
+        # 单列索引已被上面的复合索引前缀覆盖
+        op.drop_index('ix_sessions_created_at', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_status', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_video_url', table_name='sessions', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_sessions_video_url', 'sessions', ['video_url'], postgresql_concurrently=True)
+        op.create_index('ix_sessions_status', 'sessions', ['status'], postgresql_concurrently=True)
+        op.create_index('ix_sessions_created_at', 'sessions', ['created_at'], postgresql_concurrently=True)
+        
+        op.drop_index('ix_sessions_active_created_at_id', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_video_url_created_at_id', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_status_created_at_id', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_created_at_id', table_name='sessions', postgresql_concurrently=True)
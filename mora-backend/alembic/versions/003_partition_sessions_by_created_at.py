@@ -0,0 +1,111 @@
+"""partition sessions by created_at
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import date, datetime, timezone
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# 迁移时预先创建的未来月份分区数，之后由 manage_partitions.py 维护
+PREMAKE_MONTHS = 3
+
+COLUMNS_DDL = """
+    id UUID NOT NULL,
+    video_url TEXT NOT NULL,
+    language VARCHAR(20) DEFAULT 'python',
+    status sessionstatus NOT NULL DEFAULT 'created',
+    video_info JSONB,
+    subtitles JSONB,
+    timeline JSONB,
+    generated_code TEXT,
+    error_message TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+"""
+
+INDEX_NAMES = [
+    'ix_sessions_created_at_id',
+    'ix_sessions_status_created_at_id',
+    'ix_sessions_video_url_created_at_id',
+    'ix_sessions_active_created_at_id',
+]
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_list_indexes() -> None:
+    op.create_index(
+        'ix_sessions_created_at_id', 'sessions', ['created_at', 'id'],
+        postgresql_include=['status', 'video_url', 'language', 'updated_at'],
+    )
+    op.create_index('ix_sessions_status_created_at_id', 'sessions', ['status', 'created_at', 'id'])
+    op.create_index('ix_sessions_video_url_created_at_id', 'sessions', ['video_url', 'created_at', 'id'])
+    op.create_index(
+        'ix_sessions_active_created_at_id', 'sessions', ['created_at', 'id'],
+        postgresql_where=sa.text("status IN ('created', 'processing')"),
+    )
+
+
+def _rename_old_table(suffix: str) -> None:
+    op.execute(f"ALTER TABLE sessions RENAME TO sessions_{suffix}")
+    op.execute(f"ALTER TABLE sessions_{suffix} RENAME CONSTRAINT sessions_pkey TO sessions_{suffix}_pkey")
+    for name in INDEX_NAMES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_{suffix}")
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    _rename_old_table('unpartitioned')
+
+    # 分区表的主键必须包含分区键
+    op.execute(f"""
+        CREATE TABLE sessions ({COLUMNS_DDL},
+            CONSTRAINT sessions_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    # 从已有数据的最早月份一直创建到未来 PREMAKE_MONTHS 个月
+    oldest = conn.execute(sa.text("SELECT MIN(created_at) FROM sessions_unpartitioned")).scalar()
+    # created_at 按UTC写入，当前月份也按UTC计算
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else current
+    last = _add_months(current, PREMAKE_MONTHS)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE sessions_p{month:%Y%m} PARTITION OF sessions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute("INSERT INTO sessions SELECT * FROM sessions_unpartitioned")
+    op.execute("DROP TABLE sessions_unpartitioned")
+
+    # 在分区表上建索引会自动级联到每个分区
+    _create_list_indexes()
+
+
+def downgrade() -> None:
+    _rename_old_table('partitioned')
+
+    op.execute(f"""
+        CREATE TABLE sessions ({COLUMNS_DDL},
+            CONSTRAINT sessions_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("INSERT INTO sessions SELECT * FROM sessions_partitioned")
+    op.execute("DROP TABLE sessions_partitioned CASCADE")
+
+    _create_list_indexes()
@@ -0,0 +1,24 @@
+"""add result_session_id for result reuse
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 可空列且无默认值，只修改目录信息，不重写表
+    op.add_column('sessions', sa.Column('result_session_id', UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sessions', 'result_session_id')
@@ -0,0 +1,115 @@
+"""add canonical video_key
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import re
+from urllib.parse import parse_qs, urlsplit
+from alembic import op
+import sqlalchemy as sa
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# 迁移编写时 app/services/video_processor.py 的URL识别规则的固定副本：
+# 回填结果只取决于本迁移，之后修改应用中的平台注册表不会改变重放迁移得到的video_key
+VIDEO_URL_PATTERN = re.compile(
+    r'^(?:https?://)?(?:'
+    r'(?P<youtube>(?:(?:www\.|m\.|music\.)?youtube\.com/'
+    r'(?:watch\?(?:[^#]*?&)?v=(?P<youtube_a>[\w-]{11})|(?:shorts|embed|live|v)/(?P<youtube_b>[\w-]{11}))'
+    r'|youtu\.be/(?P<youtube_c>[\w-]{11}))(?![\w-]))'
+    r'|(?P<bilibili>(?:www\.|m\.)?bilibili\.com/'
+    r'(?:video/(?P<bilibili_a>BV[0-9A-Za-z]{10}|av\d+)|bangumi/play/(?P<bilibili_b>(?:ep|ss)\d+))(?![0-9A-Za-z]))'
+    r'|(?P<tiktok>(?:(?:www\.|m\.)?tiktok\.com/(?:@[\w.-]+/video/(?P<tiktok_a>\d+)|t/(?P<tiktok_b>[\w-]+))'
+    r'|vm\.tiktok\.com/(?P<tiktok_c>[\w-]+))(?![\w-]))'
+    r')',
+    re.IGNORECASE
+)
+
+
+def _video_key(url: str) -> str:
+    """视频的规范key（platform:video_id[:pN]）；无法识别时退回原始URL"""
+    match = VIDEO_URL_PATTERN.match(url.strip())
+    if not match:
+        return url
+    platform = match.lastgroup
+    video_id = next(
+        value for name, value in match.groupdict().items()
+        if value and name.startswith(f"{platform}_")
+    )
+    if platform == "bilibili" and video_id.startswith(("BV", "av")):
+        values = parse_qs(urlsplit(url.strip()).query).get("p", [])
+        part = int(values[0]) if values and values[0].isdigit() and int(values[0]) > 0 else 1
+        return f"{platform}:{video_id}:p{part}"
+    return f"{platform}:{video_id}"
+
+
+def _partitions(conn) -> list:
+    return conn.execute(sa.text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'sessions'
+        ORDER BY child.relname
+    """)).scalars().all()
+
+
+def _create_partitioned_index(name: str, columns: str) -> None:
+    """
+    分区表不支持 CREATE INDEX CONCURRENTLY：先在父表上建无效的 ON ONLY 索引，
+    再逐个分区并发建索引并挂载，全部挂载后父表索引自动变为有效
+    """
+    conn = op.get_bind()
+    suffix = name.replace('ix_sessions_', '')
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY sessions ({columns})")
+    with op.get_context().autocommit_block():
+        for partition in _partitions(conn):
+            child = f"{partition}_{suffix}"
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({columns})")
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def _backfill_video_keys() -> None:
+    """按 (created_at, id) 分批回填，每批单独提交，避免长事务"""
+    conn = op.get_bind()
+    last = None
+    with op.get_context().autocommit_block():
+        while True:
+            query = "SELECT id, created_at, video_url FROM sessions WHERE video_key IS NULL"
+            params = {"limit": BACKFILL_BATCH_SIZE}
+            if last:
+                query += " AND (created_at, id) > (:created_at, :id)"
+                params.update(created_at=last[0], id=last[1])
+            query += " ORDER BY created_at, id LIMIT :limit"
+            rows = conn.execute(sa.text(query), params).all()
+            if not rows:
+                break
+
+            conn.execute(
+                sa.text("UPDATE sessions SET video_key = :video_key WHERE id = :id AND created_at = :created_at"),
+                [
+                    {"video_key": _video_key(row.video_url), "id": row.id, "created_at": row.created_at}
+                    for row in rows
+                ]
+            )
+            last = (rows[-1].created_at, rows[-1].id)
+
+
+def upgrade() -> None:
+    op.add_column('sessions', sa.Column('video_key', sa.Text(), nullable=True))
+    _backfill_video_keys()
+    _create_partitioned_index('ix_sessions_video_key_created_at_id', 'video_key, created_at, id')
+    op.drop_index('ix_sessions_video_url_created_at_id', table_name='sessions')
+
+
+def downgrade() -> None:
+    _create_partitioned_index('ix_sessions_video_url_created_at_id', 'video_url, created_at, id')
+    op.drop_index('ix_sessions_video_key_created_at_id', table_name='sessions')
+    op.drop_column('sessions', 'video_key')
@@ -0,0 +1,125 @@
+"""store subtitles as a compact binary track
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from alembic import op
+import sqlalchemy as sa
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# 迁移编写时 app/utils/subtitle_track.py 的第1版轨道格式的固定副本，
+# 之后应用升级格式或修改 SubtitleTrack 不影响重放本迁移：
+# MAGIC + 版本 + 条数，之后是zlib压缩的 开始时间(ms) + 结束时间(ms) + 每条文本的字符数 + UTF-8文本
+MAGIC = b"STRK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBI")
+COMPRESS_LEVEL = 6
+
+
+def _pack(values) -> bytes:
+    values = array("I", values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(data: bytes) -> array:
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_track(subtitles: list) -> bytes:
+    ordered = sorted(subtitles, key=lambda sub: sub.get("startTime", 0))
+    texts = [sub.get("text") or "" for sub in ordered]
+    body = b"".join((
+        _pack(max(0, round(sub.get("startTime", 0) * 1000)) for sub in ordered),
+        _pack(max(0, round(sub.get("endTime", 0) * 1000)) for sub in ordered),
+        _pack(len(text) for text in texts),
+        "".join(texts).encode("utf-8"),
+    ))
+    return HEADER.pack(MAGIC, FORMAT_VERSION, len(ordered)) + zlib.compress(body, COMPRESS_LEVEL)
+
+
+def _decode_track(data: bytes) -> list:
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported subtitle track {magic!r} v{version}")
+    body = zlib.decompress(data[HEADER.size:])
+    width = count * 4
+    starts = _unpack(body[:width])
+    ends = _unpack(body[width:2 * width])
+    lengths = _unpack(body[2 * width:3 * width])
+    text = body[3 * width:].decode("utf-8")
+    subtitles = []
+    position = 0
+    for start, end, length in zip(starts, ends, lengths):
+        subtitles.append({"startTime": start / 1000, "endTime": end / 1000, "text": text[position:position + length]})
+        position += length
+    return subtitles
+
+
+def _convert(where: str, convert) -> None:
+    """按 (created_at, id) 分批转换字幕列，每批单独提交，避免长事务"""
+    conn = op.get_bind()
+    last = None
+    with op.get_context().autocommit_block():
+        while True:
+            query = f"SELECT id, created_at, subtitles, subtitle_track FROM sessions WHERE {where}"
+            params = {"limit": BATCH_SIZE}
+            if last:
+                query += " AND (created_at, id) > (:created_at, :id)"
+                params.update(created_at=last[0], id=last[1])
+            query += " ORDER BY created_at, id LIMIT :limit"
+            rows = conn.execute(sa.text(query), params).all()
+            if not rows:
+                break
+
+            conn.execute(
+                sa.text(
+                    "UPDATE sessions SET subtitles = CAST(:subtitles AS JSONB), subtitle_track = :subtitle_track "
+                    "WHERE id = :id AND created_at = :created_at"
+                ),
+                [{**convert(row), "id": row.id, "created_at": row.created_at} for row in rows]
+            )
+            last = (rows[-1].created_at, rows[-1].id)
+
+
+def _to_track(row) -> dict:
+    metadata = {key: value for key, value in row.subtitles.items() if key != "subtitles"}
+    return {
+        "subtitles": json.dumps(metadata, ensure_ascii=False),
+        "subtitle_track": _encode_track(row.subtitles.get("subtitles") or [])
+    }
+
+
+def _to_list(row) -> dict:
+    subtitle_data = dict(row.subtitles or {})
+    subtitle_data["subtitles"] = _decode_track(bytes(row.subtitle_track))
+    return {"subtitles": json.dumps(subtitle_data, ensure_ascii=False), "subtitle_track": None}
+
+
+def upgrade() -> None:
+    # 可空列且无默认值，只修改目录信息；已有行的字幕列表分批转换为轨道
+    op.add_column('sessions', sa.Column('subtitle_track', sa.LargeBinary(), nullable=True))
+    _convert("subtitle_track IS NULL AND subtitles ? 'subtitles'", _to_track)
+
+
+def downgrade() -> None:
+    _convert("subtitle_track IS NOT NULL", _to_list)
+    op.drop_column('sessions', 'subtitle_track')
@@ -0,0 +1,147 @@
+"""full-text search over transcripts and generated code
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import struct
+import sys
+import zlib
+from array import array
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# 第1版字幕轨道格式（见迁移006）的固定副本，回填只需要每条文本：
+# MAGIC + 版本 + 条数，之后是zlib压缩的 开始时间 + 结束时间 + 每条文本的字符数（各4字节/条） + UTF-8文本
+TRACK_MAGIC = b"STRK"
+TRACK_VERSION = 1
+TRACK_HEADER = struct.Struct("<4sBI")
+
+# 与 app/models/session.py 中 search_vector 的 Computed 表达式一致
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', mora_search_terms(coalesce(transcript, ''))), 'A') || "
+    "setweight(to_tsvector('simple', mora_search_terms(coalesce(generated_code, ''))), 'B')"
+)
+
+# 'simple' 配置不切分中日韩文本，整段连续汉字会成为一个词。
+# 把每段连续的CJK字符拆成重叠的二元组（"装饰器" -> "装饰 饰器"），查询做同样处理，
+# 不依赖zhparser等扩展也能按词检索；其它文本保持原样交给 'simple' 解析。
+# generated_code 中是字面的 "\\n" 转义（代码段列表的repr），先换成空格，否则会粘连成 "ndef" 之类的词
+CJK_RUN = "[\\u3040-\\u30ff\\u3400-\\u4dbf\\u4e00-\\u9fff\\uac00-\\ud7af]+"
+ESCAPE_SEQUENCE = "\\\\[ntr]"
+SEARCH_TERMS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION mora_search_terms(input text) RETURNS text
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT regexp_replace(source.cleaned, '{CJK_RUN}', ' ', 'g') || ' ' || coalesce((
+        SELECT string_agg(
+            CASE WHEN char_length(runs.run) = 1 THEN runs.run ELSE substr(runs.run, pos, 2) END, ' '
+        )
+        FROM (SELECT (regexp_matches(source.cleaned, '{CJK_RUN}', 'g'))[1] AS run) AS runs,
+             generate_series(1, greatest(char_length(runs.run) - 1, 1)) AS pos
+    ), '')
+    FROM (SELECT regexp_replace(input, '{ESCAPE_SEQUENCE}', ' ', 'g') AS cleaned) AS source
+$$
+"""
+
+
+def _partitions(conn) -> list:
+    return conn.execute(sa.text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'sessions'
+        ORDER BY child.relname
+    """)).scalars().all()
+
+
+def _create_partitioned_gin_index(name: str, column: str) -> None:
+    """
+    分区表不支持 CREATE INDEX CONCURRENTLY：先在父表上建无效的 ON ONLY 索引，
+    再逐个分区并发建索引并挂载，全部挂载后父表索引自动变为有效
+    """
+    conn = op.get_bind()
+    suffix = name.replace('ix_sessions_', '')
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY sessions USING gin ({column})")
+    with op.get_context().autocommit_block():
+        for partition in _partitions(conn):
+            child = f"{partition}_{suffix}"
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} USING gin ({column})")
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def _track_transcript(data: bytes) -> str:
+    """由二进制轨道得到每条一行的纯文本（与 SubtitleTrack.plain_text 相同）"""
+    magic, version, count = TRACK_HEADER.unpack_from(data)
+    if magic != TRACK_MAGIC or version != TRACK_VERSION:
+        raise ValueError(f"Unsupported subtitle track {magic!r} v{version}")
+    body = zlib.decompress(data[TRACK_HEADER.size:])
+    width = count * 4
+    lengths = array("I")
+    lengths.frombytes(body[2 * width:3 * width])
+    if sys.byteorder == "big":
+        lengths.byteswap()
+    text = body[3 * width:].decode("utf-8")
+    lines = []
+    position = 0
+    for length in lengths:
+        lines.append(text[position:position + length])
+        position += length
+    return "\n".join(lines)
+
+
+def _backfill_transcripts() -> None:
+    """由 subtitle_track 解出纯文本字幕，按 (created_at, id) 分批回填，每批单独提交"""
+    conn = op.get_bind()
+    last = None
+    with op.get_context().autocommit_block():
+        while True:
+            query = "SELECT id, created_at, subtitle_track FROM sessions WHERE subtitle_track IS NOT NULL"
+            params = {"limit": BATCH_SIZE}
+            if last:
+                query += " AND (created_at, id) > (:created_at, :id)"
+                params.update(created_at=last[0], id=last[1])
+            query += " ORDER BY created_at, id LIMIT :limit"
+            rows = conn.execute(sa.text(query), params).all()
+            if not rows:
+                break
+
+            conn.execute(
+                sa.text("UPDATE sessions SET transcript = :transcript WHERE id = :id AND created_at = :created_at"),
+                [
+                    {
+                        "transcript": _track_transcript(bytes(row.subtitle_track)),
+                        "id": row.id,
+                        "created_at": row.created_at
+                    }
+                    for row in rows
+                ]
+            )
+            last = (rows[-1].created_at, rows[-1].id)
+
+
+def upgrade() -> None:
+    op.execute(SEARCH_TERMS_FUNCTION)
+    op.add_column('sessions', sa.Column('transcript', sa.Text(), nullable=True))
+    # STORED生成列会重写表（各分区依次加锁），应在低峰期执行；之后的写入由数据库自动维护
+    op.add_column('sessions', sa.Column(
+        'search_vector', TSVECTOR(), sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)
+    ))
+    _backfill_transcripts()
+    _create_partitioned_gin_index('ix_sessions_search_vector', 'search_vector')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_search_vector', table_name='sessions')
+    op.drop_column('sessions', 'search_vector')
+    op.drop_column('sessions', 'transcript')
+    op.execute("DROP FUNCTION IF EXISTS mora_search_terms(text)")
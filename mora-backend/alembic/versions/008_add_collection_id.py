@@ -0,0 +1,52 @@
+"""group multi-part imports into collections
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def _partitions(conn) -> list:
+    return conn.execute(sa.text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'sessions'
+        ORDER BY child.relname
+    """)).scalars().all()
+
+
+def _create_partitioned_index(name: str, columns: str) -> None:
+    """
+    分区表不支持 CREATE INDEX CONCURRENTLY：先在父表上建无效的 ON ONLY 索引，
+    再逐个分区并发建索引并挂载，全部挂载后父表索引自动变为有效
+    """
+    conn = op.get_bind()
+    suffix = name.replace('ix_sessions_', '')
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY sessions ({columns})")
+    with op.get_context().autocommit_block():
+        for partition in _partitions(conn):
+            child = f"{partition}_{suffix}"
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({columns})")
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def upgrade() -> None:
+    # 可空列且无默认值，只修改目录信息；已有会话不属于任何合集，无需回填
+    op.add_column('sessions', sa.Column('collection_id', UUID(as_uuid=True), nullable=True))
+    _create_partitioned_index('ix_sessions_collection_id', 'collection_id')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_collection_id', table_name='sessions')
+    op.drop_column('sessions', 'collection_id')
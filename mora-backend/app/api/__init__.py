@@ -1,3 +1,3 @@
-from app.api import session, stream
+from app.api import session, stream, cache, search, collection
 
-__all__ = ["session", "stream"]
+__all__ = ["session", "stream", "cache", "search", "collection"]
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.utils.cache import Cache
+from app.services.negative_cache import NegativeCacheStats
+
+router = APIRouter()
+
+
+@router.get(
+    "/cache/stats",
+    summary="缓存统计",
+    description="查看本worker各级缓存的命中率和内存占用"
+)
+async def cache_stats():
+    """缓存统计"""
+    return {**Cache.stats(), "negative": NegativeCacheStats.snapshot()}
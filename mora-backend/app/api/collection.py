@@ -0,0 +1,255 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app import schemas, models
+from app.database import get_db
+from app.services.video_processor import VideoProcessor, VideoIdentity
+from app.services.session_cache import session_cache
+from app.services.negative_cache import negative_cache
+from app.services.collection_ingester import collection_ingester, PartListError
+from app.config import get_settings
+from app.utils.errors import ErrorCode, get_error_message
+from typing import Any, Dict, List, Optional
+import uuid
+from datetime import datetime
+
+router = APIRouter()
+settings = get_settings()
+
+
+def _series_url(identity: VideoIdentity) -> str:
+    """合集URL：第1P的规范URL"""
+    return VideoIdentity(identity.platform, identity.video_id, 1).canonical_url
+
+
+def _build_response(collection_id: uuid.UUID, series_url: str, rows: List[Any],
+                    rejected: Optional[List[schemas.RejectedVideoUrl]] = None) -> schemas.CollectionResponse:
+    """由同一合集的会话行汇总进度，分P按分P号排序"""
+    parts = []
+    for row in rows:
+        identity = VideoProcessor.identify(row.video_url)
+        parts.append(schemas.CollectionPart(
+            part=identity.part if identity and identity.part else 1,
+            sessionId=str(row.id),
+            videoUrl=row.video_url,
+            title=(row.video_info or {}).get("title"),
+            status=row.status.value,
+            hasSubtitles=bool(row.has_subtitles),
+            error=row.error_message
+        ))
+    parts.sort(key=lambda part: part.part)
+
+    return schemas.CollectionResponse(
+        collectionId=str(collection_id),
+        seriesUrl=series_url,
+        createdAt=min(row.created_at for row in rows) if rows else datetime.utcnow(),
+        progress=schemas.CollectionProgress(
+            total=len(parts),
+            subtitlesReady=sum(1 for part in parts if part.hasSubtitles),
+            processing=sum(1 for part in parts if part.status == schemas.SessionStatus.processing),
+            completed=sum(1 for part in parts if part.status == schemas.SessionStatus.completed),
+            failed=sum(1 for part in parts if part.status == schemas.SessionStatus.error)
+        ),
+        parts=parts,
+        rejected=rejected or []
+    )
+
+
+@router.post(
+    "/collections",
+    response_model=schemas.CollectionResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="导入B站多P合集",
+    description="提交多P视频URL（可指定分P号），每P创建一个会话，后台并发提取所有分P的字幕"
+)
+async def create_collection(
+    request: schemas.CreateCollectionRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    导入合集
+
+    会话用单条多行INSERT创建；字幕提取在响应返回后于后台并发进行，
+    通过 GET /api/collections/{collection_id} 查询汇总进度。
+    所有分P都命中负缓存时返回422（detail.rejected 列出各分P的原因），不创建合集。
+    """
+    identity = VideoProcessor.identify(request.seriesUrl)
+    if not identity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": ErrorCode.INVALID_VIDEO_URL,
+                "message": get_error_message(ErrorCode.INVALID_VIDEO_URL)
+            }
+        )
+    # 只有B站普通视频（BV/av号）有分P
+    if identity.part is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": ErrorCode.UNSUPPORTED_PLATFORM,
+                "message": "Only multi-part Bilibili videos (BV/av) can be imported as a collection"
+            }
+        )
+
+    part_info: Dict[int, Dict[str, Any]] = {}
+    if request.parts:
+        pages = sorted(set(request.parts))
+        if pages[0] < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"error": "INVALID_PART", "message": "Part numbers start at 1"}
+            )
+    else:
+        try:
+            listed = await collection_ingester.get_parts(identity.video_id)
+        except PartListError as e:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail={"error": ErrorCode.PART_LIST_ERROR, "message": get_error_message(ErrorCode.PART_LIST_ERROR)}
+            )
+        part_info = {item["page"]: item for item in listed}
+        pages = sorted(part_info)
+
+    if len(pages) > settings.COLLECTION_MAX_PARTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "COLLECTION_TOO_LARGE",
+                "message": f"At most {settings.COLLECTION_MAX_PARTS} parts per collection"
+            }
+        )
+
+    collection_id = uuid.uuid4()
+    now = datetime.utcnow()
+    language = request.language or "python"
+    rows = []
+    for page in pages:
+        part = VideoIdentity(identity.platform, identity.video_id, page)
+        info = part_info.get(page)
+        rows.append({
+            "id": uuid.uuid4(),
+            "video_url": part.canonical_url,
+            "video_key": part.key,
+            "collection_id": collection_id,
+            "language": language,
+            "status": models.SessionStatus.CREATED,
+            # 分P标题先来自分P列表，字幕提取后由BibiGPT返回的信息覆盖
+            "video_info": {
+                "title": info["title"],
+                "duration": info["duration"],
+                "thumbnail": info["thumbnail"],
+                "author": None
+            } if info else None,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    # 一次往返查出已知没有字幕的分P
+    rejected = []
+    known_failures = await negative_cache.check_many([row["video_key"] for row in rows])
+    accepted = []
+    for row, known in zip(rows, known_failures):
+        if known:
+            rejected.append(schemas.RejectedVideoUrl(
+                videoUrl=row["video_url"],
+                error=known.code,
+                message=get_error_message(known.code)
+            ))
+        else:
+            accepted.append(row)
+    rows = accepted
+
+    # 全部分P都被拒绝时不创建会话，也不返回一个查询不到的 collectionId
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "COLLECTION_ALL_REJECTED",
+                "message": "All parts of this collection are known to have no usable subtitles",
+                "rejected": [item.model_dump() for item in rejected]
+            }
+        )
+
+    stmt = insert(models.Session).values(rows).returning(
+        models.Session.id,
+        models.Session.video_url,
+        models.Session.status,
+        models.Session.video_info,
+        models.Session.error_message,
+        models.Session.created_at,
+        models.Session.subtitle_track.isnot(None).label("has_subtitles")
+    )
+    try:
+        created = db.execute(stmt).all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "error": ErrorCode.DATABASE_ERROR,
+                "message": "Failed to create sessions"
+            }
+        )
+
+    await session_cache.put_many([
+        schemas.SessionDetailResponse(
+            sessionId=str(row.id),
+            videoUrl=row.video_url,
+            status=row.status.value,
+            videoInfo=schemas.VideoInfo(**row.video_info) if row.video_info else None,
+            createdAt=row.created_at,
+            updatedAt=now
+        )
+        for row in created
+    ])
+
+    background_tasks.add_task(
+        collection_ingester.ingest,
+        collection_id,
+        [(row.id, row.video_url) for row in created],
+        request.process
+    )
+
+    return _build_response(collection_id, _series_url(identity), created, rejected)
+
+
+@router.get(
+    "/collections/{collection_id}",
+    response_model=schemas.CollectionResponse,
+    summary="查询合集进度",
+    description="汇总合集内各分P会话的字幕提取和处理状态"
+)
+async def get_collection(
+    collection_id: str,
+    db: Session = Depends(get_db)
+):
+    """查询合集进度（只读取轻量字段）"""
+    try:
+        collection_uuid = uuid.UUID(collection_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "INVALID_COLLECTION_ID", "message": "Invalid collection ID format"}
+        )
+
+    rows = db.query(
+        models.Session.id,
+        models.Session.video_url,
+        models.Session.status,
+        models.Session.video_info,
+        models.Session.error_message,
+        models.Session.created_at,
+        models.Session.subtitle_track.isnot(None).label("has_subtitles")
+    ).filter(models.Session.collection_id == collection_uuid).all()
+
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "COLLECTION_NOT_FOUND", "message": "Collection not found"}
+        )
+
+    identity = VideoProcessor.identify(rows[0].video_url)
+    return _build_response(collection_uuid, _series_url(identity) if identity else rows[0].video_url, rows)
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app import schemas
+from app.database import get_db
+from app.services.session_search import session_search
+from typing import Optional
+import base64
+import json
+import uuid
+from datetime import datetime
+
+router = APIRouter()
+
+
+def _encode_cursor(rank: float, created_at: datetime, session_id: uuid.UUID) -> str:
+    """将 (rank, created_at, id) 编码为不透明游标"""
+    raw = json.dumps({"r": rank, "c": created_at.isoformat(), "i": str(session_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, datetime, uuid.UUID]:
+    """解析游标，格式错误时抛出400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(raw["r"]), datetime.fromisoformat(raw["c"]), uuid.UUID(raw["i"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "INVALID_CURSOR", "message": "Invalid pagination cursor"}
+        )
+
+
+@router.get(
+    "/search",
+    response_model=schemas.SearchResponse,
+    summary="全文检索",
+    description="在所有会话的字幕和生成代码中检索主题（如 f-string、装饰器），按相关度排序，返回带时间点的片段"
+)
+async def search_sessions(
+    q: str = Query(..., min_length=1, max_length=200, description="检索词，支持 \"短语\"、or、-排除"),
+    language: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    全文检索
+
+    使用 search_vector 上的GIN索引匹配，字幕命中排在只有代码命中的结果之前；
+    按 (rank, created_at, id) 游标翻页。
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    items, has_more = session_search.search(db, q, language=language, after=after, limit=limit)
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = _encode_cursor(last["rank"], last["createdAt"], uuid.UUID(last["sessionId"]))
+
+    return schemas.SearchResponse(
+        query=q,
+        terms=session_search.query_terms(q),
+        items=[schemas.SearchResult(**item) for item in items],
+        nextCursor=next_cursor,
+        hasMore=has_more
+    )
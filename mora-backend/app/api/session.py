@@ -1,16 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, UploadFile, status
+from sqlalchemy import insert, tuple_
 from sqlalchemy.orm import Session
 from app import schemas, models
 from app.database import get_db
 from app.services.video_processor import VideoProcessor
+from app.services.session_cache import session_cache
+from app.services.session_pipeline import session_pipeline
+from app.services.result_reuse import result_reuse
+from app.services.negative_cache import negative_cache, NegativeEntry
+from app.services.subtitle_prefetcher import subtitle_prefetcher
+from app.services.subtitle_importer import subtitle_importer, SubtitleImportError
 from app.config import get_settings
 from app.utils.errors import ErrorCode, get_error_message
+from app.utils.subtitle_track import SubtitleTrack, from_columns, split_columns
+from typing import List, Optional
+import base64
+import json
 import uuid
 from datetime import datetime
 
 router = APIRouter()
 settings = get_settings()
 
+# 列表查询只读取轻量字段，避免加载JSONB大字段
+SESSION_SUMMARY_COLUMNS = (
+    models.Session.id,
+    models.Session.video_url,
+    models.Session.language,
+    models.Session.status,
+    models.Session.created_at,
+    models.Session.updated_at,
+)
+
+
+def _encode_cursor(created_at: datetime, session_id: uuid.UUID) -> str:
+    """将 (created_at, id) 编码为不透明游标"""
+    raw = json.dumps({"c": created_at.isoformat(), "i": str(session_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """解析游标，格式错误时抛出400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(raw["c"]), uuid.UUID(raw["i"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "INVALID_CURSOR", "message": "Invalid pagination cursor"}
+        )
+
+
+def _known_failure_error(known: NegativeEntry) -> HTTPException:
+    """负缓存命中：永久失败返回422，暂时失败返回503并提示重试时间"""
+    if known.permanent:
+        return HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": known.code, "message": get_error_message(known.code)}
+        )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={"error": known.code, "message": get_error_message(known.code)},
+        headers={"Retry-After": str(known.retry_after)} if known.retry_after else None
+    )
+
+
 @router.post(
     "/session",
     response_model=schemas.SessionResponse,
@@ -24,7 +79,9 @@ async def create_session(
 ):
     """创建视频处理会话"""
     video_url = str(request.videoUrl)
-    if not VideoProcessor.is_valid_url(video_url):
+    # 一次匹配同时完成校验、平台识别和规范化
+    identity = VideoProcessor.identify(video_url)
+    if not identity:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
@@ -33,21 +90,124 @@ async def create_session(
             }
         )
     
-    platform = VideoProcessor.get_platform(video_url)
-    if not platform:
+    session = models.Session(
+        id=uuid.uuid4(),
+        video_url=video_url,
+        video_key=identity.key,
+        language=request.language or "python",
+        status=models.SessionStatus.CREATED,
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow()
+    )
+    
+    # 同一视频已有完成结果时直接复用，新会话立即完成
+    source = None
+    if settings.ENABLE_RESULT_REUSE and not request.forceRegenerate:
+        source = result_reuse.find_source(db, identity.key, session.language)
+    
+    if source:
+        result_reuse.link(session, source)
+    else:
+        # 已知没有可用字幕的视频立即拒绝；强制重新生成时放行并重试
+        known = await negative_cache.check(identity.key)
+        if known and not request.forceRegenerate:
+            raise _known_failure_error(known)
+        if known:
+            await negative_cache.allow(identity.key)
+    
+    try:
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "error": ErrorCode.DATABASE_ERROR,
+                "message": "Failed to create session"
+            }
+        )
+    
+    await session_cache.put(session_cache.build_detail(session))
+    
+    # 客户端连接SSE之前就开始提取字幕，这段间隔不再白白浪费
+    if session.status == models.SessionStatus.CREATED:
+        subtitle_prefetcher.start(str(session.id), session.video_url)
+    
+    return schemas.SessionResponse(
+        sessionId=str(session.id),
+        videoUrl=session.video_url,
+        status=session.status.value,
+        createdAt=session.created_at,
+        reusedFrom=str(session.result_session_id) if session.result_session_id else None
+    )
+
+
+@router.post(
+    "/session/upload",
+    response_model=schemas.SessionResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="上传字幕创建会话",
+    description="上传SRT、WebVTT或BibiGPT格式的JSON字幕文件，跳过BibiGPT提取，会话直接从内容规划开始"
+)
+async def create_session_from_subtitles(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="字幕文件（.srt/.vtt/.json）"),
+    title: Optional[str] = Form(None),
+    video_url: Optional[str] = Form(None, alias="videoUrl"),
+    language: str = Form("python"),
+    process: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    """上传字幕创建会话"""
+    identity = None
+    if video_url:
+        identity = VideoProcessor.identify(video_url)
+        if not identity:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": ErrorCode.INVALID_VIDEO_URL,
+                    "message": get_error_message(ErrorCode.INVALID_VIDEO_URL)
+                }
+            )
+    
+    try:
+        subtitle_data, digest = await subtitle_importer.read(file, title)
+    except SubtitleImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            if e.code == ErrorCode.SUBTITLE_FILE_TOO_LARGE else status.HTTP_400_BAD_REQUEST,
+            detail={"error": e.code, "message": f"{get_error_message(e.code)}: {e}"}
+        )
+    
+    if not VideoProcessor.validate_duration(subtitle_data["duration"], settings.MAX_VIDEO_DURATION):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
-                "error": ErrorCode.UNSUPPORTED_PLATFORM,
-                "message": get_error_message(ErrorCode.UNSUPPORTED_PLATFORM)
+                "error": ErrorCode.VIDEO_TOO_LONG,
+                "message": get_error_message(ErrorCode.VIDEO_TOO_LONG)
             }
         )
     
+    subtitles, subtitle_track = split_columns(subtitle_data)
+    # 没有视频URL时用文件内容哈希作为身份，同一文件重复上传可以按 video_key 查到
     session = models.Session(
         id=uuid.uuid4(),
-        video_url=video_url,
-        language=request.language or "python",
+        video_url=video_url or f"upload://{digest}",
+        video_key=identity.key if identity else f"upload:{digest[:32]}",
+        language=language or "python",
         status=models.SessionStatus.CREATED,
+        subtitles=subtitles,
+        subtitle_track=subtitle_track,
+        transcript=SubtitleTrack.of(subtitle_data).plain_text(),
+        video_info={
+            "title": subtitle_data.get("title"),
+            "duration": subtitle_data.get("duration"),
+            "thumbnail": subtitle_data.get("thumbnail"),
+            "author": subtitle_data.get("author")
+        },
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
     )
@@ -66,6 +226,11 @@ async def create_session(
             }
         )
     
+    await session_cache.put(session_cache.build_detail(session))
+    
+    if process:
+        background_tasks.add_task(session_pipeline.run_in_background, session.id)
+    
     return schemas.SessionResponse(
         sessionId=str(session.id),
         videoUrl=session.video_url,
@@ -74,6 +239,198 @@ async def create_session(
     )
 
 
+@router.post(
+    "/sessions:batch",
+    response_model=schemas.BatchCreateSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="批量创建会话",
+    description="一次提交多个视频URL，批内去重后用单条多行INSERT创建会话"
+)
+async def create_sessions_batch(
+    request: schemas.BatchCreateSessionRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """批量创建视频处理会话"""
+    if len(request.videoUrls) > settings.BATCH_MAX_SESSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "BATCH_TOO_LARGE",
+                "message": f"At most {settings.BATCH_MAX_SESSIONS} video URLs per batch"
+            }
+        )
+    
+    seen = set()
+    duplicates = []
+    rejected = []
+    now = datetime.utcnow()
+    language = request.language or "python"
+    rows = []
+    
+    for raw_url in request.videoUrls:
+        video_url = raw_url.strip()
+        identity = VideoProcessor.identify(video_url)
+        if not identity:
+            rejected.append(schemas.RejectedVideoUrl(
+                videoUrl=video_url,
+                error=ErrorCode.INVALID_VIDEO_URL,
+                message=get_error_message(ErrorCode.INVALID_VIDEO_URL)
+            ))
+            continue
+        
+        # 按规范身份去重，同一视频的不同URL变体只创建一次
+        if identity.key in seen:
+            duplicates.append(video_url)
+            continue
+        seen.add(identity.key)
+        
+        rows.append({
+            "id": uuid.uuid4(),
+            "video_url": video_url,
+            "video_key": identity.key,
+            "language": language,
+            "status": models.SessionStatus.CREATED,
+            "created_at": now,
+            "updated_at": now,
+        })
+    
+    # 一次往返查出批内已知失败的视频
+    known_failures = await negative_cache.check_many([row["video_key"] for row in rows])
+    accepted = []
+    for row, known in zip(rows, known_failures):
+        if known:
+            rejected.append(schemas.RejectedVideoUrl(
+                videoUrl=row["video_url"],
+                error=known.code,
+                message=get_error_message(known.code)
+            ))
+        else:
+            accepted.append(row)
+    rows = accepted
+    
+    created = []
+    if rows:
+        stmt = insert(models.Session).values(rows).returning(
+            models.Session.id,
+            models.Session.video_url,
+            models.Session.status,
+            models.Session.created_at
+        )
+        try:
+            created = db.execute(stmt).all()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail={
+                    "error": ErrorCode.DATABASE_ERROR,
+                    "message": "Failed to create sessions"
+                }
+            )
+    
+    await session_cache.put_many([
+        schemas.SessionDetailResponse(
+            sessionId=str(row.id),
+            videoUrl=row.video_url,
+            status=row.status.value,
+            createdAt=row.created_at,
+            updatedAt=now
+        )
+        for row in created
+    ])
+    
+    if request.process:
+        for row in created:
+            background_tasks.add_task(session_pipeline.run_in_background, row.id)
+    
+    return schemas.BatchCreateSessionResponse(
+        sessions=[
+            schemas.SessionResponse(
+                sessionId=str(row.id),
+                videoUrl=row.video_url,
+                status=row.status.value,
+                createdAt=row.created_at
+            )
+            for row in created
+        ],
+        duplicates=duplicates,
+        rejected=rejected
+    )
+
+
+@router.get(
+    "/sessions",
+    response_model=schemas.SessionListResponse,
+    summary="会话列表",
+    description="按状态、视频（任意URL变体）和创建时间过滤会话，使用 (created_at, id) 游标分页"
+)
+async def list_sessions(
+    status_filter: Optional[List[schemas.SessionStatus]] = Query(None, alias="status"),
+    video_url: Optional[str] = Query(None, alias="videoUrl"),
+    created_from: Optional[datetime] = Query(None, alias="createdFrom"),
+    created_to: Optional[datetime] = Query(None, alias="createdTo"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    游标分页列出会话
+
+    按 (created_at, id) 倒序排列，每页通过复合索引定位起点，
+    耗时与表大小及翻页深度无关。
+    """
+    query = db.query(*SESSION_SUMMARY_COLUMNS)
+    
+    if status_filter:
+        query = query.filter(
+            models.Session.status.in_([models.SessionStatus(s.value) for s in status_filter])
+        )
+    if video_url:
+        # 按规范身份过滤，URL变体也能查到同一视频的会话
+        query = query.filter(models.Session.video_key == VideoProcessor.video_key(video_url))
+    if created_from:
+        query = query.filter(models.Session.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.Session.created_at < created_to)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.filter(
+            tuple_(models.Session.created_at, models.Session.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    
+    rows = query.order_by(
+        models.Session.created_at.desc(),
+        models.Session.id.desc()
+    ).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    items = [
+        schemas.SessionSummary(
+            sessionId=str(row.id),
+            videoUrl=row.video_url,
+            language=row.language,
+            status=row.status.value,
+            createdAt=row.created_at,
+            updatedAt=row.updated_at
+        )
+        for row in rows
+    ]
+    
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return schemas.SessionListResponse(
+        items=items,
+        nextCursor=next_cursor,
+        hasMore=has_more
+    )
+
+
 @router.get(
     "/session/{session_id}",
     response_model=schemas.SessionDetailResponse,
@@ -93,6 +450,11 @@ async def get_session(
             detail={"error": "INVALID_SESSION_ID", "message": "Invalid session ID format"}
         )
     
+    # 读穿缓存：轮询期间的大部分请求不会到达数据库
+    cached = await session_cache.get(str(session_uuid))
+    if cached:
+        return cached
+    
     session = db.query(models.Session).filter(
         models.Session.id == session_uuid
     ).first()
@@ -106,18 +468,84 @@ async def get_session(
             }
         )
     
-    video_info = None
-    if session.video_info:
-        video_info = schemas.VideoInfo(**session.video_info)
+    detail = session_cache.build_detail(session)
+    await session_cache.put(detail)
+    return detail
+
+
+def _load_subtitle_track(db: Session, session_uuid: uuid.UUID) -> Optional[SubtitleTrack]:
+    """
+    只查询字幕相关的列（复用结果的会话读取结果所有者的字幕）
+
+    Raises:
+        HTTPException: 会话不存在
+    """
+    columns = (models.Session.subtitles, models.Session.subtitle_track, models.Session.result_session_id)
+    row = db.query(*columns).filter(models.Session.id == session_uuid).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "SESSION_NOT_FOUND",
+                "message": "Session not found"
+            }
+        )
+    if row.result_session_id:
+        owner = db.query(*columns).filter(models.Session.id == row.result_session_id).first()
+        row = owner or row
     
-    return schemas.SessionDetailResponse(
-        sessionId=str(session.id),
-        videoUrl=session.video_url,
-        status=session.status.value,
-        videoInfo=video_info,
-        generatedCode=session.generated_code,
-        timeline=session.timeline,
-        error=session.error_message,
-        createdAt=session.created_at,
-        updatedAt=session.updated_at
+    subtitle_data = from_columns(row.subtitles, row.subtitle_track)
+    return SubtitleTrack.of(subtitle_data) if subtitle_data else None
+
+
+@router.get(
+    "/session/{session_id}/subtitles",
+    response_model=schemas.SubtitlePageResponse,
+    summary="按时间范围查询字幕",
+    description="返回开始时间在 [from, to] 内的字幕，按开始时间排序分页；前端按播放进度懒加载"
+)
+async def get_session_subtitles(
+    session_id: str,
+    start: float = Query(0, ge=0, alias="from", description="开始时间（秒）"),
+    end: Optional[float] = Query(None, ge=0, alias="to", description="结束时间（秒），默认到视频结尾"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    分页查询字幕
+
+    字幕轨道按开始时间有序，起点通过二分查找定位，单页耗时与字幕总数无关。
+    翻页时把上一页返回的 nextFrom 作为 from。
+    """
+    try:
+        session_uuid = uuid.UUID(session_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "INVALID_SESSION_ID", "message": "Invalid session ID format"}
+        )
+    
+    track = await session_cache.get_track(str(session_uuid))
+    if track is None:
+        track = _load_subtitle_track(db, session_uuid)
+        if track is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={"error": "SUBTITLES_NOT_READY", "message": "Subtitles are not available yet"}
+            )
+        await session_cache.put_track(str(session_uuid), track)
+    
+    lo, hi = track.window(start, float("inf") if end is None else end)
+    page_end = min(hi, lo + limit)
+    if lo < page_end < hi:
+        # 与页尾开始时间相同的字幕放在同一页，nextFrom 才不会重复返回它们
+        page_end = min(hi, track.window(track.starts[page_end - 1], track.starts[page_end - 1])[1])
+    has_more = page_end < hi
+    
+    return schemas.SubtitlePageResponse(
+        sessionId=str(session_uuid),
+        total=len(track),
+        items=track.to_list(lo, page_end),
+        nextFrom=track.starts[page_end] if has_more else None,
+        hasMore=has_more
     )
@@ -15,12 +15,28 @@ class Settings(BaseSettings):
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    # 非空时按一致性哈希分片到这些节点（忽略 REDIS_URL）
+    REDIS_NODES: List[str] = []
+    REDIS_VIRTUAL_NODES: int = 160
+    REDIS_FLUSH_ON_REJOIN: bool = True
+    
+    # 缓存后端：redis（Redis不可用时自动降级到进程内）或 memory（仅进程内）
+    CACHE_BACKEND: str = "redis"
+    CACHE_FAILURE_THRESHOLD: int = 3
+    CACHE_PROBE_INTERVAL: float = 5.0
+    MEMORY_CACHE_MAX_ENTRIES: int = 10000
     
     # BibiGPT API配置
     BIBIGPT_API_KEY: str
     BIBIGPT_API_URL: str = "https://api.bibigpt.co/api/v1"
     BIBIGPT_TIMEOUT: int = 60
     
+    # B站公开接口（合集导入时查询分P列表）
+    BILIBILI_API_URL: str = "https://api.bilibili.com"
+    BILIBILI_TIMEOUT: int = 10
+    
     # DeepSeek API配置
     DEEPSEEK_API_KEY: str
     DEEPSEEK_API_URL: str = "https://api.deepseek.com/v1"
@@ -32,8 +48,88 @@ class Settings(BaseSettings):
     ENABLE_CACHE: bool = True
     CACHE_TTL: int = 3600
     VIDEO_CACHE_TTL: int = 86400
+    SUBTITLE_CACHE_SOFT_TTL: int = 43200
+    CACHE_REFRESH_LOCK_TTL: int = 90
+    CACHE_LOCK_POLL_INTERVAL: float = 0.5
+    CACHE_EARLY_EXPIRY_BETA: float = 1.0
+    CACHE_CODEC: str = "auto"
+    CACHE_COMPRESS_THRESHOLD: int = 4096
+    CACHE_COMPRESS_LEVEL: int = 6
+    SESSION_CACHE_TTL: int = 60
+    SESSION_RESULT_CACHE_TTL: int = 604800
+    
+    # 自适应TTL（按抽样访问频率缩放字幕和会话结果的TTL）
+    ADAPTIVE_TTL_ENABLED: bool = True
+    ADAPTIVE_TTL_SAMPLE_RATE: float = 0.25
+    ADAPTIVE_TTL_REFERENCE_HITS: int = 8
+    ADAPTIVE_TTL_MIN_FACTOR: float = 0.25
+    ADAPTIVE_TTL_MAX_FACTOR: float = 8.0
+    ADAPTIVE_TTL_MAX: int = 2592000
+    ADAPTIVE_TTL_DECAY: int = 604800
+    CACHE_MEMORY_BUDGET: int = 512 * 1024 * 1024
+    CACHE_MEMORY_POLL_INTERVAL: int = 30
+    
+    # 字幕负缓存（永久失败进Bloom过滤器，暂时失败短TTL）
+    ENABLE_NEGATIVE_CACHE: bool = True
+    NEGATIVE_CACHE_PERMANENT_TTL: int = 604800
+    NEGATIVE_CACHE_TRANSIENT_TTL: int = 300
+    NEGATIVE_BLOOM_BITS: int = 1 << 23
+    NEGATIVE_BLOOM_HASHES: int = 7
+    
+    # 进程内缓存（Redis前的第一层）
+    LOCAL_CACHE_ENABLED: bool = True
+    LOCAL_CACHE_MAX_ENTRIES: int = 1024
+    LOCAL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    LOCAL_CACHE_TTL: int = 60
     MAX_VIDEO_DURATION: int = 7200
     
+    # 字幕预处理（合并ASR碎片、去重、去语气词）
+    SUBTITLE_PREPROCESS_ENABLED: bool = True
+    SUBTITLE_MERGE_MAX_GAP: float = 1.0
+    SUBTITLE_UNIT_MAX_SECONDS: float = 15.0
+    SUBTITLE_UNIT_MAX_CHARS: int = 120
+    SUBTITLE_UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    BATCH_MAX_SESSIONS: int = 500
+    
+    # 合集导入：每个worker同时提取字幕/同时处理的分P数（受BibiGPT和DeepSeek限流约束）
+    COLLECTION_MAX_PARTS: int = 200
+    COLLECTION_FETCH_CONCURRENCY: int = 8
+    COLLECTION_PROCESS_CONCURRENCY: int = 2
+    
+    # 创建会话时预取字幕（可选同时预做内容规划）
+    ENABLE_SUBTITLE_PREFETCH: bool = True
+    PREFETCH_PLANNING: bool = False
+    PREFETCH_TTL: int = 600
+    PREFETCH_MAX_TASKS: int = 256
+    ENABLE_RESULT_REUSE: bool = True
+    
+    # CPU密集步骤的执行器：process / thread / inline，输入小于阈值时直接在事件循环中执行
+    CPU_EXECUTOR: str = "process"
+    CPU_EXECUTOR_WORKERS: int = 2
+    CPU_OFFLOAD_MIN_BYTES: int = 32 * 1024
+    
+    # 代码沙箱：预启动的worker试运行生成的代码段（见 app/utils/sandbox_worker.py）
+    SANDBOX_ENABLED: bool = True
+    SANDBOX_POOL_SIZE: int = 2
+    SANDBOX_TIMEOUT: float = 3.0
+    SANDBOX_MEMORY_MB: int = 256
+    SANDBOX_OUTPUT_LIMIT: int = 8192
+    SANDBOX_RESULT_CACHE_TTL: int = 604800
+    
+    # 内容规划：llm / hybrid / local（见 CodePlanner.plan）
+    PLANNER_MODE: str = "llm"
+    PLANNER_LABEL_LINES: int = 40
+    TOPIC_WINDOW_SECONDS: int = 30
+    TOPIC_MIN_DEPTH: float = 0.4
+    TOPIC_MAX_SEGMENTS: int = 5
+    TOPIC_MIN_SEGMENT_SECONDS: int = 60
+    
+    # 会话分区与保留配置
+    SESSION_PARTITION_PREMAKE_MONTHS: int = 3
+    SESSION_RETENTION_MONTHS: int = 12
+    SESSION_ARCHIVE_ENABLED: bool = True
+    SESSION_ARCHIVE_DIR: str = "archives"
+    
     # 限流配置
     MAX_REQUESTS_PER_MINUTE: int = 10
     
@@ -1,7 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.api import session, stream
+from app.api import session, stream, cache, search, collection
+from app.utils.cache import Cache, cache_backend
+from app.utils.cpu_executor import cpu_executor, CpuExecutorStats
+from app.services.code_sandbox import code_sandbox
+from app.services.partition_manager import partition_manager
+from app.services.collection_ingester import CollectionStats
 import logging
 
 logging.basicConfig(
@@ -30,6 +35,9 @@ app.add_middleware(
 
 app.include_router(session.router, prefix="/api", tags=["Session"])
 app.include_router(stream.router, prefix="/api", tags=["Stream"])
+app.include_router(cache.router, prefix="/api", tags=["Cache"])
+app.include_router(search.router, prefix="/api", tags=["Search"])
+app.include_router(collection.router, prefix="/api", tags=["Collection"])
 
 
 @app.get("/", tags=["Root"])
@@ -47,7 +55,13 @@ async def health_check():
     """健康检查端点"""
     return {
         "status": "healthy",
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        # redis / degraded（Redis不可用，已切到进程内缓存）/ memory
+        "cache": cache_backend.mode,
+        # CPU执行器：直接执行/交给执行器的次数，以及事件循环省下的时间
+        "executor": CpuExecutorStats.snapshot(),
+        # 合集导入：分P提取成功/失败数，speedup为各分P提取耗时之和 / 合集实际耗时
+        "collections": CollectionStats.snapshot()
     }
 
 
@@ -56,12 +70,20 @@ async def startup_event():
     """应用启动时执行"""
     logger.info(f"Starting {settings.APP_NAME} v{settings.VERSION}")
     logger.info(f"Debug mode: {settings.DEBUG}")
+    # 当前月份的分区缺失时直接启动失败，而不是等到每个新会话INSERT时报错
+    partition_manager.check_partitions()
+    Cache.start_invalidation_listener()
+    # 沙箱worker在启动时预热，第一段代码不必等待解释器启动
+    await code_sandbox.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时执行"""
     logger.info("Shutting down application")
+    await Cache.close()
+    cpu_executor.shutdown()
+    await code_sandbox.close()
 
 
 if __name__ == "__main__":
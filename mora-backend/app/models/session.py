@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Text, DateTime, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, Computed, String, Text, DateTime, Index, LargeBinary, Enum as SQLEnum, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from app.database import Base
 import uuid
 from datetime import datetime
@@ -15,25 +16,61 @@ class SessionStatus(str, enum.Enum):
 class Session(Base):
     """会话模型"""
     __tablename__ = "sessions"
+    # 按 created_at 做月度范围分区，分区由 manage_partitions.py 维护
+    __table_args__ = (
+        # 游标分页索引：(created_at, id) 定位页起点，INCLUDE 列支持仅索引扫描
+        Index(
+            "ix_sessions_created_at_id", "created_at", "id",
+            postgresql_include=["status", "video_url", "language", "updated_at"]
+        ),
+        Index("ix_sessions_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_sessions_video_key_created_at_id", "video_key", "created_at", "id"),
+        # 活跃会话部分索引，只覆盖少量未完成的行
+        Index(
+            "ix_sessions_active_created_at_id", "created_at", "id",
+            postgresql_where=text("status IN ('created', 'processing')")
+        ),
+        Index("ix_sessions_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_sessions_collection_id", "collection_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    video_url = Column(Text, nullable=False, index=True)
+    video_url = Column(Text, nullable=False)
+    # 规范视频身份（如 youtube:ID、bilibili:BV号:p2），用于去重、复用和过滤
+    video_key = Column(Text, nullable=True)
+    # 同一次合集导入（B站多P课程）创建的会话共享一个 collection_id
+    collection_id = Column(UUID(as_uuid=True), nullable=True)
     language = Column(String(20), default="python")
     status = Column(
         SQLEnum(SessionStatus, values_callable=lambda x: [e.value for e in x]), 
         nullable=False, 
-        default=SessionStatus.CREATED.value,
-        index=True
+        default=SessionStatus.CREATED.value
     )
     
     video_info = Column(JSONB, nullable=True)
+    # 字幕元数据（标题、时长、预处理统计）；字幕本身以 SubtitleTrack 二进制格式存在 subtitle_track
     subtitles = Column(JSONB, nullable=True)
+    subtitle_track = Column(LargeBinary, nullable=True)
     timeline = Column(JSONB, nullable=True)
     
     generated_code = Column(Text, nullable=True)
+    
+    # 全文检索：纯文本字幕 + 由字幕和代码生成的tsvector（CJK按二元组切分，见迁移007）
+    # 只在检索时读取，默认延迟加载
+    transcript = deferred(Column(Text, nullable=True))
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', mora_search_terms(coalesce(transcript, ''))), 'A') || "
+        "setweight(to_tsvector('simple', mora_search_terms(coalesce(generated_code, ''))), 'B')",
+        persisted=True
+    )))
     error_message = Column(Text, nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # 复用其它会话结果时指向结果所属会话，自身不保存字幕/代码（写时复制）
+    result_session_id = Column(UUID(as_uuid=True), nullable=True)
+    
+    # 分区表主键必须包含分区键
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
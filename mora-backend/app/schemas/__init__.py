@@ -1,15 +1,47 @@
 from app.schemas.session import (
     CreateSessionRequest,
+    BatchCreateSessionRequest,
     SessionResponse,
+    RejectedVideoUrl,
+    BatchCreateSessionResponse,
     SessionDetailResponse,
+    SessionSummary,
+    SessionListResponse,
+    SubtitleItem,
+    SubtitlePageResponse,
     VideoInfo,
     SessionStatus
 )
+from app.schemas.collection import (
+    CreateCollectionRequest,
+    CollectionPart,
+    CollectionProgress,
+    CollectionResponse
+)
+from app.schemas.search import (
+    SearchSnippet,
+    SearchResult,
+    SearchResponse
+)
 
 __all__ = [
     "CreateSessionRequest",
+    "BatchCreateSessionRequest",
     "SessionResponse", 
+    "RejectedVideoUrl",
+    "BatchCreateSessionResponse",
     "SessionDetailResponse",
+    "SessionSummary",
+    "SessionListResponse",
+    "SubtitleItem",
+    "SubtitlePageResponse",
     "VideoInfo",
-    "SessionStatus"
+    "SessionStatus",
+    "CreateCollectionRequest",
+    "CollectionPart",
+    "CollectionProgress",
+    "CollectionResponse",
+    "SearchSnippet",
+    "SearchResult",
+    "SearchResponse"
 ]
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.session import RejectedVideoUrl, SessionStatus
+
+class CreateCollectionRequest(BaseModel):
+    """合集导入请求"""
+    seriesUrl: str = Field(..., description="B站多P视频URL（任一分P均可）")
+    parts: Optional[List[int]] = Field(None, min_length=1, description="要导入的分P号，缺省导入全部分P")
+    language: Optional[str] = Field("python", description="编程语言")
+    process: bool = Field(False, description="字幕就绪后是否立即在后台生成代码")
+
+class CollectionPart(BaseModel):
+    """合集中的一个分P"""
+    part: int
+    sessionId: str
+    videoUrl: str
+    title: Optional[str] = None
+    status: SessionStatus
+    hasSubtitles: bool = False
+    error: Optional[str] = None
+
+class CollectionProgress(BaseModel):
+    """合集汇总进度"""
+    total: int
+    subtitlesReady: int
+    processing: int
+    completed: int
+    failed: int
+
+class CollectionResponse(BaseModel):
+    """合集导入/查询响应"""
+    collectionId: str
+    seriesUrl: str
+    createdAt: datetime
+    progress: CollectionProgress
+    parts: List[CollectionPart]
+    rejected: List[RejectedVideoUrl] = []
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.session import SessionStatus
+
+class SearchSnippet(BaseModel):
+    """命中片段及其在视频中的时间点（秒）"""
+    startTime: float
+    text: str
+
+class SearchResult(BaseModel):
+    """检索结果项"""
+    sessionId: str
+    videoUrl: str
+    title: Optional[str] = None
+    language: Optional[str] = None
+    status: SessionStatus
+    createdAt: datetime
+    rank: float
+    transcriptSnippet: Optional[SearchSnippet] = None
+    codeSnippet: Optional[SearchSnippet] = None
+
+class SearchResponse(BaseModel):
+    """检索响应（按相关度排序的游标分页）"""
+    query: str
+    terms: List[str]
+    items: List[SearchResult]
+    nextCursor: Optional[str] = None
+    hasMore: bool = False
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
@@ -14,6 +14,13 @@ class CreateSessionRequest(BaseModel):
     """创建会话请求"""
     videoUrl: HttpUrl = Field(..., description="视频URL")
     language: Optional[str] = Field("python", description="编程语言")
+    forceRegenerate: bool = Field(False, description="忽略已有结果，强制重新生成")
+
+class BatchCreateSessionRequest(BaseModel):
+    """批量创建会话请求"""
+    videoUrls: List[str] = Field(..., min_length=1, description="视频URL列表")
+    language: Optional[str] = Field("python", description="编程语言")
+    process: bool = Field(False, description="创建后是否立即在后台处理")
 
 class SessionResponse(BaseModel):
     """会话响应（简化版）"""
@@ -21,6 +28,7 @@ class SessionResponse(BaseModel):
     videoUrl: str
     status: SessionStatus
     createdAt: datetime
+    reusedFrom: Optional[str] = None
 
 class VideoInfo(BaseModel):
     """视频信息"""
@@ -43,3 +51,44 @@ class SessionDetailResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class RejectedVideoUrl(BaseModel):
+    """批量创建中被拒绝的URL"""
+    videoUrl: str
+    error: str
+    message: str
+
+class BatchCreateSessionResponse(BaseModel):
+    """批量创建会话响应"""
+    sessions: List[SessionResponse]
+    duplicates: List[str] = []
+    rejected: List[RejectedVideoUrl] = []
+
+class SessionSummary(BaseModel):
+    """会话列表项（仅包含轻量字段，不含JSONB大字段）"""
+    sessionId: str
+    videoUrl: str
+    language: Optional[str] = None
+    status: SessionStatus
+    createdAt: datetime
+    updatedAt: datetime
+
+class SessionListResponse(BaseModel):
+    """会话列表响应（游标分页）"""
+    items: List[SessionSummary]
+    nextCursor: Optional[str] = None
+    hasMore: bool = False
+
+class SubtitleItem(BaseModel):
+    """单条字幕"""
+    startTime: float
+    endTime: float
+    text: str
+
+class SubtitlePageResponse(BaseModel):
+    """按时间范围查询的字幕页"""
+    sessionId: str
+    total: int
+    items: List[SubtitleItem]
+    nextFrom: Optional[float] = None
+    hasMore: bool = False
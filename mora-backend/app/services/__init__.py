@@ -3,11 +3,31 @@ from app.services.bibigpt_service import bibigpt_service
 from app.services.deepseek_service import deepseek_service
 from app.services.timeline_service import timeline_service
 from app.services.code_planner import code_planner
+from app.services.partition_manager import partition_manager
+from app.services.session_cache import session_cache
+from app.services.result_reuse import result_reuse
+from app.services.negative_cache import negative_cache
+from app.services.subtitle_prefetcher import subtitle_prefetcher
+from app.services.subtitle_importer import subtitle_importer
+from app.services.session_search import session_search
+from app.services.topic_segmenter import topic_segmenter
+from app.services.collection_ingester import collection_ingester
+from app.services.code_sandbox import code_sandbox
 
 __all__ = [
     "VideoProcessor",
     "bibigpt_service",
     "deepseek_service",
     "timeline_service",
-    "code_planner"
+    "code_planner",
+    "partition_manager",
+    "session_cache",
+    "result_reuse",
+    "negative_cache",
+    "subtitle_prefetcher",
+    "subtitle_importer",
+    "session_search",
+    "topic_segmenter",
+    "collection_ingester",
+    "code_sandbox"
 ]
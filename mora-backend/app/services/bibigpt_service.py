@@ -1,9 +1,33 @@
 import httpx
 from app.config import get_settings
-from typing import Dict, Any
+from app.utils.cache import Cache, CacheKeys
+from app.services.video_processor import VideoProcessor
+from app.services.negative_cache import negative_cache
+from app.services.subtitle_preprocessor import subtitle_preprocessor
+from app.utils.errors import ErrorCode
+from app.utils.subtitle_parser import JsonArrayStreamParser, subtitle_from_item
+from app.utils.subtitle_track import with_track
+from typing import Dict, Any, List
 
 settings = get_settings()
 
+# 这些状态码说明视频本身无法处理，重试也不会成功
+PERMANENT_HTTP_STATUSES = {400, 404, 410, 422}
+
+
+class SubtitleFetchError(Exception):
+    """
+    字幕提取失败
+    
+    permanent 为 True 表示视频本身没有可用字幕，重试无意义；
+    否则是超时、限流、上游故障等暂时失败。
+    """
+    
+    def __init__(self, message: str, code: ErrorCode, permanent: bool):
+        super().__init__(message)
+        self.code = code
+        self.permanent = permanent
+
 class BibiGPTService:
     """BibiGPT API服务"""
     
@@ -20,14 +44,19 @@ class BibiGPTService:
             video_url: 视频URL
             
         Returns:
-            字幕数据字典
+            字幕数据字典，subtitles 为 SubtitleTrack
             
         Raises:
-            Exception: API调用失败
+            SubtitleFetchError: API调用失败或视频没有字幕
         """
         async with httpx.AsyncClient(timeout=BibiGPTService.TIMEOUT) as client:
             try:
-                response = await client.get(
+                # 长视频的响应有数MB，边接收边解析 detail.subtitlesArray，
+                # 原始响应体和完整的JSON对象树都不会驻留内存
+                parser = JsonArrayStreamParser(("subtitlesArray",))
+                subtitles: List[Dict[str, Any]] = []
+                async with client.stream(
+                    "GET",
                     f"{BibiGPTService.BASE_URL}/getSubtitle",
                     params={
                         "url": video_url,
@@ -36,40 +65,80 @@ class BibiGPTService:
                     headers={
                         "Authorization": f"Bearer {BibiGPTService.API_KEY}"
                     }
-                )
-                
-                response.raise_for_status()
-                data = response.json()
+                ) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        subtitles.extend(subtitle_from_item(item) for item in parser.feed(chunk))
+                data = parser.close() or {}
                 
                 if not data.get("success"):
-                    raise Exception("Failed to extract subtitle from BibiGPT")
+                    raise SubtitleFetchError(
+                        "Failed to extract subtitle from BibiGPT", ErrorCode.NO_SUBTITLE, permanent=True
+                    )
                 
                 detail = data.get("detail", {})
-                return BibiGPTService._format_response(detail)
+                # 合并ASR碎片后再缓存，提示词和缓存都更小
+                result = subtitle_preprocessor.apply(BibiGPTService._format_response(detail, subtitles))
+                if not result["subtitles"]:
+                    raise SubtitleFetchError("Video has no subtitles", ErrorCode.NO_SUBTITLE, permanent=True)
+                return with_track(result)
                 
+            except SubtitleFetchError:
+                raise
             except httpx.HTTPStatusError as e:
-                raise Exception(f"BibiGPT API error: {e.response.status_code}")
+                status_code = e.response.status_code
+                raise SubtitleFetchError(
+                    f"BibiGPT API error: {status_code}",
+                    ErrorCode.BIBIGPT_API_ERROR,
+                    permanent=status_code in PERMANENT_HTTP_STATUSES
+                )
             except httpx.TimeoutException:
-                raise Exception("BibiGPT API timeout")
+                raise SubtitleFetchError("BibiGPT API timeout", ErrorCode.BIBIGPT_API_ERROR, permanent=False)
             except Exception as e:
-                raise Exception(f"BibiGPT API failed: {str(e)}")
+                raise SubtitleFetchError(
+                    f"BibiGPT API failed: {str(e)}", ErrorCode.BIBIGPT_API_ERROR, permanent=False
+                )
+    
+    @staticmethod
+    async def get_subtitle_cached(video_url: str) -> Dict[str, Any]:
+        """
+        带缓存的字幕获取
+        
+        软TTL过后仍返回缓存中的旧字幕，由一个调用方在后台刷新；
+        缓存完全过期时全集群只有一个调用方请求BibiGPT。
+        缓存key使用规范视频身份，同一视频的不同URL变体共享缓存。
+        已知无法提取字幕的视频直接失败，失败结果按类别写入负缓存。
+        """
+        if not settings.ENABLE_CACHE:
+            return await BibiGPTService.get_subtitle(video_url)
+        
+        video_key = VideoProcessor.video_key(video_url)
+        known = await negative_cache.check(video_key)
+        if known:
+            raise SubtitleFetchError(
+                f"Known failure for {video_key}", known.code, permanent=known.permanent
+            )
+        
+        try:
+            return await Cache.get_or_refresh(
+                CacheKeys.video_subtitle(video_key),
+                lambda: BibiGPTService.get_subtitle(video_url),
+                soft_ttl=settings.SUBTITLE_CACHE_SOFT_TTL,
+                hard_ttl=settings.VIDEO_CACHE_TTL
+            )
+        except SubtitleFetchError as e:
+            await negative_cache.record(video_key, e.code, e.permanent)
+            raise
     
     @staticmethod
-    def _format_response(detail: Dict[str, Any]) -> Dict[str, Any]:
-        """格式化BibiGPT响应"""
+    def _format_response(detail: Dict[str, Any], subtitles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """格式化BibiGPT响应（字幕已在流式解析时转换）"""
         return {
             "title": detail.get("title", "Unknown"),
             "duration": detail.get("duration", 0),
             "thumbnail": detail.get("cover"),
             "author": detail.get("author"),
-            "subtitles": [
-                {
-                    "startTime": sub.get("startTime", 0),
-                    "endTime": sub.get("end", 0),
-                    "text": sub.get("text", "")
-                }
-                for sub in detail.get("subtitlesArray", [])
-            ]
+            "subtitles": subtitles
         }
 
 bibigpt_service = BibiGPTService()
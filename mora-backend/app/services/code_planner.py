@@ -2,12 +2,117 @@ import json
 import httpx
 from typing import Dict, Any, List
 from app.config import get_settings
+from app.utils.subtitle_track import SubtitleTrack, render_subtitles, text_size
+from app.utils.cpu_executor import cpu_executor
+from app.services.topic_segmenter import topic_segmenter
 
 settings = get_settings()
 
 class CodePlanner:
     """代码规划服务 - 分析字幕并生成代码段大纲"""
     
+    @staticmethod
+    async def plan(subtitle_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        按 PLANNER_MODE 生成分段
+        
+        - llm: 大模型分段和总结，失败时用本地分段兜底
+        - hybrid: 本地分段定边界，大模型只为这些段写总结和代码任务（提示词更短）
+        - local: 只用本地分段，不调用大模型，代码生成可以立即开始
+        """
+        mode = settings.PLANNER_MODE
+        if mode in ("local", "hybrid") and topic_segmenter.available():
+            segments = await cpu_executor.run(
+                topic_segmenter.segment, subtitle_data, size=text_size(subtitle_data)
+            )
+            if segments:
+                if mode == "hybrid":
+                    return await CodePlanner.label_segments(subtitle_data, segments)
+                return segments
+        return await CodePlanner.summarize_subtitles(subtitle_data)
+    
+    @staticmethod
+    async def label_segments(subtitle_data: Dict[str, Any], segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        为已确定边界的分段生成总结和代码任务，失败时保留本地关键词标签
+        
+        每段只附带该段前 PLANNER_LABEL_LINES 条字幕，边界不由大模型决定。
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        track = SubtitleTrack.of(subtitle_data)
+        sections = []
+        for i, segment in enumerate(segments, 1):
+            excerpt = track.render_window(
+                segment["startTime"], segment["endTime"], limit=settings.PLANNER_LABEL_LINES
+            )
+            sections.append(f"### 段落{i}（{segment['startTime']}秒 - {segment['endTime']}秒）\n{excerpt}")
+        
+        prompt = f"""你是一个视频内容分析专家。这个Python教学视频已经按话题分成{len(segments)}个段落，下面是每段的部分字幕。
+
+视频标题: {subtitle_data.get("title", "Unknown")}
+
+{chr(10).join(sections)}
+
+对于每个段落，请提供：
+- summary: 这段时间讲师讲了什么内容（用一句话总结，15字以内）
+- codeTask: 需要编写什么样的代码来演示这个知识点（具体描述）
+
+输出JSON格式，segments数组按段落顺序、数量与段落相同:
+{{
+  "segments": [
+    {{"summary": "讲解f-string语法", "codeTask": "演示f-string基本语法和变量插入"}}
+  ]
+}}
+
+只输出JSON，不要其他文字"""
+        
+        try:
+            async with httpx.AsyncClient(timeout=40.0) as client:
+                logger.info(f"Labeling {len(segments)} locally detected segments")
+                
+                response = await client.post(
+                    f"{settings.DEEPSEEK_API_URL}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": settings.DEEPSEEK_MODEL,
+                        "messages": [
+                            {
+                                "role": "system",
+                                "content": "你是一个专业的视频内容分析师，擅长分析教学视频并生成结构化总结。"
+                            },
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        "temperature": 0.2,
+                        "response_format": {"type": "json_object"}
+                    }
+                )
+                
+                response.raise_for_status()
+                result = response.json()
+                labels = json.loads(result["choices"][0]["message"]["content"]).get("segments", [])
+                
+                labeled = []
+                for segment, label in zip(segments, labels + [{}] * len(segments)):
+                    labeled.append({
+                        **segment,
+                        "summary": label.get("summary") or segment["summary"],
+                        "codeTask": label.get("codeTask") or segment["codeTask"],
+                        "source": "hybrid" if label else segment.get("source")
+                    })
+                return labeled
+                
+        except Exception as e:
+            logger.warning(f"Segment labeling failed, keeping local labels: {e}")
+            return segments
+    
     @staticmethod
     async def summarize_subtitles(subtitle_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -30,14 +135,8 @@ class CodePlanner:
         
         title = subtitle_data.get("title", "Unknown")
         duration = subtitle_data.get("duration", 0)
-        subtitles = subtitle_data.get("subtitles", [])
-        
-        # 构建完整字幕文本
-        subtitle_lines = []
-        for sub in subtitles:
-            time_str = f"[{sub['startTime']:.1f}s]"
-            subtitle_lines.append(f"{time_str} {sub['text']}")
-        subtitle_text = "\n".join(subtitle_lines)
+        # 完整字幕文本（轨道缓存的渲染结果），长视频在执行器中渲染
+        subtitle_text = await cpu_executor.run(render_subtitles, subtitle_data, size=text_size(subtitle_data))
         
         prompt = f"""你是一个视频内容分析专家。请仔细阅读这个Python教学视频的字幕，然后总结出视频的内容结构。
 
@@ -141,7 +240,12 @@ class CodePlanner:
                 
         except Exception as e:
             logger.error(f"Subtitle analysis failed: {e}")
-            # 返回默认的单段
+            # 本地话题分段兜底，不可用时返回默认的单段；与 plan() 一样大字幕交给执行器
+            segments = await cpu_executor.run(
+                topic_segmenter.segment, subtitle_data, size=text_size(subtitle_data)
+            )
+            if segments:
+                return segments
             return [{
                 "startTime": 0,
                 "endTime": duration,
@@ -165,15 +269,8 @@ class CodePlanner:
         
         title = subtitle_data.get("title", "Unknown")
         duration = subtitle_data.get("duration", 0)
-        subtitles = subtitle_data.get("subtitles", [])
-        
-        # 采样字幕
-        subtitle_lines = []
-        for i, sub in enumerate(subtitles):
-            if i % 5 == 0:  # 每5条采样一条
-                time_str = f"[{sub['startTime']}s]"
-                subtitle_lines.append(f"{time_str} {sub['text']}")
-        subtitle_text = "\n".join(subtitle_lines)
+        # 采样字幕，每5条采样一条
+        subtitle_text = await cpu_executor.run(render_subtitles, subtitle_data, step=5, size=text_size(subtitle_data))
         
         prompt = f"""You are a video content analyzer. Analyze the video subtitles and create a code generation plan.
 
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.utils.cache import Cache, CacheKeys
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "utils", "sandbox_worker.py")
+# worker自身的响应预留时间：超过 SANDBOX_TIMEOUT 加上这段时间仍无响应，视为worker卡死
+WORKER_GRACE_SECONDS = 5.0
+SANDBOX_ENV = {"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C.UTF-8"}
+
+
+class SandboxStats:
+    """沙箱执行统计（本worker）"""
+
+    runs = 0
+    cache_hits = 0
+    failures = 0
+    timeouts = 0
+    restarts = 0
+    run_seconds = 0.0
+
+
+class CodeSandbox:
+    """
+    代码沙箱池 - 在服务端试运行生成的代码段，记录输出和退出状态
+
+    启动时预先拉起 SANDBOX_POOL_SIZE 个常驻worker（app/utils/sandbox_worker.py，`python -I` 隔离模式），
+    每次执行由worker fork出受限子进程（rlimit、超时、禁止网络和子进程，见worker说明），
+    解释器已经预热，单段代码的检查是毫秒级，可以直接放在流水线里。
+    结果按代码的sha256缓存，重新生成或复用时相同的代码不再执行。
+
+    沙箱只防止生成代码的意外行为（死循环、误删文件、联网），不是针对恶意代码的安全边界：
+    worker不带服务的环境变量，子进程只能读写自己的临时目录和读取Python标准库，
+    但仍与服务同一用户、同一内核命名空间，生产环境应以低权限用户运行服务。
+    """
+
+    _idle: Optional[asyncio.Queue] = None
+    _starting: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    async def _spawn() -> asyncio.subprocess.Process:
+        # 不继承服务的环境变量（API密钥、数据库URL等），代码的输出会返回给前端并缓存
+        return await asyncio.create_subprocess_exec(
+            sys.executable, "-I", WORKER_SCRIPT,
+            env=SANDBOX_ENV,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            # 一行响应包含两份截断后的输出，JSON转义后可能超过默认的64KB
+            limit=8 * settings.SANDBOX_OUTPUT_LIMIT + 65536
+        )
+
+    @staticmethod
+    async def start() -> None:
+        """预先启动worker池（重复调用无副作用）"""
+        if not settings.SANDBOX_ENABLED or CodeSandbox._idle is not None:
+            return
+        if CodeSandbox._starting is None:
+            CodeSandbox._starting = asyncio.Lock()
+        async with CodeSandbox._starting:
+            if CodeSandbox._idle is not None:
+                return
+            idle: asyncio.Queue = asyncio.Queue()
+            for _ in range(settings.SANDBOX_POOL_SIZE):
+                idle.put_nowait(await CodeSandbox._spawn())
+            CodeSandbox._idle = idle
+            logger.info(f"Started {settings.SANDBOX_POOL_SIZE} sandbox workers")
+
+    @staticmethod
+    async def close() -> None:
+        """关闭所有空闲worker"""
+        idle, CodeSandbox._idle = CodeSandbox._idle, None
+        while idle is not None and not idle.empty():
+            worker = idle.get_nowait()
+            if worker.returncode is None:
+                worker.kill()
+                await worker.wait()
+
+    @staticmethod
+    async def _replace(worker: asyncio.subprocess.Process, idle: asyncio.Queue) -> None:
+        """回收被杀掉的worker，向池中补充一个新的"""
+        await worker.wait()
+        try:
+            idle.put_nowait(await CodeSandbox._spawn())
+            SandboxStats.restarts += 1
+        except Exception as e:
+            logger.error(f"Failed to restart sandbox worker: {e}")
+
+    @staticmethod
+    def code_hash(code: str) -> str:
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def execute(code: str) -> Optional[Dict[str, Any]]:
+        """
+        执行一段代码
+
+        Returns:
+            {"exitCode", "stdout", "stderr", "timedOut", "durationMs"}；
+            沙箱关闭或worker故障时返回None（不影响代码生成）
+        """
+        if not settings.SANDBOX_ENABLED or not code.strip():
+            return None
+
+        key = CacheKeys.sandbox_result(CodeSandbox.code_hash(code))
+        cached = await Cache.get(key)
+        if cached:
+            SandboxStats.cache_hits += 1
+            return cached
+
+        result = await CodeSandbox._execute(code)
+        if result is not None:
+            await Cache.set(key, result, ttl=settings.SANDBOX_RESULT_CACHE_TTL)
+        return result
+
+    @staticmethod
+    async def _execute(code: str) -> Optional[Dict[str, Any]]:
+        await CodeSandbox.start()
+        idle = CodeSandbox._idle
+        worker = await idle.get()
+        started = time.monotonic()
+        healthy = False
+        try:
+            request = {
+                "code": code,
+                "timeout": settings.SANDBOX_TIMEOUT,
+                "memoryMb": settings.SANDBOX_MEMORY_MB,
+                "outputLimit": settings.SANDBOX_OUTPUT_LIMIT
+            }
+            worker.stdin.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            await worker.stdin.drain()
+            line = await asyncio.wait_for(
+                worker.stdout.readline(), timeout=settings.SANDBOX_TIMEOUT + WORKER_GRACE_SECONDS
+            )
+            if not line:
+                raise RuntimeError("sandbox worker exited")
+            result = json.loads(line)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            healthy = True
+        except Exception as e:
+            logger.error(f"Sandbox execution failed: {e}")
+            SandboxStats.failures += 1
+            return None
+        finally:
+            if healthy:
+                idle.put_nowait(worker)
+            else:
+                # 出错或被取消（如SSE客户端断开）时响应可能还没读走，worker不能再用：
+                # 立即杀掉，由后台任务补一个新的，取消路径上不再await
+                if worker.returncode is None:
+                    worker.kill()
+                asyncio.get_running_loop().create_task(CodeSandbox._replace(worker, idle))
+
+        SandboxStats.runs += 1
+        SandboxStats.run_seconds += time.monotonic() - started
+        if result["timedOut"]:
+            SandboxStats.timeouts += 1
+        return result
+
+code_sandbox = CodeSandbox()
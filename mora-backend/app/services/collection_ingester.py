@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from app import models
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.bibigpt_service import bibigpt_service, SubtitleFetchError
+from app.services.session_cache import session_cache
+from app.services.session_pipeline import session_pipeline
+from app.services.video_processor import VideoProcessor
+from app.utils.errors import ErrorCode, get_error_message
+from app.utils.subtitle_track import SubtitleTrack
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PartListError(Exception):
+    """无法获取B站视频的分P列表"""
+
+
+class CollectionStats:
+    """合集导入统计"""
+
+    collections = 0
+    parts_fetched = 0
+    parts_failed = 0
+    # 各分P提取耗时之和 / 合集实际耗时，即并发带来的加速
+    fetch_seconds = 0.0
+    wall_seconds = 0.0
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        return {
+            "collections": CollectionStats.collections,
+            "partsFetched": CollectionStats.parts_fetched,
+            "partsFailed": CollectionStats.parts_failed,
+            "fetchSeconds": round(CollectionStats.fetch_seconds, 3),
+            "wallSeconds": round(CollectionStats.wall_seconds, 3),
+            "speedup": round(CollectionStats.fetch_seconds / CollectionStats.wall_seconds, 2)
+            if CollectionStats.wall_seconds else None,
+        }
+
+
+class CollectionIngester:
+    """
+    合集导入 - B站多P课程每P一个会话，字幕并发提取
+
+    分P列表来自B站 pagelist 接口（或由调用方直接指定分P号）。会话由接口一次批量插入，
+    之后在后台并发提取所有分P的字幕：同时进行的BibiGPT请求数受 COLLECTION_FETCH_CONCURRENCY 限制，
+    字幕写入各自的会话后，按 COLLECTION_PROCESS_CONCURRENCY 并发跑各分P的处理流水线
+    （每个分P内部仍按原流程串行生成）。进度由数据库中同一 collection_id 的会话状态汇总，
+    与由哪个worker处理无关。
+    """
+
+    _fetch_limit: Optional[asyncio.Semaphore] = None
+    _process_limit: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _limits() -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        """本worker内所有合集共享的并发上限"""
+        if CollectionIngester._fetch_limit is None:
+            CollectionIngester._fetch_limit = asyncio.Semaphore(settings.COLLECTION_FETCH_CONCURRENCY)
+            CollectionIngester._process_limit = asyncio.Semaphore(settings.COLLECTION_PROCESS_CONCURRENCY)
+        return CollectionIngester._fetch_limit, CollectionIngester._process_limit
+
+    @staticmethod
+    async def get_parts(video_id: str) -> List[Dict[str, Any]]:
+        """
+        查询B站视频的分P列表
+
+        Returns:
+            [{"page": 1, "title": ..., "duration": ..., "thumbnail": ...}, ...]
+
+        Raises:
+            PartListError: 接口调用失败或返回错误
+        """
+        params = {"aid": video_id[2:]} if video_id.startswith("av") else {"bvid": video_id}
+        try:
+            async with httpx.AsyncClient(timeout=settings.BILIBILI_TIMEOUT) as client:
+                response = await client.get(f"{settings.BILIBILI_API_URL}/x/player/pagelist", params=params)
+                response.raise_for_status()
+                data = response.json()
+        except Exception as e:
+            raise PartListError(f"Failed to fetch part list for {video_id}: {e}")
+
+        if data.get("code") != 0 or not data.get("data"):
+            raise PartListError(f"Bilibili returned code {data.get('code')} for {video_id}")
+        return [
+            {
+                "page": item["page"],
+                "title": item.get("part") or f"P{item['page']}",
+                "duration": item.get("duration", 0),
+                "thumbnail": item.get("first_frame") or ""
+            }
+            for item in data["data"]
+        ]
+
+    @staticmethod
+    async def ingest(collection_id: uuid.UUID, parts: List[Tuple[uuid.UUID, str]], process: bool) -> None:
+        """
+        后台导入合集的所有分P
+
+        Args:
+            parts: [(会话ID, 分P视频URL), ...]
+            process: 字幕就绪后是否继续处理（生成代码）
+        """
+        started = time.monotonic()
+        CollectionStats.collections += 1
+        results = await asyncio.gather(
+            *(CollectionIngester._ingest_part(session_id, video_url, process) for session_id, video_url in parts),
+            return_exceptions=True
+        )
+        for (session_id, _), result in zip(parts, results):
+            if isinstance(result, Exception):
+                logger.error(f"Collection {collection_id} part {session_id} failed: {result}")
+
+        elapsed = time.monotonic() - started
+        CollectionStats.wall_seconds += elapsed
+        logger.info(f"Collection {collection_id}: {len(parts)} parts ingested in {elapsed:.1f}s")
+
+    @staticmethod
+    async def _ingest_part(session_id: uuid.UUID, video_url: str, process: bool) -> None:
+        fetch_limit, process_limit = CollectionIngester._limits()
+
+        error_message = None
+        subtitle_data = None
+        async with fetch_limit:
+            started = time.monotonic()
+            try:
+                subtitle_data = await bibigpt_service.get_subtitle_cached(video_url)
+            except SubtitleFetchError as e:
+                error_message = get_error_message(e.code)
+            except Exception as e:
+                logger.error(f"BibiGPT API error for {video_url}: {e}")
+                error_message = get_error_message(ErrorCode.BIBIGPT_API_ERROR)
+            CollectionStats.fetch_seconds += time.monotonic() - started
+
+        if subtitle_data and not VideoProcessor.validate_duration(
+            subtitle_data.get("duration", 0), settings.MAX_VIDEO_DURATION
+        ):
+            error_message = get_error_message(ErrorCode.VIDEO_TOO_LONG)
+
+        if error_message:
+            CollectionStats.parts_failed += 1
+        else:
+            CollectionStats.parts_fetched += 1
+
+        db = SessionLocal()
+        try:
+            session = db.query(models.Session).filter(models.Session.id == session_id).first()
+            if not session:
+                logger.warning(f"Collection session {session_id} not found")
+                return
+            if error_message:
+                session.status = models.SessionStatus.ERROR
+                session.error_message = error_message
+                await session_cache.persist(db, session)
+                return
+            await session_pipeline.store_subtitles(session, subtitle_data)
+            await session_cache.persist(db, session)
+            await session_cache.put_track(str(session_id), SubtitleTrack.of(subtitle_data))
+        finally:
+            db.close()
+
+        if process:
+            # 字幕已在会话上，流水线跳过提取直接从内容规划开始
+            async with process_limit:
+                await session_pipeline.run_in_background(session_id)
+
+collection_ingester = CollectionIngester()
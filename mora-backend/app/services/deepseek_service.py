@@ -1,6 +1,7 @@
 import httpx
 import json
 from app.config import get_settings
+from app.utils.subtitle_track import SubtitleTrack
 from typing import Dict, Any, AsyncIterator
 
 settings = get_settings()
@@ -19,13 +20,7 @@ class DeepSeekService:
         """构建代码生成Prompt"""
         title = subtitle_data.get("title", "Unknown")
         duration = subtitle_data.get("duration", 0)
-        subtitles = subtitle_data.get("subtitles", [])
-        
-        subtitle_lines = []
-        for sub in subtitles[:150]:  # Increased to 150 for better context
-            time_str = f"[{sub['startTime']}s]"
-            subtitle_lines.append(f"{time_str} {sub['text']}")
-        subtitle_text = "\n".join(subtitle_lines)
+        subtitle_text = SubtitleTrack.of(subtitle_data).render(0, 150)  # Increased to 150 for better context
         
         return f"""You are an expert Python programming instructor. Generate clean, well-formatted Python code based on the video tutorial.
 
@@ -240,21 +235,10 @@ print(f"明年我就{{age + 1}}岁了")
         import logging
         logger = logging.getLogger(__name__)
         
-        # 提取该时间段的字幕
-        subtitles = subtitle_data.get("subtitles", [])
-        start_time = segment.get("startTime", 0)
-        end_time = segment.get("endTime", 0)
-        
-        segment_subtitles_list = [
-            sub for sub in subtitles 
-            if start_time <= sub.get("startTime", 0) <= end_time
-        ]
-        
-        # 构建字幕文本
-        subtitle_lines = []
-        for sub in segment_subtitles_list[:30]:  # 最多30条
-            subtitle_lines.append(f"[{sub['startTime']:.1f}s] {sub['text']}")
-        segment_subtitles = "\n".join(subtitle_lines)
+        # 提取该时间段的字幕（二分查找），最多30条
+        segment_subtitles = SubtitleTrack.of(subtitle_data).render_window(
+            segment.get("startTime", 0), segment.get("endTime", 0), limit=30
+        )
         
         prompt = DeepSeekService.build_segment_code_prompt(segment, segment_subtitles)
         
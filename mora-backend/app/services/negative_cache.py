@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import time
+from typing import Dict, Any, List, NamedTuple, Optional
+from app.config import get_settings
+from app.utils.cache import cache_backend
+from app.utils.errors import ErrorCode
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BLOOM_KEY_PREFIX = "neg:bloom"
+TRANSIENT_KEY_PREFIX = "neg:transient"
+ALLOW_KEY_PREFIX = "neg:allow"
+
+
+class NegativeEntry(NamedTuple):
+    """已知无法提取字幕的视频"""
+    code: ErrorCode
+    permanent: bool
+    retry_after: Optional[int] = None
+
+
+class NegativeCacheStats:
+    """负缓存统计"""
+
+    lookups = 0
+    permanent_hits = 0
+    transient_hits = 0
+    recorded_permanent = 0
+    recorded_transient = 0
+    errors = 0
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        return {
+            "lookups": NegativeCacheStats.lookups,
+            "permanentHits": NegativeCacheStats.permanent_hits,
+            "transientHits": NegativeCacheStats.transient_hits,
+            "recordedPermanent": NegativeCacheStats.recorded_permanent,
+            "recordedTransient": NegativeCacheStats.recorded_transient,
+            "errors": NegativeCacheStats.errors,
+            "bloomBits": settings.NEGATIVE_BLOOM_BITS,
+            "bloomHashes": settings.NEGATIVE_BLOOM_HASHES,
+        }
+
+
+class NegativeCache:
+    """
+    字幕负缓存 - 记录没有可用字幕或BibiGPT失败的视频，新会话无需再等上游超时
+
+    - 永久失败（视频没有字幕）写入Redis位图实现的Bloom过滤器：每个视频只占
+      NEGATIVE_BLOOM_HASHES 个比特。位图按 NEGATIVE_CACHE_PERMANENT_TTL 轮换，
+      查询当前代和上一代，条目实际保留 1~2 个周期；Bloom过滤器无法删除，
+      误判或字幕后来补上时用 allow 标记放行
+    - 暂时失败（超时、5xx、限流）写入带短TTL的独立key，过期后自动重试
+
+    Redis不可用时一律放行，负缓存只是优化，不能挡住正常请求。
+    """
+
+    @staticmethod
+    def _generation(now: Optional[float] = None) -> int:
+        return int((now or time.time()) // settings.NEGATIVE_CACHE_PERMANENT_TTL)
+
+    @staticmethod
+    def _bloom_key(generation: int) -> str:
+        return f"{BLOOM_KEY_PREFIX}:{generation}"
+
+    @staticmethod
+    def _allow_key(video_key: str) -> str:
+        # 同一视频的放行标记和暂时失败记录用哈希标签放在同一分片
+        return f"{ALLOW_KEY_PREFIX}:{{{video_key}}}"
+
+    @staticmethod
+    def _transient_key(video_key: str) -> str:
+        return f"{TRANSIENT_KEY_PREFIX}:{{{video_key}}}"
+
+    @staticmethod
+    def _positions(video_key: str) -> List[int]:
+        """双重哈希：一次摘要得到两个64位哈希，组合出k个比特位置"""
+        digest = hashlib.blake2b(video_key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        bits = settings.NEGATIVE_BLOOM_BITS
+        return [(h1 + i * h2) % bits for i in range(settings.NEGATIVE_BLOOM_HASHES)]
+
+    @staticmethod
+    async def check_many(video_keys: List[str]) -> List[Optional[NegativeEntry]]:
+        """批量查询，所有视频的比特位和暂时失败key在一次往返中取回，结果顺序与输入一致"""
+        if not settings.ENABLE_NEGATIVE_CACHE or not video_keys:
+            return [None] * len(video_keys)
+
+        generation = NegativeCache._generation()
+        bloom_keys = (NegativeCache._bloom_key(generation), NegativeCache._bloom_key(generation - 1))
+        per_key = 2 * settings.NEGATIVE_BLOOM_HASHES + 3
+
+        try:
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                for video_key in video_keys:
+                    positions = NegativeCache._positions(video_key)
+                    for bloom_key in bloom_keys:
+                        for position in positions:
+                            pipe.getbit(bloom_key, position)
+                    pipe.exists(NegativeCache._allow_key(video_key))
+                    pipe.get(NegativeCache._transient_key(video_key))
+                    pipe.ttl(NegativeCache._transient_key(video_key))
+                replies = await pipe.execute()
+        except Exception as e:
+            NegativeCacheStats.errors += 1
+            logger.warning(f"Negative cache lookup error: {e}")
+            return [None] * len(video_keys)
+
+        k = settings.NEGATIVE_BLOOM_HASHES
+        results: List[Optional[NegativeEntry]] = []
+        for index in range(len(video_keys)):
+            reply = replies[index * per_key:(index + 1) * per_key]
+            current, previous = reply[:k], reply[k:2 * k]
+            allowed, transient, ttl = reply[2 * k:]
+            NegativeCacheStats.lookups += 1
+
+            if allowed:
+                results.append(None)
+            elif all(current) or all(previous):
+                NegativeCacheStats.permanent_hits += 1
+                results.append(NegativeEntry(ErrorCode.NO_SUBTITLE, permanent=True))
+            elif transient:
+                NegativeCacheStats.transient_hits += 1
+                results.append(NegativeEntry(
+                    ErrorCode(transient.decode()),
+                    permanent=False,
+                    retry_after=ttl if ttl and ttl > 0 else None
+                ))
+            else:
+                results.append(None)
+        return results
+
+    @staticmethod
+    async def check(video_key: str) -> Optional[NegativeEntry]:
+        """查询单个视频是否已知无法提取字幕"""
+        return (await NegativeCache.check_many([video_key]))[0]
+
+    @staticmethod
+    async def record(video_key: str, code: ErrorCode, permanent: bool) -> None:
+        """记录一次失败；永久失败同时清除之前的放行标记"""
+        if not settings.ENABLE_NEGATIVE_CACHE:
+            return
+
+        try:
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                if permanent:
+                    bloom_key = NegativeCache._bloom_key(NegativeCache._generation())
+                    for position in NegativeCache._positions(video_key):
+                        pipe.setbit(bloom_key, position, 1)
+                    # 位图在下一代结束时才过期，保证查询上一代时仍然存在
+                    pipe.expire(bloom_key, 2 * settings.NEGATIVE_CACHE_PERMANENT_TTL)
+                    pipe.delete(NegativeCache._allow_key(video_key))
+                else:
+                    pipe.setex(
+                        NegativeCache._transient_key(video_key),
+                        settings.NEGATIVE_CACHE_TRANSIENT_TTL,
+                        code.value
+                    )
+                await pipe.execute()
+        except Exception as e:
+            NegativeCacheStats.errors += 1
+            logger.warning(f"Negative cache record error for {video_key}: {e}")
+            return
+
+        if permanent:
+            NegativeCacheStats.recorded_permanent += 1
+        else:
+            NegativeCacheStats.recorded_transient += 1
+        logger.info(f"Negative cache: {video_key} -> {code.value} ({'permanent' if permanent else 'transient'})")
+
+    @staticmethod
+    async def allow(video_key: str) -> None:
+        """放行一个视频（强制重试时调用），覆盖Bloom过滤器的命中并清除暂时失败记录"""
+        try:
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                pipe.setex(
+                    NegativeCache._allow_key(video_key),
+                    2 * settings.NEGATIVE_CACHE_PERMANENT_TTL,
+                    1
+                )
+                pipe.delete(NegativeCache._transient_key(video_key))
+                await pipe.execute()
+        except Exception as e:
+            NegativeCacheStats.errors += 1
+            logger.warning(f"Negative cache allow error for {video_key}: {e}")
+
+negative_cache = NegativeCache()
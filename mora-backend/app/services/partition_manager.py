@@ -0,0 +1,203 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from app.config import get_settings
+from app.database import engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PartitionManager:
+    """sessions 分区维护 - 预建未来分区，归档并删除过期分区"""
+
+    PARENT_TABLE = "sessions"
+    PARTITION_PATTERN = re.compile(r"^sessions_p(\d{4})(\d{2})$")
+
+    @staticmethod
+    def current_month(today: Optional[date] = None) -> date:
+        """当前月份的1号；created_at 按UTC写入（datetime.utcnow），月份也按UTC计算"""
+        return (today or datetime.now(timezone.utc).date()).replace(day=1)
+
+    @staticmethod
+    def add_months(month_start: date, months: int) -> date:
+        """按月偏移，返回目标月份的1号"""
+        index = month_start.year * 12 + month_start.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def partition_name(month_start: date) -> str:
+        """月份对应的分区表名"""
+        return f"{PartitionManager.PARENT_TABLE}_p{month_start:%Y%m}"
+
+    @staticmethod
+    def list_partitions() -> Dict[date, str]:
+        """列出现有的月分区 {月份1号: 表名}"""
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :parent
+            """), {"parent": PartitionManager.PARENT_TABLE}).scalars().all()
+
+        partitions = {}
+        for name in rows:
+            match = PartitionManager.PARTITION_PATTERN.match(name)
+            if match:
+                partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return partitions
+
+    @staticmethod
+    def create_future_partitions(months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+        """
+        预建从当前月到未来 months_ahead 个月的分区
+
+        Returns:
+            新创建的分区表名列表
+        """
+        months_ahead = settings.SESSION_PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+        current = PartitionManager.current_month(today)
+        existing = PartitionManager.list_partitions()
+
+        created = []
+        with engine.begin() as conn:
+            for offset in range(months_ahead + 1):
+                month = PartitionManager.add_months(current, offset)
+                if month in existing:
+                    continue
+                name = PartitionManager.partition_name(month)
+                upper = PartitionManager.add_months(month, 1)
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PartitionManager.PARENT_TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+                ))
+                created.append(name)
+                logger.info(f"Created partition {name}")
+        return created
+
+    @staticmethod
+    def check_partitions(today: Optional[date] = None) -> None:
+        """
+        启动时检查分区：没有 DEFAULT 分区，当前月份的分区缺失时所有新会话的INSERT都会失败
+
+        Raises:
+            RuntimeError: 当前月份的分区不存在
+        """
+        current = PartitionManager.current_month(today)
+        existing = PartitionManager.list_partitions()
+        if current not in existing:
+            raise RuntimeError(
+                f"Partition {PartitionManager.partition_name(current)} for the current month is missing; "
+                f"run `python manage_partitions.py` before starting the server"
+            )
+        upcoming = PartitionManager.add_months(current, 1)
+        if upcoming not in existing:
+            logger.warning(
+                f"Partition {PartitionManager.partition_name(upcoming)} for next month is missing; "
+                f"inserts will fail after the month changes unless manage_partitions.py runs"
+            )
+
+    @staticmethod
+    def export_partition(name: str, archive_dir: Optional[str] = None) -> str:
+        """
+        以gzip压缩的CSV导出分区，先写临时文件再原子重命名
+
+        Returns:
+            归档文件路径
+        """
+        archive_dir = archive_dir or settings.SESSION_ARCHIVE_DIR
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, f"{name}.csv.gz")
+        tmp_path = f"{path}.tmp"
+
+        raw_conn = engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor()
+            with open(tmp_path, "wb") as raw_file:
+                # 先关闭gzip写出剩余数据和尾部，再对底层文件fsync
+                with gzip.GzipFile(fileobj=raw_file, mode="wb") as f:
+                    cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+                raw_file.flush()
+                os.fsync(raw_file.fileno())
+            cursor.close()
+        finally:
+            raw_conn.close()
+
+        os.replace(tmp_path, path)
+        logger.info(f"Exported partition {name} to {path}")
+        return path
+
+    @staticmethod
+    def materialize_reused_results(conn, name: str) -> int:
+        """
+        删除分区前，把仍链接到该分区中结果的会话复制为自有结果（写时复制的"写"）
+
+        Returns:
+            被物化的会话数
+        """
+        result = conn.execute(text(f"""
+            UPDATE {PartitionManager.PARENT_TABLE} AS dependent
+            SET subtitles = owner.subtitles,
+                subtitle_track = owner.subtitle_track,
+                transcript = owner.transcript,
+                timeline = owner.timeline,
+                generated_code = owner.generated_code,
+                result_session_id = NULL
+            FROM {name} AS owner
+            WHERE dependent.result_session_id = owner.id
+        """))
+        if result.rowcount:
+            logger.info(f"Materialized {result.rowcount} reused results from {name}")
+        return result.rowcount
+
+    @staticmethod
+    def expire_partitions(retention_months: Optional[int] = None, today: Optional[date] = None,
+                          archive: Optional[bool] = None, dry_run: bool = False) -> List[str]:
+        """
+        处理超出保留期的分区：按配置先导出归档，再从父表分离并删除
+
+        retention_months 为 0 时保留全部分区。
+
+        Returns:
+            已过期（或dry_run时将要过期）的分区表名列表
+        """
+        retention_months = settings.SESSION_RETENTION_MONTHS if retention_months is None else retention_months
+        archive = settings.SESSION_ARCHIVE_ENABLED if archive is None else archive
+        if retention_months <= 0:
+            return []
+
+        current = PartitionManager.current_month(today)
+        cutoff = PartitionManager.add_months(current, -retention_months)
+
+        expired = []
+        for month, name in sorted(PartitionManager.list_partitions().items()):
+            # 分区上界不晚于截止月份时，整个分区都已过期
+            if PartitionManager.add_months(month, 1) > cutoff:
+                continue
+            expired.append(name)
+            if dry_run:
+                continue
+
+            if archive:
+                PartitionManager.export_partition(name)
+            with engine.begin() as conn:
+                PartitionManager.materialize_reused_results(conn, name)
+                conn.execute(text(f"ALTER TABLE {PartitionManager.PARENT_TABLE} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+            logger.info(f"Dropped expired partition {name}")
+        return expired
+
+    @staticmethod
+    def run_maintenance(dry_run: bool = False) -> Dict[str, List[str]]:
+        """执行一次完整维护：预建分区 + 过期处理"""
+        created = [] if dry_run else PartitionManager.create_future_partitions()
+        expired = PartitionManager.expire_partitions(dry_run=dry_run)
+        return {"created": created, "expired": expired}
+
+partition_manager = PartitionManager()
@@ -0,0 +1,55 @@
+import logging
+from typing import Optional
+from sqlalchemy.orm import Session as DBSession, object_session
+from app import models
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ResultReuse:
+    """结果复用 - 同一视频和语言已有完成结果时，新会话直接链接到该结果"""
+
+    @staticmethod
+    def find_source(db: DBSession, video_key: str, language: str) -> Optional[models.Session]:
+        """查找同一视频（规范身份）、同一语言最近一次完成的会话"""
+        return db.query(models.Session).filter(
+            models.Session.video_key == video_key,
+            models.Session.language == language,
+            models.Session.status == models.SessionStatus.COMPLETED
+        ).order_by(
+            models.Session.created_at.desc()
+        ).first()
+
+    @staticmethod
+    def link(session: models.Session, source: models.Session) -> None:
+        """
+        将会话链接到已有结果并直接标记为完成
+
+        只复制很小的 video_info，字幕、时间轴和代码仍由结果所属会话保存；
+        始终指向结果的实际所有者，避免形成链接链。
+        """
+        session.result_session_id = source.result_session_id or source.id
+        session.video_info = source.video_info
+        session.status = models.SessionStatus.COMPLETED
+
+    @staticmethod
+    def resolve(session: models.Session) -> models.Session:
+        """返回实际保存结果的会话；结果所有者已不存在时返回会话自身"""
+        if not session.result_session_id:
+            return session
+
+        db = object_session(session)
+        if db is None:
+            return session
+
+        owner = db.query(models.Session).filter(
+            models.Session.id == session.result_session_id
+        ).first()
+        if owner is None:
+            logger.warning(f"Result owner {session.result_session_id} of session {session.id} not found")
+            return session
+        return owner
+
+result_reuse = ResultReuse()
@@ -0,0 +1,133 @@
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session as DBSession
+from app import models, schemas
+from app.config import get_settings
+from app.services.result_reuse import result_reuse
+from app.utils.cache import Cache, CacheKeys
+from app.utils.subtitle_track import SubtitleTrack
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """会话详情读穿缓存 - 缓存序列化后的 SessionDetailResponse"""
+
+    FINAL_STATUSES = (models.SessionStatus.COMPLETED, models.SessionStatus.ERROR)
+
+    @staticmethod
+    def build_detail(session: models.Session) -> schemas.SessionDetailResponse:
+        """由ORM对象构建会话详情响应（复用结果的会话读取结果所有者的数据）"""
+        owner = result_reuse.resolve(session)
+        video_info = None
+        if session.video_info:
+            video_info = schemas.VideoInfo(**session.video_info)
+
+        return schemas.SessionDetailResponse(
+            sessionId=str(session.id),
+            videoUrl=session.video_url,
+            status=session.status.value,
+            videoInfo=video_info,
+            generatedCode=owner.generated_code,
+            timeline=owner.timeline,
+            error=session.error_message,
+            createdAt=session.created_at,
+            updatedAt=session.updated_at
+        )
+
+    @staticmethod
+    async def get(session_id: str) -> Optional[schemas.SessionDetailResponse]:
+        """读取缓存的会话详情，未命中返回None"""
+        if not settings.ENABLE_CACHE:
+            return None
+        key = CacheKeys.session_result(session_id)
+        cached = await Cache.get(key)
+        if not cached:
+            return None
+        detail = schemas.SessionDetailResponse(**cached)
+        if SessionCache.is_final(detail):
+            Cache.record_access(key, settings.SESSION_RESULT_CACHE_TTL)
+        return detail
+
+    @staticmethod
+    def is_final(detail: schemas.SessionDetailResponse) -> bool:
+        return detail.status.value in {s.value for s in SessionCache.FINAL_STATUSES}
+
+    @staticmethod
+    def ttl_for(detail: schemas.SessionDetailResponse) -> int:
+        """已结束的会话不会再变化，使用长TTL"""
+        if SessionCache.is_final(detail):
+            return settings.SESSION_RESULT_CACHE_TTL
+        return settings.SESSION_CACHE_TTL
+
+    @staticmethod
+    async def put(detail: schemas.SessionDetailResponse) -> bool:
+        """写入会话详情；已结束会话的TTL随访问频率调整"""
+        if not settings.ENABLE_CACHE:
+            return False
+        return await Cache.set(
+            CacheKeys.session_result(detail.sessionId),
+            detail.model_dump(mode="json"),
+            ttl=SessionCache.ttl_for(detail),
+            adaptive=SessionCache.is_final(detail)
+        )
+
+    @staticmethod
+    async def put_many(details: List[schemas.SessionDetailResponse]) -> bool:
+        """批量写入会话详情，按TTL分组后各用一次pipeline"""
+        if not settings.ENABLE_CACHE:
+            return False
+        groups: Dict[int, Dict[str, Any]] = {}
+        for detail in details:
+            groups.setdefault(SessionCache.ttl_for(detail), {})[
+                CacheKeys.session_result(detail.sessionId)
+            ] = detail.model_dump(mode="json")
+        results = [await Cache.mset(mapping, ttl=ttl) for ttl, mapping in groups.items()]
+        return all(results)
+
+    @staticmethod
+    async def get_track(session_id: str) -> Optional[SubtitleTrack]:
+        """读取缓存的字幕轨道；本地缓存层保存解码后的对象，翻页时不再解压"""
+        if not settings.ENABLE_CACHE:
+            return None
+        track = await Cache.get(CacheKeys.session_subtitles(session_id))
+        return track if isinstance(track, SubtitleTrack) else None
+
+    @staticmethod
+    async def put_track(session_id: str, track: SubtitleTrack) -> bool:
+        """
+        缓存会话的字幕轨道
+
+        每个会话一份、体积远大于会话详情，不用已结束会话的7天TTL，
+        与视频字幕缓存相同只保留 VIDEO_CACHE_TTL；过期后由数据库中的 subtitle_track 重新加载
+        """
+        if not settings.ENABLE_CACHE:
+            return False
+        return await Cache.set(
+            CacheKeys.session_subtitles(session_id), track, ttl=settings.VIDEO_CACHE_TTL
+        )
+
+    @staticmethod
+    async def invalidate(session_id: str) -> None:
+        """删除缓存的会话详情"""
+        if settings.ENABLE_CACHE:
+            await Cache.delete(CacheKeys.session_result(session_id))
+
+    @staticmethod
+    async def persist(db: DBSession, session: models.Session) -> None:
+        """
+        提交会话变更并同步更新缓存
+
+        在flush之后、commit之前序列化，避免commit过期属性后再查一次库；
+        commit成功后才写缓存，保证缓存不会领先于数据库。
+        """
+        db.flush()
+        detail = SessionCache.build_detail(session)
+        db.commit()
+        if settings.ENABLE_CACHE and not await SessionCache.put(detail):
+            # 写入失败时删除旧值，防止轮询读到过期状态
+            logger.warning(f"Session cache update failed for {session.id}")
+            await SessionCache.invalidate(str(session.id))
+
+session_cache = SessionCache()
@@ -0,0 +1,317 @@
+from typing import Any, AsyncIterator, Dict, List
+from sqlalchemy.orm import Session as DBSession
+from app import models
+from app.database import SessionLocal
+from app.services.bibigpt_service import bibigpt_service, SubtitleFetchError
+from app.services.deepseek_service import deepseek_service
+from app.services.code_planner import code_planner
+from app.services.video_processor import VideoProcessor
+from app.services.session_cache import session_cache
+from app.services.result_reuse import result_reuse
+from app.services.subtitle_prefetcher import subtitle_prefetcher
+from app.services.code_sandbox import code_sandbox
+from app.utils.sse import sse_event
+from app.utils.cpu_executor import cpu_executor
+from app.utils.subtitle_track import SubtitleTrack, from_columns, split_columns, text_size, with_track
+from app.utils.errors import ErrorCode, get_error_message
+from app.config import get_settings
+import uuid
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class SessionPipeline:
+    """会话处理流水线 - 字幕提取 + 三步法代码生成，以SSE事件形式输出进度"""
+    
+    @staticmethod
+    def subtitle_event(session_id: str, subtitle_data: Dict[str, Any]) -> str:
+        """
+        字幕就绪事件：只发送摘要，字幕本身由前端按播放进度分页拉取
+        （GET /api/session/{id}/subtitles），长视频不再产生数百KB的SSE帧
+        """
+        track = SubtitleTrack.of(subtitle_data)
+        return sse_event("subtitle", {
+            "title": subtitle_data.get("title"),
+            "duration": subtitle_data.get("duration"),
+            "count": len(track),
+            "endTime": track.end_time(),
+            "preprocess": subtitle_data.get("preprocess"),
+            "url": f"/api/session/{session_id}/subtitles"
+        })
+    
+    @staticmethod
+    def subtitle_columns(subtitle_data: Dict[str, Any]) -> Dict[str, Any]:
+        """字幕对应的各列值（元数据、压缩的二进制轨道、检索用纯文本和视频信息）"""
+        # 字幕是列表时只构建一次轨道，压缩和纯文本共用
+        subtitle_data = with_track(subtitle_data)
+        subtitles, subtitle_track = split_columns(subtitle_data)
+        return {
+            "subtitles": subtitles,
+            "subtitle_track": subtitle_track,
+            "transcript": subtitle_data["subtitles"].plain_text(),
+            "video_info": {
+                "title": subtitle_data.get("title"),
+                "duration": subtitle_data.get("duration"),
+                "thumbnail": subtitle_data.get("thumbnail"),
+                "author": subtitle_data.get("author")
+            }
+        }
+    
+    @staticmethod
+    async def store_subtitles(session: models.Session, subtitle_data: Dict[str, Any]) -> None:
+        """把提取到的字幕写到会话对象上；长视频的压缩和拼接交给执行器"""
+        columns = await cpu_executor.run(
+            SessionPipeline.subtitle_columns, subtitle_data, size=text_size(subtitle_data)
+        )
+        for name, value in columns.items():
+            setattr(session, name, value)
+    
+    @staticmethod
+    async def segment_event(event_type: str, data: Dict[str, Any], segments: List[Dict[str, Any]]) -> str:
+        """带代码的SSE事件；代码总量大时在执行器中序列化"""
+        return await cpu_executor.run(
+            sse_event, event_type, data, size=sum(len(segment.get("code") or "") for segment in segments)
+        )
+    
+    @staticmethod
+    async def replay(session: models.Session) -> AsyncIterator[str]:
+        """
+        回放已完成会话的结果（包括复用其它会话结果的会话），不重新生成
+        
+        Yields:
+            与完整流程相同类型的SSE消息字符串
+        """
+        owner = result_reuse.resolve(session)
+        code_segments = (owner.timeline or {}).get("segments", [])
+        
+        yield sse_event("thought", {"content": "该视频已有生成结果，直接加载..."})
+        subtitle_data = from_columns(owner.subtitles, owner.subtitle_track)
+        if subtitle_data:
+            yield SessionPipeline.subtitle_event(str(session.id), subtitle_data)
+        yield sse_event("plan", {"segments": [
+            {
+                "startTime": seg.get("startTime"),
+                "endTime": seg.get("endTime"),
+                "summary": seg.get("summary")
+            }
+            for seg in code_segments
+        ]})
+        for code_segment_data in code_segments:
+            yield await SessionPipeline.segment_event("code_segment", code_segment_data, [code_segment_data])
+        yield sse_event("code_done", {})
+        yield await SessionPipeline.segment_event("segments_complete", {
+            "totalSegments": len(code_segments),
+            "segments": code_segments
+        }, code_segments)
+        yield sse_event("done", {})
+    
+    @staticmethod
+    async def run(session: models.Session, db: DBSession) -> AsyncIterator[str]:
+        """
+        执行完整处理流程
+        
+        Args:
+            session: 待处理的会话
+            db: 会话所属的数据库连接
+        
+        Yields:
+            格式化的SSE消息字符串
+        """
+        if session.status == models.SessionStatus.COMPLETED:
+            async for event in SessionPipeline.replay(session):
+                yield event
+            return
+        
+        # 创建会话时启动的预取（本worker内）；没有时照常提取
+        prefetched = subtitle_prefetcher.claim(str(session.id))
+        
+        try:
+            # 重新生成时写入自己的结果，断开与复用结果的链接
+            session.result_session_id = None
+            session.status = models.SessionStatus.PROCESSING
+            await session_cache.persist(db, session)
+            
+            subtitle_data = from_columns(session.subtitles, session.subtitle_track)
+            if subtitle_data:
+                # 上传字幕创建的会话（或之前已提取过字幕）直接进入规划阶段
+                yield sse_event("thought", {"content": "已有字幕，跳过字幕提取..."})
+                yield SessionPipeline.subtitle_event(str(session.id), subtitle_data)
+            else:
+                yield sse_event("thought", {"content": "正在验证视频URL..."})
+                
+                if not VideoProcessor.is_valid_url(session.video_url):
+                    raise Exception(get_error_message(ErrorCode.INVALID_VIDEO_URL))
+                
+                yield sse_event("thought", {"content": "正在提取字幕，请稍候..."})
+                
+                try:
+                    if prefetched:
+                        subtitle_data = await prefetched.subtitles
+                    else:
+                        subtitle_data = await bibigpt_service.get_subtitle_cached(session.video_url)
+                except SubtitleFetchError as e:
+                    logger.error(f"BibiGPT API error: {e}")
+                    raise Exception(get_error_message(e.code))
+                except Exception as e:
+                    logger.error(f"BibiGPT API error: {e}")
+                    raise Exception(get_error_message(ErrorCode.BIBIGPT_API_ERROR))
+                
+                duration = subtitle_data.get("duration", 0)
+                if not VideoProcessor.validate_duration(duration, settings.MAX_VIDEO_DURATION):
+                    raise Exception(get_error_message(ErrorCode.VIDEO_TOO_LONG))
+                
+                await SessionPipeline.store_subtitles(session, subtitle_data)
+                await session_cache.persist(db, session)
+                # 先写库和缓存再通知前端，收到事件后立即分页拉取能命中
+                await session_cache.put_track(str(session.id), SubtitleTrack.of(subtitle_data))
+                yield SessionPipeline.subtitle_event(str(session.id), subtitle_data)
+            
+            # ============ 三步法流程 ============
+            
+            # 步骤1：字幕分析和内容总结
+            yield sse_event("thought", {"content": "步骤1/3：正在分析字幕内容，识别知识点..."})
+            
+            try:
+                if prefetched and prefetched.plan:
+                    segments = await prefetched.plan
+                else:
+                    segments = await code_planner.plan(subtitle_data)
+                logger.info(f"Step 1 complete: Identified {len(segments)} content segments")
+                
+                # 发送总结信息给前端
+                yield sse_event("plan", {"segments": segments})
+            
+            except Exception as e:
+                logger.error(f"Subtitle analysis error: {e}")
+                raise Exception("字幕分析失败，请重试")
+            
+            # 步骤2：逐段生成代码
+            yield sse_event("thought", {"content": f"步骤2/3：开始生成代码，共{len(segments)}个知识点..."})
+            
+            code_segments = []  # 存储每段代码的完整信息
+            
+            try:
+                for i, segment in enumerate(segments, 1):
+                    summary = segment.get("summary", "Unknown")
+                    start_time = segment.get("startTime", 0)
+                    end_time = segment.get("endTime", 0)
+                    
+                    # 通知前端正在生成哪个段落
+                    time_range = f"{start_time//60}:{start_time%60:02d}-{end_time//60}:{end_time%60:02d}"
+                    yield sse_event("thought", {
+                        "content": f"正在生成第{i}/{len(segments)}段（{time_range} - {summary}）..."
+                    })
+                    
+                    # 收集原始输出
+                    raw_output = ""
+                    async for code_chunk in deepseek_service.generate_segment_code_stream(subtitle_data, segment):
+                        raw_output += code_chunk
+                    
+                    # 从<code>标记中提取实际代码并验证语法（输出大时在执行器中进行）
+                    segment_code, is_valid, error_msg = await cpu_executor.run(
+                        VideoProcessor.postprocess_segment, raw_output, size=len(raw_output)
+                    )
+                    if not is_valid:
+                        logger.warning(f"Segment {i} syntax error: {error_msg}")
+                    
+                    # 存储这段代码的完整信息
+                    code_segment_data = {
+                        "segmentIndex": i - 1,  # 0-based index
+                        "startTime": start_time,
+                        "endTime": end_time,
+                        "summary": summary,
+                        "code": segment_code.strip(),
+                        "timeRange": time_range
+                    }
+                    
+                    # 语法正确的代码在沙箱中试运行，运行错误、死循环在推给前端之前就能发现
+                    if is_valid:
+                        execution = await code_sandbox.execute(code_segment_data["code"])
+                        if execution:
+                            code_segment_data["execution"] = execution
+                            if execution["exitCode"] != 0:
+                                logger.warning(f"Segment {i} exited with {execution['exitCode']}"
+                                               f"{' (timed out)' if execution['timedOut'] else ''}")
+                    
+                    code_segments.append(code_segment_data)
+                    
+                    # 发送单独的代码段
+                    logger.info(f"Sending code_segment {i}: {time_range} - {summary}")
+                    yield await SessionPipeline.segment_event("code_segment", code_segment_data, [code_segment_data])
+                    logger.info(f"Code segment {i} sent successfully")
+                
+                if not code_segments:
+                    raise Exception("No code segments generated")
+                
+                logger.info(f"All {len(code_segments)} code segments generated")
+            
+            except Exception as e:
+                logger.error(f"Code generation error: {e}")
+                raise Exception(get_error_message(ErrorCode.DEEPSEEK_API_ERROR))
+            
+            yield sse_event("code_done", {})
+            
+            # 保存代码段信息到session
+            session.generated_code = str(code_segments)  # 存储为JSON字符串
+            await session_cache.persist(db, session)
+            
+            # 步骤3：发送所有代码段的汇总信息
+            yield sse_event("thought", {"content": "步骤3/3：所有代码段生成完成..."})
+            
+            logger.info(f"Step 3: All {len(code_segments)} code segments ready")
+            
+            # 发送代码段汇总
+            yield await SessionPipeline.segment_event("segments_complete", {
+                "totalSegments": len(code_segments),
+                "segments": code_segments
+            }, code_segments)
+            
+            session.timeline = {"segments": code_segments}
+            await session_cache.persist(db, session)
+            
+            logger.info("Step 3 complete: All segments ready")
+            
+            session.status = models.SessionStatus.COMPLETED
+            await session_cache.persist(db, session)
+            
+            yield sse_event("done", {})
+            
+            logger.info(f"Session {session.id} completed successfully")
+        
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Session {session.id} error: {error_message}")
+            if prefetched:
+                prefetched.cancel()
+            
+            session.status = models.SessionStatus.ERROR
+            session.error_message = error_message
+            await session_cache.persist(db, session)
+            
+            yield sse_event("error", {
+                "code": "PROCESSING_ERROR",
+                "message": error_message
+            })
+
+    @staticmethod
+    async def run_in_background(session_id: uuid.UUID) -> None:
+        """在没有SSE客户端的情况下后台执行流程（独立的数据库连接）"""
+        db = SessionLocal()
+        try:
+            session = db.query(models.Session).filter(
+                models.Session.id == session_id
+            ).first()
+            if not session:
+                logger.warning(f"Background session {session_id} not found")
+                return
+            
+            async for _ in SessionPipeline.run(session, db):
+                pass
+        except Exception as e:
+            logger.error(f"Background session {session_id} failed: {e}")
+        finally:
+            db.close()
+
+session_pipeline = SessionPipeline()
@@ -0,0 +1,128 @@
+import re
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import cast, func, tuple_
+from sqlalchemy.dialects.postgresql import REAL
+from sqlalchemy.orm import Session as DBSession
+from app import models
+from app.utils.subtitle_track import SubtitleTrack
+
+# websearch_to_tsquery 语法中的引号、括号、"-"前缀和 or 不是检索词
+QUERY_TOKEN = re.compile(r"[^\s\"()]+")
+SNIPPET_CHARS = 120
+
+
+class SessionSearch:
+    """
+    全文检索 - 在所有会话的字幕和生成代码中查找主题
+
+    search_vector 是数据库维护的生成列（字幕权重A、代码权重B），按分区建GIN索引；
+    查询词经过与索引相同的 mora_search_terms() 处理，中文按二元组匹配。
+    结果按 (rank, created_at, id) 倒序游标分页，片段带时间点，由本页的字幕轨道和代码段生成。
+    """
+
+    @staticmethod
+    def query_terms(query: str) -> List[str]:
+        """查询中的检索词（小写），用于定位片段"""
+        terms = []
+        for token in QUERY_TOKEN.findall(query):
+            token = token.lstrip("-").lower()
+            if token and token != "or" and token not in terms:
+                terms.append(token)
+        return terms
+
+    @staticmethod
+    def search(db: DBSession, query: str, language: Optional[str] = None,
+               after: Optional[Tuple[float, datetime, uuid.UUID]] = None,
+               limit: int = 20) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        执行检索
+
+        Args:
+            after: 上一页最后一条的 (rank, created_at, id)
+
+        Returns:
+            (结果列表, 是否还有下一页)
+        """
+        tsquery = func.websearch_to_tsquery("simple", func.mora_search_terms(query))
+        rank = func.ts_rank(models.Session.search_vector, tsquery, 1).label("rank")
+
+        statement = db.query(
+            models.Session.id,
+            models.Session.video_url,
+            models.Session.language,
+            models.Session.status,
+            models.Session.video_info,
+            models.Session.subtitle_track,
+            models.Session.timeline,
+            models.Session.created_at,
+            rank
+        ).filter(models.Session.search_vector.op("@@")(tsquery))
+
+        if language:
+            statement = statement.filter(models.Session.language == language)
+        if after:
+            # ts_rank 返回real，游标中的值按real比较，否则精度差异会让上一页末尾重复出现
+            after_rank, after_created_at, after_id = after
+            statement = statement.filter(
+                tuple_(rank, models.Session.created_at, models.Session.id)
+                < tuple_(cast(after_rank, REAL), after_created_at, after_id)
+            )
+
+        rows = statement.order_by(
+            rank.desc(),
+            models.Session.created_at.desc(),
+            models.Session.id.desc()
+        ).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        terms = SessionSearch.query_terms(query)
+        return [SessionSearch._result(row, terms) for row in rows[:limit]], has_more
+
+    @staticmethod
+    def _result(row: Any, terms: List[str]) -> Dict[str, Any]:
+        track = SubtitleTrack.from_bytes(bytes(row.subtitle_track)) if row.subtitle_track else None
+        return {
+            "sessionId": str(row.id),
+            "videoUrl": row.video_url,
+            "title": (row.video_info or {}).get("title"),
+            "language": row.language,
+            "status": row.status.value,
+            "createdAt": row.created_at,
+            "rank": row.rank,
+            "transcriptSnippet": SessionSearch.transcript_snippet(track, terms) if track else None,
+            "codeSnippet": SessionSearch.code_snippet(row.timeline, terms),
+        }
+
+    @staticmethod
+    def _excerpt(text: str, terms: List[str]) -> Optional[str]:
+        """text中包含任一检索词时，返回以第一个命中为中心的片段"""
+        lowered = text.lower()
+        positions = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+        if not positions:
+            return None
+        start = max(0, min(positions) - SNIPPET_CHARS // 3)
+        excerpt = text[start:start + SNIPPET_CHARS].strip()
+        return ("…" if start > 0 else "") + excerpt + ("…" if start + SNIPPET_CHARS < len(text) else "")
+
+    @staticmethod
+    def transcript_snippet(track: SubtitleTrack, terms: List[str]) -> Optional[Dict[str, Any]]:
+        """第一条命中的字幕及其时间点"""
+        for index in range(len(track)):
+            excerpt = SessionSearch._excerpt(track.text_at(index), terms)
+            if excerpt:
+                return {"startTime": track.starts[index], "text": excerpt}
+        return None
+
+    @staticmethod
+    def code_snippet(timeline: Optional[Dict[str, Any]], terms: List[str]) -> Optional[Dict[str, Any]]:
+        """第一行命中的代码及其所在代码段的开始时间"""
+        for segment in (timeline or {}).get("segments", []):
+            for line in (segment.get("code") or "").splitlines():
+                excerpt = SessionSearch._excerpt(line, terms)
+                if excerpt:
+                    return {"startTime": segment.get("startTime", 0), "text": excerpt}
+        return None
+
+session_search = SessionSearch()
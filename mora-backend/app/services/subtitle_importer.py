@@ -0,0 +1,115 @@
+import codecs
+import hashlib
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import UploadFile
+from app.config import get_settings
+from app.services.subtitle_preprocessor import subtitle_preprocessor
+from app.utils.errors import ErrorCode
+from app.utils.subtitle_parser import CueStreamParser, JsonArrayStreamParser, subtitle_from_item
+from app.utils.subtitle_track import with_track
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+# BibiGPT响应、只含字幕数组的对象或顶层数组都可以
+JSON_ARRAY_KEYS = ("subtitlesArray", "subtitles")
+
+
+class SubtitleImportError(Exception):
+    """上传的字幕文件无法使用"""
+
+    def __init__(self, code: ErrorCode, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class SubtitleImporter:
+    """上传字幕导入 - 流式解析SRT/WebVTT/JSON文件，生成与BibiGPT相同结构的字幕数据"""
+
+    @staticmethod
+    def detect_format(filename: str, head: bytes) -> str:
+        """先看扩展名，再看文件开头的内容"""
+        name = (filename or "").lower()
+        for extension in ("srt", "vtt", "json"):
+            if name.endswith(f".{extension}"):
+                return extension
+        head = head.lstrip(codecs.BOM_UTF8).lstrip()
+        if head[:1] in (b"{", b"["):
+            return "json"
+        if head.startswith(b"WEBVTT"):
+            return "vtt"
+        return "srt"
+
+    @staticmethod
+    async def read(file: UploadFile, title: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        分块读取上传文件并解析
+
+        Returns:
+            (字幕数据, 文件内容的sha256)
+
+        Raises:
+            SubtitleImportError: 格式错误、没有字幕或文件过大
+        """
+        digest = hashlib.sha256()
+        subtitles: List[Dict[str, Any]] = []
+        size = 0
+        fmt = None
+        cue_parser = CueStreamParser()
+        text_decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        json_parser = JsonArrayStreamParser(JSON_ARRAY_KEYS)
+        metadata: Any = None
+
+        try:
+            while True:
+                chunk = await file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.SUBTITLE_UPLOAD_MAX_BYTES:
+                    raise SubtitleImportError(
+                        ErrorCode.SUBTITLE_FILE_TOO_LARGE,
+                        f"字幕文件超过 {settings.SUBTITLE_UPLOAD_MAX_BYTES // (1024 * 1024)}MB"
+                    )
+                digest.update(chunk)
+                if fmt is None:
+                    fmt = SubtitleImporter.detect_format(file.filename, chunk[:64])
+
+                if fmt == "json":
+                    subtitles.extend(subtitle_from_item(item) for item in json_parser.feed(chunk))
+                else:
+                    subtitles.extend(cue_parser.feed(text_decoder.decode(chunk)))
+
+            if fmt == "json":
+                metadata = json_parser.close()
+            else:
+                subtitles.extend(cue_parser.feed(text_decoder.decode(b"", final=True)))
+                subtitles.extend(cue_parser.close())
+        except SubtitleImportError:
+            raise
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Invalid subtitle upload {file.filename}: {e}")
+            raise SubtitleImportError(ErrorCode.INVALID_SUBTITLE_FILE, str(e))
+
+        if not subtitles:
+            raise SubtitleImportError(ErrorCode.NO_SUBTITLE, "文件中没有字幕")
+
+        # JSON可以是完整的BibiGPT响应，元数据在 detail 下
+        detail = metadata.get("detail", metadata) if isinstance(metadata, dict) else {}
+        if not isinstance(detail, dict):
+            detail = {}
+        last_end = max(sub["endTime"] for sub in subtitles)
+        subtitle_data = {
+            "title": title or detail.get("title") or file.filename or "Uploaded subtitles",
+            "duration": max(detail.get("duration") or 0, math.ceil(last_end)),
+            "thumbnail": detail.get("cover"),
+            "author": detail.get("author"),
+            "subtitles": subtitles,
+        }
+        logger.info(f"Imported {len(subtitles)} {fmt} cues from {file.filename} ({size} bytes)")
+        return with_track(subtitle_preprocessor.apply(subtitle_data)), digest.hexdigest()
+
+subtitle_importer = SubtitleImporter()
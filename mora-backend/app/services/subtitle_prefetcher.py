@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from app.config import get_settings
+from app.services.bibigpt_service import bibigpt_service
+from app.services.code_planner import code_planner
+from app.services.video_processor import VideoProcessor
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PrefetchEntry:
+    """一个会话的预取任务：字幕提取，以及可选的内容规划"""
+
+    def __init__(self, subtitles: asyncio.Task, plan: Optional[asyncio.Task]):
+        self.subtitles = subtitles
+        self.plan = plan
+        self.started_at = time.monotonic()
+
+    def tasks(self) -> List[asyncio.Task]:
+        return [task for task in (self.subtitles, self.plan) if task is not None]
+
+    def cancel(self) -> None:
+        for task in self.tasks():
+            task.cancel()
+
+
+class PrefetchStats:
+    """预取统计"""
+
+    started = 0
+    claimed = 0
+    claimed_done = 0
+    expired = 0
+    skipped = 0
+    # 客户端连上SSE之前已经在后台跑掉的时间
+    saved_seconds = 0.0
+
+
+class SubtitlePrefetcher:
+    """
+    字幕预取 - 创建会话后立即在后台提取字幕，不等客户端连接SSE
+
+    任务按会话ID登记在本worker内，SSE流程通过 claim() 取走正在进行或已完成的结果。
+    SSE连接落在其它worker时取不到登记项，但预取已经写入共享的字幕缓存，
+    get_subtitle_cached 会直接命中或等待同一把刷新锁，同样不会重复请求BibiGPT。
+    """
+
+    _entries: Dict[str, PrefetchEntry] = {}
+
+    @staticmethod
+    def start(session_id: str, video_url: str) -> bool:
+        """为会话启动预取；关闭预取或登记项已满时返回False"""
+        if not settings.ENABLE_SUBTITLE_PREFETCH or session_id in SubtitlePrefetcher._entries:
+            return False
+        if len(SubtitlePrefetcher._entries) >= settings.PREFETCH_MAX_TASKS:
+            PrefetchStats.skipped += 1
+            return False
+
+        subtitles = asyncio.create_task(bibigpt_service.get_subtitle_cached(video_url))
+        plan = None
+        if settings.PREFETCH_PLANNING:
+            plan = asyncio.create_task(SubtitlePrefetcher._plan(subtitles))
+
+        entry = PrefetchEntry(subtitles, plan)
+        for task in entry.tasks():
+            task.add_done_callback(SubtitlePrefetcher._consume_exception)
+        SubtitlePrefetcher._entries[session_id] = entry
+        # 客户端一直不连接时，过期后丢弃登记项（已写入缓存的字幕仍然有效）
+        asyncio.get_running_loop().call_later(
+            settings.PREFETCH_TTL, SubtitlePrefetcher._expire, session_id, entry
+        )
+        PrefetchStats.started += 1
+        return True
+
+    @staticmethod
+    async def _plan(subtitles: asyncio.Task) -> List[Dict[str, Any]]:
+        """字幕就绪后继续做内容规划；时长超限的视频不浪费一次大模型调用"""
+        subtitle_data = await asyncio.shield(subtitles)
+        if not VideoProcessor.validate_duration(subtitle_data.get("duration", 0), settings.MAX_VIDEO_DURATION):
+            raise ValueError("Video too long, planning skipped")
+        return await code_planner.plan(subtitle_data)
+
+    @staticmethod
+    def claim(session_id: str) -> Optional[PrefetchEntry]:
+        """取走会话的预取任务（只能取一次），没有时返回None"""
+        entry = SubtitlePrefetcher._entries.pop(session_id, None)
+        if entry is None:
+            return None
+
+        PrefetchStats.claimed += 1
+        waited = time.monotonic() - entry.started_at
+        PrefetchStats.saved_seconds += waited
+        if entry.subtitles.done():
+            PrefetchStats.claimed_done += 1
+        logger.info(f"Session {session_id} claimed prefetch started {waited:.1f}s earlier "
+                    f"({'done' if entry.subtitles.done() else 'running'})")
+        return entry
+
+    @staticmethod
+    def _expire(session_id: str, entry: PrefetchEntry) -> None:
+        if SubtitlePrefetcher._entries.get(session_id) is entry:
+            del SubtitlePrefetcher._entries[session_id]
+            entry.cancel()
+            PrefetchStats.expired += 1
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Task) -> None:
+        # 失败由取走任务的流程处理；没人取走时避免 "exception never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+subtitle_prefetcher = SubtitlePrefetcher()
@@ -0,0 +1,149 @@
+import logging
+import math
+import re
+from typing import Any, Dict, List, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CJK_CHAR = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+SENTENCE_END = re.compile(r"[。！？!?.…]$")
+# ASR标注的非语音片段，例如 [音乐]、(Applause)；只认白名单里的标注，
+# 编程字幕里大量的 arr[i]、f(x)、list[1] 不能当作标注删掉
+NOISE_TAG = re.compile(
+    r"[\[\(（【]\s*(?:音乐|背景音乐|掌声|鼓掌|笑声|笑|欢呼|音效|静音|听不清|"
+    r"music|applause|laughter|laughs|laughing|cheering|silence|inaudible|noise)\s*[\]\)）】]",
+    re.IGNORECASE
+)
+# 句首语气词，后面必须是停顿（标点、空白）或行尾："额外"、"那个变量"、"就是说明" 保持原样
+CJK_FILLER = re.compile(r"^(?:[嗯啊呃额哦唉诶呀]+|那个|就是说?)(?:[，,。.、…\s]+|$)")
+# 英文语气词只认由空白或标点隔开的独立词，err、hmm_count、um.value 之类的标识符不受影响
+EN_FILLER = re.compile(
+    r"(?<![^\s,，])(?:u+m+|u+h+|erm+|h+m+)(?=[\s,，]|[.!?。](?:\s|$)|$)[,.]?\s*",
+    re.IGNORECASE
+)
+PUNCTUATION_ONLY = re.compile(r"^[\W_]*$")
+WHITESPACE = re.compile(r"\s+")
+# 相邻片段首尾重叠至少这么多字符才按重叠处理（CJK单字信息量大，阈值更低）
+MIN_OVERLAP = 4
+MIN_CJK_OVERLAP = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：CJK字符约1个token，其它文本约4个字符1个token"""
+    cjk = len(CJK_CHAR.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _prompt_tokens(subtitles: List[Dict[str, Any]]) -> int:
+    """按 code_planner 中 "[12.3s] text" 的提示词格式估算字幕占用的token"""
+    return sum(estimate_tokens(f"[{sub.get('startTime', 0):.1f}s] {sub.get('text', '')}\n") for sub in subtitles)
+
+
+def _clean(text: str) -> str:
+    """去掉噪声标注、语气词和多余空白，只剩标点时返回空串"""
+    text = NOISE_TAG.sub(" ", text or "")
+    text = WHITESPACE.sub(" ", text).strip()
+    text = CJK_FILLER.sub("", text)
+    text = EN_FILLER.sub("", text).strip()
+    return "" if PUNCTUATION_ONLY.match(text) else text
+
+
+def _join(left: str, right: str) -> str:
+    """CJK文本直接拼接，其它文本之间加空格"""
+    if CJK_CHAR.match(left[-1:]) or CJK_CHAR.match(right[:1]):
+        return left + right
+    return f"{left} {right}"
+
+
+def _strip_overlap(current: str, incoming: str) -> str:
+    """去掉incoming开头与current结尾重复的部分（滚动字幕常见）"""
+    longest = min(len(current), len(incoming))
+    minimum = MIN_CJK_OVERLAP if CJK_CHAR.match(incoming[:1]) else MIN_OVERLAP
+    for size in range(longest, minimum - 1, -1):
+        if current.endswith(incoming[:size]):
+            return incoming[size:].lstrip()
+    return incoming
+
+
+class SubtitlePreprocessor:
+    """
+    字幕预处理 - 在提示大模型之前把ASR碎片整理成句子级单元
+
+    - 清理：去掉 [音乐] 之类的标注、句首语气词、空行和只有标点的行
+    - 去重：与上一片段相同的行只延长时间；首尾重叠的滚动字幕只保留新增部分
+    - 合并：间隔不超过 SUBTITLE_MERGE_MAX_GAP 秒、上一单元未以句末标点结束时并入同一单元，
+      单元长度受 SUBTITLE_UNIT_MAX_SECONDS 和 SUBTITLE_UNIT_MAX_CHARS 限制
+    """
+
+    @staticmethod
+    def merge(subtitles: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """返回 (句子级字幕, 各类处理计数)"""
+        units: List[Dict[str, Any]] = []
+        counts = {"dropped": 0, "duplicates": 0, "merged": 0}
+        last_text = None
+
+        for sub in sorted(subtitles, key=lambda s: s.get("startTime", 0)):
+            text = _clean(sub.get("text", ""))
+            start = sub.get("startTime", 0)
+            end = max(sub.get("endTime", 0), start)
+            if not text:
+                counts["dropped"] += 1
+                continue
+
+            current = units[-1] if units else None
+            if current is not None and text == last_text:
+                current["endTime"] = max(current["endTime"], end)
+                counts["duplicates"] += 1
+                continue
+            last_text = text
+
+            if current is not None:
+                text = _strip_overlap(current["text"], text)
+                if not text:
+                    current["endTime"] = max(current["endTime"], end)
+                    counts["duplicates"] += 1
+                    continue
+
+            can_merge = (
+                current is not None
+                and start - current["endTime"] <= settings.SUBTITLE_MERGE_MAX_GAP
+                and not SENTENCE_END.search(current["text"])
+                and end - current["startTime"] <= settings.SUBTITLE_UNIT_MAX_SECONDS
+                and len(current["text"]) + len(text) <= settings.SUBTITLE_UNIT_MAX_CHARS
+            )
+            if can_merge:
+                current["text"] = _join(current["text"], text)
+                current["endTime"] = max(current["endTime"], end)
+                counts["merged"] += 1
+            else:
+                units.append({"startTime": start, "endTime": end, "text": text})
+
+        return units, counts
+
+    @staticmethod
+    def apply(subtitle_data: Dict[str, Any]) -> Dict[str, Any]:
+        """整理 _format_response 的结果，并在 "preprocess" 中记录token节省情况"""
+        if not settings.SUBTITLE_PREPROCESS_ENABLED:
+            return subtitle_data
+
+        original = subtitle_data.get("subtitles", [])
+        units, counts = SubtitlePreprocessor.merge(original)
+        tokens_in = _prompt_tokens(original)
+        tokens_out = _prompt_tokens(units)
+        stats = {
+            "fragments": len(original),
+            "units": len(units),
+            **counts,
+            "tokensIn": tokens_in,
+            "tokensOut": tokens_out,
+            "tokenReduction": round(1 - tokens_out / tokens_in, 4) if tokens_in else 0.0,
+        }
+        logger.info(
+            f"Subtitle preprocess '{subtitle_data.get('title')}': {len(original)} fragments -> {len(units)} units, "
+            f"~{tokens_in} -> ~{tokens_out} tokens ({stats['tokenReduction']:.1%} saved)"
+        )
+        return {**subtitle_data, "subtitles": units, "preprocess": stats}
+
+subtitle_preprocessor = SubtitlePreprocessor()
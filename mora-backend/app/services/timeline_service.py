@@ -1,6 +1,7 @@
 import httpx
 import json
 from app.config import get_settings
+from app.utils.subtitle_track import SubtitleTrack
 from typing import Dict, Any
 
 settings = get_settings()
@@ -11,16 +12,13 @@ class TimelineService:
     @staticmethod
     def build_timeline_prompt(subtitle_data: Dict[str, Any], code: str) -> str:
         """构建时间轴映射Prompt"""
-        subtitles = subtitle_data.get("subtitles", [])
+        track = SubtitleTrack.of(subtitle_data)
         
-        # 采样字幕，每10秒一条
-        subtitle_summary = []
-        for i, sub in enumerate(subtitles):
-            if i % 10 == 0:
-                subtitle_summary.append({
-                    "time": sub["startTime"],
-                    "text": sub["text"]
-                })
+        # 采样字幕，每10条一条
+        subtitle_summary = [
+            {"time": track.starts[i], "text": track.text_at(i)}
+            for i in range(0, len(track), 10)
+        ]
         
         subtitle_text = json.dumps(subtitle_summary, indent=2, ensure_ascii=False)
         
@@ -0,0 +1,226 @@
+import logging
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from app.config import get_settings
+from app.utils.subtitle_track import SubtitleTrack
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，缺失时本地分段不可用，规划只走大模型
+    np = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CJK_RUN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+# 特征哈希的维度：2小时视频按30秒分块约240块，矩阵只有数MB
+HASH_DIMENSIONS = 2048
+# 每个间隙两侧各比较几块
+COMPARE_BLOCKS = 3
+# 分段summary的长度上限，与大模型规划提示词中的"15字以内"一致
+SUMMARY_MAX_CHARS = 15
+STOP_TERMS = {
+    "the", "and", "you", "this", "that", "is", "to", "of", "it", "in", "we", "so", "be", "on", "for",
+    "can", "are", "with", "just", "now", "here", "what", "if", "do", "have", "will", "let", "go", "okay",
+    "我们", "这个", "一个", "就是", "然后", "那么", "大家", "可以", "这里", "的话", "什么", "现在",
+    "所以", "因为", "如果", "一下", "他们", "你们", "没有", "这样", "还是", "已经", "其实", "时候",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """英文等按单词（小写），中日韩文本按重叠二元组，去掉高频虚词"""
+    terms = [word.lower() for word in WORD.findall(text)]
+    for run in CJK_RUN.findall(text):
+        terms.extend(run[i:i + 2] for i in range(max(len(run) - 1, 1)))
+    return [term for term in terms if term not in STOP_TERMS]
+
+
+class TopicSegmenter:
+    """
+    本地话题分段 - 不调用大模型，毫秒级给出分段边界
+
+    TextTiling思路：字幕按 TOPIC_WINDOW_SECONDS 切成时间块，每块用词/二元组的哈希TF-IDF向量表示，
+    每个块间隙比较两侧 COMPARE_BLOCKS 块的余弦相似度；只有相似度曲线的局部极小值（谷底）是候选边界，
+    谷底越深，越可能是话题切换。深度同时超过 谷底深度均值-标准差/2 和 TOPIC_MIN_DEPTH 的谷底才切分，
+    最多 TOPIC_MAX_SEGMENTS 段，不补足段数：只讲一个话题的视频就是一段。每段的标签取该段最有区分度的词。
+    """
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    @staticmethod
+    def segment(subtitle_data: Dict[str, Any], max_segments: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        返回与 code_planner.plan 相同结构的分段；没有NumPy或没有字幕时返回空列表
+        """
+        if np is None:
+            return []
+        track = SubtitleTrack.of(subtitle_data)
+        if not len(track):
+            return []
+
+        max_segments = max_segments or settings.TOPIC_MAX_SEGMENTS
+        window = settings.TOPIC_WINDOW_SECONDS
+        duration = max(int(subtitle_data.get("duration") or 0), math.ceil(track.end_time()), 1)
+        block_count = max(1, math.ceil(duration / window))
+
+        block_terms: List[List[str]] = [[] for _ in range(block_count)]
+        for index in range(len(track)):
+            block = min(int(track.starts[index] // window), block_count - 1)
+            block_terms[block].extend(tokenize(track.text_at(index)))
+
+        gaps = TopicSegmenter._boundaries(TopicSegmenter._vectorize(block_terms), duration, max_segments)
+        edges = [0] + [TopicSegmenter._snap(track, gap * window) for gap in gaps] + [duration]
+
+        def blocks(start: int, end: int) -> range:
+            return range(min(start // window, block_count - 1), max(math.ceil(end / window), 1))
+
+        # 没有任何有效词的段（静音、纯虚词）并入前一段（开头的并入后一段），不单独生成代码
+        ranges: List[List[int]] = []
+        pending = None
+        for start, end in zip(edges, edges[1:]):
+            if end <= start:
+                continue
+            if not any(block_terms[block] for block in blocks(start, end)):
+                if ranges:
+                    ranges[-1][1] = end
+                elif pending is None:
+                    pending = start
+                continue
+            ranges.append([start if pending is None else pending, end])
+            pending = None
+        if not ranges:
+            ranges.append([0, duration])
+
+        segments = []
+        for start, end in ranges:
+            span = blocks(start, end)
+            keywords = TopicSegmenter._keywords(block_terms, span.start, span.stop)
+            segments.append(TopicSegmenter._label(start, end, keywords))
+        return segments
+
+    @staticmethod
+    def _vectorize(block_terms: List[List[str]]) -> "np.ndarray":
+        """每块一个L2归一化的哈希TF-IDF向量"""
+        counts = np.zeros((len(block_terms), HASH_DIMENSIONS))
+        for row, terms in enumerate(block_terms):
+            if terms:
+                columns = [zlib.crc32(term.encode("utf-8")) % HASH_DIMENSIONS for term in terms]
+                np.add.at(counts[row], columns, 1)
+
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log((1 + len(block_terms)) / (1 + document_frequency)) + 1
+        vectors = np.log1p(counts) * idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def _gap_similarity(vectors: "np.ndarray") -> "np.ndarray":
+        """第g个间隙（第g-1块与第g块之间）两侧各 COMPARE_BLOCKS 块之和的余弦相似度"""
+        count = len(vectors)
+        cumulative = np.vstack([np.zeros((1, vectors.shape[1])), np.cumsum(vectors, axis=0)])
+        gaps = np.arange(1, count)
+        left = cumulative[gaps] - cumulative[np.maximum(gaps - COMPARE_BLOCKS, 0)]
+        right = cumulative[np.minimum(gaps + COMPARE_BLOCKS, count)] - cumulative[gaps]
+        norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+        return (left * right).sum(axis=1) / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def _valleys(similarity: "np.ndarray") -> Dict[int, float]:
+        """
+        相似度曲线的局部极小值及其深度 {间隙下标: 深度}
+
+        深度为从谷底向两侧爬到最近峰顶的落差之和；平台只取第一个点，首尾间隙没有两侧不算谷底
+        """
+        valleys = {}
+        for index in range(1, len(similarity) - 1):
+            value = similarity[index]
+            if not (similarity[index - 1] > value <= similarity[index + 1]):
+                continue
+            left = index
+            while left > 0 and similarity[left - 1] >= similarity[left]:
+                left -= 1
+            right = index
+            while right < len(similarity) - 1 and similarity[right + 1] >= similarity[right]:
+                right += 1
+            valleys[index] = float(similarity[left] - value + similarity[right] - value)
+        return valleys
+
+    @staticmethod
+    def _boundaries(vectors: "np.ndarray", duration: int, max_segments: int) -> List[int]:
+        """选出边界所在的间隙（块下标），按时间排序"""
+        if len(vectors) < 2:
+            return []
+        valleys = TopicSegmenter._valleys(TopicSegmenter._gap_similarity(vectors))
+        if not valleys:
+            return []
+        window = settings.TOPIC_WINDOW_SECONDS
+        min_blocks = max(1, math.ceil(settings.TOPIC_MIN_SEGMENT_SECONDS / window))
+        # TextTiling的阈值（均值-标准差/2）只在谷底之间比较，同一话题内的小波动也会有谷底，
+        # 因此还要求绝对深度不低于 TOPIC_MIN_DEPTH
+        depths = np.array(list(valleys.values()))
+        threshold = max(depths.mean() - depths.std() / 2, settings.TOPIC_MIN_DEPTH)
+
+        chosen: List[int] = []
+        for gap_index, depth in sorted(valleys.items(), key=lambda item: item[1], reverse=True):
+            if depth < threshold or len(chosen) >= max_segments - 1:
+                break
+            gap = gap_index + 1
+            if gap < min_blocks or len(vectors) - gap < min_blocks:
+                continue
+            if all(abs(gap - other) >= min_blocks for other in chosen):
+                chosen.append(gap)
+        return sorted(chosen)
+
+    @staticmethod
+    def _snap(track: SubtitleTrack, seconds: float) -> int:
+        """边界对齐到该时间点之后第一条字幕的开始（整秒）"""
+        lo, _ = track.window(seconds, seconds)
+        if lo < len(track):
+            return int(track.starts[lo])
+        return int(seconds)
+
+    @staticmethod
+    def _keywords(block_terms: List[List[str]], first: int, last: int, limit: int = 3) -> List[str]:
+        """段内出现多、在其它块出现少的词"""
+        inside = Counter(term for terms in block_terms[first:last] for term in terms)
+        if not inside:
+            return []
+        document_frequency = Counter(term for terms in block_terms for term in set(terms))
+        total = len(block_terms)
+        scored = sorted(
+            inside.items(),
+            key=lambda item: item[1] * math.log((1 + total) / (1 + document_frequency[item[0]])) + item[1] * 1e-6,
+            reverse=True
+        )
+        return [term for term, count in scored[:limit] if count > 1] or [scored[0][0]]
+
+    @staticmethod
+    def _summary(keywords: List[str]) -> str:
+        """由完整的关键词拼成summary，放不下的词整个丢弃，不截断（第一个词总是保留）"""
+        if not keywords:
+            return "视频内容"
+        summary = keywords[0]
+        for keyword in keywords[1:]:
+            if len(summary) + 1 + len(keyword) > SUMMARY_MAX_CHARS:
+                break
+            summary += "、" + keyword
+        return summary
+
+    @staticmethod
+    def _label(start: int, end: int, keywords: List[str]) -> Dict[str, Any]:
+        topic = "、".join(keywords) if keywords else "视频内容"
+        return {
+            "startTime": start,
+            "endTime": end,
+            "summary": TopicSegmenter._summary(keywords),
+            "codeTask": f"根据这段讲解编写演示代码，重点：{topic}",
+            "source": "local"
+        }
+
+topic_segmenter = TopicSegmenter()
@@ -1,33 +1,123 @@
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class VideoIdentity(NamedTuple):
+    """视频的规范身份：同一视频的各种URL变体（短链、移动端、跟踪参数）得到同一身份"""
+    platform: str
+    video_id: str
+    part: Optional[int] = None
+    
+    @property
+    def key(self) -> str:
+        """缓存和数据库查询使用的规范key"""
+        if self.part is not None:
+            return f"{self.platform}:{self.video_id}:p{self.part}"
+        return f"{self.platform}:{self.video_id}"
+    
+    @property
+    def canonical_url(self) -> str:
+        """规范URL，去掉跟踪参数，只保留分P"""
+        return PLATFORM_REGISTRY[self.platform][1](self)
+
+
+def _bilibili_url(identity: VideoIdentity) -> str:
+    if identity.video_id.startswith(("ep", "ss")):
+        return f"https://www.bilibili.com/bangumi/play/{identity.video_id}"
+    url = f"https://www.bilibili.com/video/{identity.video_id}"
+    return f"{url}?p={identity.part}" if identity.part and identity.part > 1 else url
+
+
+def _tiktok_url(identity: VideoIdentity) -> str:
+    if identity.video_id.isdigit():
+        return f"https://m.tiktok.com/v/{identity.video_id}.html"
+    return f"https://vm.tiktok.com/{identity.video_id}/"
+
+
+# 平台注册表: 平台 -> (URL片段正则, 规范URL构造函数)
+# 片段中的分组名以平台名开头，每个平台可以有多个候选ID分组
+PLATFORM_REGISTRY: Dict[str, Tuple[str, object]] = {
+    "youtube": (
+        r'(?:(?:www\.|m\.|music\.)?youtube\.com/'
+        r'(?:watch\?(?:[^#]*?&)?v=(?P<youtube_a>[\w-]{11})|(?:shorts|embed|live|v)/(?P<youtube_b>[\w-]{11}))'
+        r'|youtu\.be/(?P<youtube_c>[\w-]{11}))(?![\w-])',
+        lambda identity: f"https://www.youtube.com/watch?v={identity.video_id}",
+    ),
+    "bilibili": (
+        r'(?:www\.|m\.)?bilibili\.com/'
+        r'(?:video/(?P<bilibili_a>BV[0-9A-Za-z]{10}|av\d+)|bangumi/play/(?P<bilibili_b>(?:ep|ss)\d+))(?![0-9A-Za-z])',
+        _bilibili_url,
+    ),
+    "tiktok": (
+        r'(?:(?:www\.|m\.)?tiktok\.com/(?:@[\w.-]+/video/(?P<tiktok_a>\d+)|t/(?P<tiktok_b>[\w-]+))'
+        r'|vm\.tiktok\.com/(?P<tiktok_c>[\w-]+))(?![\w-])',
+        _tiktok_url,
+    ),
+}
+
+# 所有平台合并成一个预编译正则，一次匹配同时得到平台和视频ID
+VIDEO_URL_PATTERN = re.compile(
+    r'^(?:https?://)?(?:' +
+    '|'.join(f'(?P<{platform}>{fragment})' for platform, (fragment, _) in PLATFORM_REGISTRY.items()) +
+    r')',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=4096)
+def identify_video(url: str) -> Optional[VideoIdentity]:
+    """解析视频URL的规范身份，不支持的URL返回None"""
+    match = VIDEO_URL_PATTERN.match(url.strip())
+    if not match:
+        return None
+    
+    platform = match.lastgroup
+    video_id = next(
+        value for name, value in match.groupdict().items()
+        if value and name.startswith(f"{platform}_")
+    )
+    
+    part = None
+    if platform == "bilibili" and video_id.startswith(("BV", "av")):
+        # B站分P：缺省即第1P
+        values = parse_qs(urlsplit(url.strip()).query).get("p", [])
+        part = int(values[0]) if values and values[0].isdigit() and int(values[0]) > 0 else 1
+    
+    return VideoIdentity(platform, video_id, part)
+
 
 class VideoProcessor:
     """视频处理器"""
     
-    YOUTUBE_REGEX = r'^(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+'
-    BILIBILI_REGEX = r'^(https?://)?(www\.)?bilibili\.com/(video|bangumi)/.+'
-    TIKTOK_REGEX = r'^(https?://)?(www\.)?(tiktok\.com|vm\.tiktok\.com)/.+'
+    @staticmethod
+    def identify(url: str) -> Optional[VideoIdentity]:
+        """解析视频URL的规范身份 (platform, video_id, part)"""
+        return identify_video(url)
+    
+    @staticmethod
+    def video_key(url: str) -> str:
+        """视频的规范key；无法识别时退回原始URL"""
+        identity = identify_video(url)
+        return identity.key if identity else url
+    
+    @staticmethod
+    def canonical_url(url: str) -> str:
+        """视频的规范URL；无法识别时退回原始URL"""
+        identity = identify_video(url)
+        return identity.canonical_url if identity else url
     
     @staticmethod
     def is_valid_url(url: str) -> bool:
         """验证URL是否为支持的视频平台"""
-        patterns = [
-            VideoProcessor.YOUTUBE_REGEX,
-            VideoProcessor.BILIBILI_REGEX,
-            VideoProcessor.TIKTOK_REGEX,
-        ]
-        return any(re.match(pattern, url, re.IGNORECASE) for pattern in patterns)
+        return identify_video(url) is not None
     
     @staticmethod
     def get_platform(url: str) -> Optional[str]:
         """识别视频平台"""
-        if re.match(VideoProcessor.YOUTUBE_REGEX, url, re.IGNORECASE):
-            return "youtube"
-        elif re.match(VideoProcessor.BILIBILI_REGEX, url, re.IGNORECASE):
-            return "bilibili"
-        elif re.match(VideoProcessor.TIKTOK_REGEX, url, re.IGNORECASE):
-            return "tiktok"
-        return None
+        identity = identify_video(url)
+        return identity.platform if identity else None
     
     @staticmethod
     def validate_duration(duration: int, max_duration: int) -> bool:
@@ -80,6 +170,18 @@ class VideoProcessor:
         except Exception as e:
             return False, str(e)
     
+    @staticmethod
+    def postprocess_segment(raw_output: str) -> Tuple[str, bool, str]:
+        """
+        代码段后处理：提取<code>标记中的代码并验证语法（供执行器整体调用）
+        
+        Returns:
+            (代码, 是否有效, 错误信息)
+        """
+        code = VideoProcessor.extract_code_from_tags(raw_output)
+        is_valid, error_msg = VideoProcessor.validate_python_syntax(code)
+        return code, is_valid, error_msg
+    
     @staticmethod
     def clean_code(code: str) -> str:
         """
@@ -0,0 +1,79 @@
+import math
+import random
+from typing import Any, Dict, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class AdaptiveTTLStats:
+    """自适应TTL统计"""
+
+    sampled_accesses = 0
+    extended = 0
+    shortened = 0
+    memory_used: Optional[int] = None
+    memory_checked_at = 0.0
+
+    @staticmethod
+    def over_budget() -> bool:
+        budget = settings.CACHE_MEMORY_BUDGET
+        return bool(budget) and AdaptiveTTLStats.memory_used is not None \
+            and AdaptiveTTLStats.memory_used >= budget
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        return {
+            "enabled": settings.ADAPTIVE_TTL_ENABLED,
+            "sampleRate": settings.ADAPTIVE_TTL_SAMPLE_RATE,
+            "sampledAccesses": AdaptiveTTLStats.sampled_accesses,
+            "extended": AdaptiveTTLStats.extended,
+            "shortened": AdaptiveTTLStats.shortened,
+            "memoryUsed": AdaptiveTTLStats.memory_used,
+            "memoryBudget": settings.CACHE_MEMORY_BUDGET,
+            "overBudget": AdaptiveTTLStats.over_budget(),
+        }
+
+
+class AdaptiveTTL:
+    """
+    按访问频率调整TTL
+
+    命中时按 ADAPTIVE_TTL_SAMPLE_RATE 抽样，对 "lfu:{<key>}" 计数器做INCR，
+    计数器闲置 ADAPTIVE_TTL_DECAY 秒后过期清零。估算访问次数为
+    计数 / 采样率，TTL倍数按对数增长：
+
+        倍数 = 1 + log2(估算次数 / ADAPTIVE_TTL_REFERENCE_HITS)
+
+    限制在 [ADAPTIVE_TTL_MIN_FACTOR, ADAPTIVE_TTL_MAX_FACTOR] 内，没有任何访问记录的
+    条目直接用最小倍数；后端内存超过 CACHE_MEMORY_BUDGET 时不再延长TTL。
+    """
+
+    @staticmethod
+    def counter_key(key: str) -> str:
+        # 哈希标签让计数器与条目落在同一分片，计数和TTL查询一次往返
+        return f"lfu:{{{key}}}"
+
+    @staticmethod
+    def should_sample() -> bool:
+        return settings.ADAPTIVE_TTL_ENABLED and random.random() < settings.ADAPTIVE_TTL_SAMPLE_RATE
+
+    @staticmethod
+    def factor(counter: int) -> float:
+        """由抽样计数得到TTL倍数"""
+        if counter <= 0:
+            return settings.ADAPTIVE_TTL_MIN_FACTOR
+
+        estimated = counter / settings.ADAPTIVE_TTL_SAMPLE_RATE
+        factor = 1.0 + math.log2(estimated / settings.ADAPTIVE_TTL_REFERENCE_HITS)
+        upper = 1.0 if AdaptiveTTLStats.over_budget() else settings.ADAPTIVE_TTL_MAX_FACTOR
+        return min(max(factor, settings.ADAPTIVE_TTL_MIN_FACTOR), upper)
+
+    @staticmethod
+    def scale(ttl: int, counter: int) -> int:
+        """按访问频率缩放基础TTL，结果不超过 ADAPTIVE_TTL_MAX"""
+        if not settings.ADAPTIVE_TTL_ENABLED:
+            return ttl
+
+        scaled = max(int(ttl * AdaptiveTTL.factor(counter)), 1)
+        return min(scaled, max(settings.ADAPTIVE_TTL_MAX, ttl))
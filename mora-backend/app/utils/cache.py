@@ -1,72 +1,561 @@
-import redis
-import json
-from typing import Optional, Any
+import redis.asyncio as redis
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Optional, Any, Awaitable, Callable, Dict, List
 from app.config import get_settings
+from app.utils.local_cache import LocalCache
+from app.utils.codec import encode_value, decode_value, CodecStats
+from app.utils.cache_backend import CacheBackend, RedisBackend, MemoryBackend, ShardedBackend, FailoverBackend
+from app.utils.adaptive_ttl import AdaptiveTTL, AdaptiveTTLStats
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-redis_client = redis.from_url(
-    settings.REDIS_URL,
-    decode_responses=True,
-    socket_connect_timeout=5,
-    socket_keepalive=True
+
+def _redis_backend(url: str) -> RedisBackend:
+    # 进程内共享的异步连接池（每个节点一个），所有请求和SSE流复用连接
+    # 值以二进制编码存储（见 app/utils/codec.py），因此不做响应解码
+    pool = redis.ConnectionPool.from_url(
+        url,
+        decode_responses=False,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_keepalive=True
+    )
+    return RedisBackend(pool)
+
+
+def _create_backend() -> CacheBackend:
+    """
+    按 CACHE_BACKEND 创建存储后端
+
+    - redis：Redis + 进程内后端故障切换，Redis不可用时自动降级；
+      配置了 REDIS_NODES 时按一致性哈希分片到多个节点
+    - memory：只用进程内后端，适合测试和单机部署
+    """
+    memory = MemoryBackend(max_entries=settings.MEMORY_CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == "memory":
+        return memory
+    
+    if settings.REDIS_NODES:
+        primary: CacheBackend = ShardedBackend(
+            {url: _redis_backend(url) for url in settings.REDIS_NODES},
+            virtual_nodes=settings.REDIS_VIRTUAL_NODES,
+            failure_threshold=settings.CACHE_FAILURE_THRESHOLD,
+            probe_interval=settings.CACHE_PROBE_INTERVAL,
+            flush_on_rejoin=settings.REDIS_FLUSH_ON_REJOIN
+        )
+    else:
+        primary = _redis_backend(settings.REDIS_URL)
+    
+    return FailoverBackend(
+        primary,
+        memory,
+        failure_threshold=settings.CACHE_FAILURE_THRESHOLD,
+        probe_interval=settings.CACHE_PROBE_INTERVAL
+    )
+
+
+cache_backend = _create_backend()
+
+# 第一层：进程内缓存，热点key命中时不走网络也不再解析JSON
+local_cache = LocalCache(
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+    default_ttl=settings.LOCAL_CACHE_TTL
 )
 
+# 失效广播频道，消息格式 "<worker_id> <key>"
+INVALIDATION_CHANNEL = "cache:invalidate"
+WORKER_ID = uuid.uuid4().hex
+
+# 软过期信封标记，区分旧格式的裸值
+SWR_MARKER = "__swr__"
+
+class CacheStats:
+    """Redis层统计"""
+    
+    hits = 0
+    misses = 0
+    errors = 0
+    stale_hits = 0
+    refreshes = 0
+    
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        lookups = CacheStats.hits + CacheStats.misses
+        return {
+            "hits": CacheStats.hits,
+            "misses": CacheStats.misses,
+            "errors": CacheStats.errors,
+            "hitRatio": round(CacheStats.hits / lookups, 4) if lookups else 0.0,
+            "staleHits": CacheStats.stale_hits,
+            "backgroundRefreshes": CacheStats.refreshes,
+        }
+
 class Cache:
-    """Redis缓存工具类"""
+    """两级缓存工具类（进程内LRU + Redis，asyncio）"""
+    
+    _listener_task: Optional[asyncio.Task] = None
+    # 本worker内正在加载的key，同一key的并发未命中只触发一次加载
+    _inflight: Dict[str, asyncio.Future] = {}
+    # 后台刷新、访问计数等不阻塞调用方的任务
+    _background_tasks: set = set()
     
     @staticmethod
-    def get(key: str) -> Optional[Any]:
-        """获取缓存"""
+    async def get(key: str) -> Optional[Any]:
+        """获取缓存，先查进程内缓存，未命中再查Redis并回填"""
+        if settings.LOCAL_CACHE_ENABLED:
+            hit, value = local_cache.get(key)
+            if hit:
+                return value
+        
         try:
-            value = redis_client.get(key)
-            if value:
-                return json.loads(value)
+            # 同一次往返取回剩余TTL，本地副本不会比Redis中的值活得更久
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                raw, ttl = await pipe.get(key).ttl(key).execute()
+        except Exception as e:
+            CacheStats.errors += 1
+            logger.warning(f"Cache get error for key {key}: {e}")
+            return None
+        
+        if not raw:
+            CacheStats.misses += 1
             return None
+        
+        try:
+            value = decode_value(raw)
         except Exception as e:
-            print(f"Cache get error for key {key}: {e}")
+            CacheStats.errors += 1
+            logger.warning(f"Cache decode error for key {key}: {e}")
             return None
+        
+        CacheStats.hits += 1
+        if settings.LOCAL_CACHE_ENABLED:
+            local_cache.set(key, value, size=len(raw), ttl=ttl if ttl and ttl > 0 else None)
+        return value
     
     @staticmethod
-    def set(key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """设置缓存"""
+    async def set(key: str, value: Any, ttl: Optional[int] = None, adaptive: bool = False) -> bool:
+        """
+        设置缓存，并通知其它worker丢弃本地副本
+        
+        adaptive 为 True 时按该key的访问频率缩放TTL（见 AdaptiveTTL）
+        """
         try:
             ttl = ttl or settings.CACHE_TTL
-            serialized = json.dumps(value, ensure_ascii=False)
-            redis_client.setex(key, ttl, serialized)
-            return True
+            if adaptive:
+                ttl = await Cache._adaptive_ttl(key, ttl)
+            serialized = encode_value(value)
+            # 写入和失效广播在同一次往返中发送
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl, serialized)
+                if settings.LOCAL_CACHE_ENABLED:
+                    pipe.publish(INVALIDATION_CHANNEL, f"{WORKER_ID} {key}")
+                await pipe.execute()
         except Exception as e:
-            print(f"Cache set error for key {key}: {e}")
+            CacheStats.errors += 1
+            logger.warning(f"Cache set error for key {key}: {e}")
+            local_cache.delete(key)
             return False
+        
+        if settings.LOCAL_CACHE_ENABLED:
+            local_cache.set(key, value, size=len(serialized), ttl=ttl)
+        return True
     
     @staticmethod
-    def delete(key: str) -> bool:
+    async def delete(key: str) -> bool:
         """删除缓存"""
+        local_cache.delete(key)
         try:
-            redis_client.delete(key)
-            return True
+            await cache_backend.delete(key)
         except Exception as e:
-            print(f"Cache delete error for key {key}: {e}")
+            CacheStats.errors += 1
+            logger.warning(f"Cache delete error for key {key}: {e}")
             return False
+        
+        if settings.LOCAL_CACHE_ENABLED:
+            await Cache._publish_invalidation([key])
+        return True
     
     @staticmethod
-    def exists(key: str) -> bool:
+    async def exists(key: str) -> bool:
         """检查key是否存在"""
         try:
-            return redis_client.exists(key) > 0
+            return await cache_backend.exists(key) > 0
         except Exception as e:
-            print(f"Cache exists error for key {key}: {e}")
+            CacheStats.errors += 1
+            logger.warning(f"Cache exists error for key {key}: {e}")
             return False
+    
+    @staticmethod
+    async def mget(keys: List[str]) -> List[Optional[Any]]:
+        """批量获取缓存，本地未命中的key一次往返从Redis取回，结果顺序与keys一致"""
+        if not keys:
+            return []
+        
+        results: List[Optional[Any]] = [None] * len(keys)
+        missing = []
+        for index, key in enumerate(keys):
+            hit, value = local_cache.get(key) if settings.LOCAL_CACHE_ENABLED else (False, None)
+            if hit:
+                results[index] = value
+            else:
+                missing.append(index)
+        
+        if not missing:
+            return results
+        
+        try:
+            raws = await cache_backend.mget([keys[i] for i in missing])
+        except Exception as e:
+            CacheStats.errors += 1
+            logger.warning(f"Cache mget error for {len(missing)} keys: {e}")
+            return results
+        
+        for index, raw in zip(missing, raws):
+            if not raw:
+                CacheStats.misses += 1
+                continue
+            try:
+                results[index] = decode_value(raw)
+            except Exception as e:
+                CacheStats.errors += 1
+                logger.warning(f"Cache decode error for key {keys[index]}: {e}")
+                continue
+            CacheStats.hits += 1
+            if settings.LOCAL_CACHE_ENABLED:
+                local_cache.set(keys[index], results[index], size=len(raw))
+        return results
+    
+    @staticmethod
+    async def mset(mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """批量设置缓存，使用非事务pipeline一次发送全部SETEX"""
+        if not mapping:
+            return True
+        ttl = ttl or settings.CACHE_TTL
+        serialized = {key: encode_value(value) for key, value in mapping.items()}
+        try:
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                for key, raw in serialized.items():
+                    pipe.setex(key, ttl, raw)
+                    if settings.LOCAL_CACHE_ENABLED:
+                        pipe.publish(INVALIDATION_CHANNEL, f"{WORKER_ID} {key}")
+                await pipe.execute()
+        except Exception as e:
+            CacheStats.errors += 1
+            logger.warning(f"Cache mset error for {len(mapping)} keys: {e}")
+            for key in mapping:
+                local_cache.delete(key)
+            return False
+        
+        if settings.LOCAL_CACHE_ENABLED:
+            for key, value in mapping.items():
+                local_cache.set(key, value, size=len(serialized[key]), ttl=ttl)
+        return True
+    
+    @staticmethod
+    async def get_or_refresh(
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        soft_ttl: int,
+        hard_ttl: int
+    ) -> Any:
+        """
+        软/硬双TTL读取（stale-while-revalidate）
+        
+        - 软TTL内直接返回；接近软过期时按XFetch概率提前刷新，把刷新时刻错开
+        - 软TTL过后仍返回旧值，只有拿到Redis刷新锁的一个调用方在后台重新加载
+        - 硬TTL过期（真正未命中）时，全集群只有持锁者调用loader，其余等待其结果
+        
+        Args:
+            key: 缓存key
+            loader: 加载最新值的协程函数
+            soft_ttl: 软TTL（秒），超过后触发后台刷新
+            hard_ttl: 硬TTL（秒），即Redis中的过期时间
+        """
+        envelope = await Cache.get(key)
+        
+        if envelope is not None:
+            if not (isinstance(envelope, dict) and envelope.get(SWR_MARKER)):
+                # 旧格式裸值：照常返回，并在后台升级为信封格式
+                envelope = {SWR_MARKER: 1, "value": envelope, "refreshAt": 0, "delta": 0}
+            
+            Cache.record_access(key, hard_ttl)
+            if not Cache._should_refresh(envelope):
+                return envelope["value"]
+            
+            CacheStats.stale_hits += 1
+            token = await Cache._acquire_lock(key)
+            if token:
+                task = asyncio.create_task(
+                    Cache._refresh(key, loader, soft_ttl, hard_ttl, token)
+                )
+                Cache._spawn(task)
+            return envelope["value"]
+        
+        inflight = Cache._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        Cache._inflight[key] = future
+        try:
+            value = await Cache._load_on_miss(key, loader, soft_ttl, hard_ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其它等待者时避免 "exception never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            Cache._inflight.pop(key, None)
+    
+    @staticmethod
+    def _should_refresh(envelope: Dict[str, Any]) -> bool:
+        """XFetch概率提前过期：加载越慢、越接近软过期，越可能提前刷新"""
+        delta = envelope.get("delta", 0) or 0
+        early = delta * settings.CACHE_EARLY_EXPIRY_BETA * -math.log(1.0 - random.random())
+        return time.time() + early >= envelope.get("refreshAt", 0)
+    
+    @staticmethod
+    async def _store_envelope(key: str, value: Any, delta: float, soft_ttl: int, hard_ttl: int) -> None:
+        # 软/硬TTL按同一倍数缩放：热门条目刷新得更少，冷门条目更早让出内存
+        ttl = await Cache._adaptive_ttl(key, hard_ttl)
+        await Cache.set(key, {
+            SWR_MARKER: 1,
+            "value": value,
+            "refreshAt": time.time() + soft_ttl * ttl / hard_ttl,
+            "delta": round(delta, 3),
+        }, ttl=ttl)
+    
+    @staticmethod
+    async def _timed_load(loader: Callable[[], Awaitable[Any]]) -> tuple:
+        started = time.monotonic()
+        value = await loader()
+        return value, time.monotonic() - started
+    
+    @staticmethod
+    async def _refresh(key: str, loader: Callable[[], Awaitable[Any]],
+                       soft_ttl: int, hard_ttl: int, token: str) -> None:
+        """后台刷新；失败时保留旧值，等下一个调用方重试"""
+        try:
+            value, delta = await Cache._timed_load(loader)
+            await Cache._store_envelope(key, value, delta, soft_ttl, hard_ttl)
+            CacheStats.refreshes += 1
+            logger.info(f"Background refresh of {key} took {delta:.1f}s")
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            await Cache._release_lock(key, token)
+    
+    @staticmethod
+    async def _load_on_miss(key: str, loader: Callable[[], Awaitable[Any]],
+                            soft_ttl: int, hard_ttl: int) -> Any:
+        """真正未命中：持锁者加载，其它worker轮询等待结果，锁消失仍无值时自行加载"""
+        token = await Cache._acquire_lock(key)
+        if not token:
+            deadline = time.monotonic() + settings.CACHE_REFRESH_LOCK_TTL
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+                envelope = await Cache.get(key)
+                if envelope is not None:
+                    return envelope["value"] if isinstance(envelope, dict) and envelope.get(SWR_MARKER) else envelope
+                if not await Cache.exists(Cache._lock_key(key)):
+                    break
+        
+        try:
+            value, delta = await Cache._timed_load(loader)
+            await Cache._store_envelope(key, value, delta, soft_ttl, hard_ttl)
+            return value
+        finally:
+            if token:
+                await Cache._release_lock(key, token)
+    
+    @staticmethod
+    def _spawn(task: asyncio.Task) -> None:
+        Cache._background_tasks.add(task)
+        task.add_done_callback(Cache._background_tasks.discard)
+    
+    @staticmethod
+    def record_access(key: str, base_ttl: int) -> None:
+        """抽样记录一次命中，在后台更新访问计数，不阻塞调用方"""
+        if AdaptiveTTL.should_sample():
+            Cache._spawn(asyncio.create_task(Cache._record_access(key, base_ttl)))
+    
+    @staticmethod
+    async def _record_access(key: str, base_ttl: int) -> None:
+        """累加访问计数；热门条目的自适应TTL超过剩余TTL时顺带延长"""
+        AdaptiveTTLStats.sampled_accesses += 1
+        counter_key = AdaptiveTTL.counter_key(key)
+        try:
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                counter, _, remaining = await pipe.incr(counter_key).expire(
+                    counter_key, settings.ADAPTIVE_TTL_DECAY
+                ).ttl(key).execute()
+            await Cache._poll_memory()
+            target = AdaptiveTTL.scale(base_ttl, counter)
+            if target > base_ttl and remaining and 0 < remaining < target:
+                await cache_backend.expire(key, target)
+                AdaptiveTTLStats.extended += 1
+        except Exception as e:
+            logger.warning(f"Cache access tracking error for key {key}: {e}")
+    
+    @staticmethod
+    async def _adaptive_ttl(key: str, ttl: int) -> int:
+        """按访问计数缩放写入TTL；读取计数失败时使用原TTL"""
+        if not settings.ADAPTIVE_TTL_ENABLED:
+            return ttl
+        try:
+            raw = await cache_backend.get(AdaptiveTTL.counter_key(key))
+            await Cache._poll_memory()
+        except Exception as e:
+            logger.warning(f"Cache access counter error for key {key}: {e}")
+            return ttl
+        
+        scaled = AdaptiveTTL.scale(ttl, int(raw) if raw else 0)
+        if scaled > ttl:
+            AdaptiveTTLStats.extended += 1
+        elif scaled < ttl:
+            AdaptiveTTLStats.shortened += 1
+        return scaled
+    
+    @staticmethod
+    async def _poll_memory() -> None:
+        """按 CACHE_MEMORY_POLL_INTERVAL 读取后端内存占用，用于内存预算判断"""
+        now = time.monotonic()
+        if AdaptiveTTLStats.memory_used is not None and \
+                now - AdaptiveTTLStats.memory_checked_at < settings.CACHE_MEMORY_POLL_INTERVAL:
+            return
+        AdaptiveTTLStats.memory_checked_at = now
+        try:
+            AdaptiveTTLStats.memory_used = await cache_backend.memory_used()
+        except Exception as e:
+            logger.warning(f"Cache memory usage check failed: {e}")
+    
+    @staticmethod
+    def _lock_key(key: str) -> str:
+        # 哈希标签让锁与它保护的值落在同一分片
+        return f"lock:{{{key}}}"
+    
+    @staticmethod
+    async def _acquire_lock(key: str) -> Optional[str]:
+        """获取短期刷新锁，成功返回token；Redis不可用时视为获得锁"""
+        token = uuid.uuid4().hex
+        try:
+            acquired = await cache_backend.set(
+                Cache._lock_key(key), token, nx=True, ex=settings.CACHE_REFRESH_LOCK_TTL
+            )
+            return token if acquired else None
+        except Exception as e:
+            logger.warning(f"Cache lock error for key {key}: {e}")
+            return token
+    
+    @staticmethod
+    async def _release_lock(key: str, token: str) -> None:
+        try:
+            await cache_backend.compare_and_delete(Cache._lock_key(key), token)
+        except Exception as e:
+            logger.warning(f"Cache lock release error for key {key}: {e}")
+    
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """各层命中率统计"""
+        # 本地未命中才会查Redis，两层合计的命中率 = 两层命中数 / 总查询数
+        lookups = local_cache.hits + local_cache.misses if settings.LOCAL_CACHE_ENABLED \
+            else CacheStats.hits + CacheStats.misses
+        hits = (local_cache.hits if settings.LOCAL_CACHE_ENABLED else 0) + CacheStats.hits
+        return {
+            "backend": cache_backend.stats(),
+            "local": local_cache.stats(),
+            "redis": CacheStats.snapshot(),
+            "codec": CodecStats.snapshot(),
+            # 命中率与内存占用放在一起，便于评估TTL策略
+            "adaptiveTtl": {
+                **AdaptiveTTLStats.snapshot(),
+                "hitRatio": round(hits / lookups, 4) if lookups else 0.0,
+            },
+        }
+    
+    @staticmethod
+    async def _publish_invalidation(keys: List[str]) -> None:
+        try:
+            async with cache_backend.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.publish(INVALIDATION_CHANNEL, f"{WORKER_ID} {key}")
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed: {e}")
+    
+    @staticmethod
+    async def _listen_invalidations() -> None:
+        """订阅失效广播；断线期间可能漏消息，所以重连时清空本地缓存"""
+        while True:
+            pubsub = cache_backend.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                local_cache.clear()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if not message:
+                        continue
+                    origin, _, key = message["data"].decode().partition(" ")
+                    if origin != WORKER_ID:
+                        local_cache.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error: {e}")
+                local_cache.clear()
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+    
+    @staticmethod
+    def start_invalidation_listener() -> None:
+        """启动失效广播订阅（应用启动时调用）"""
+        # 进程内后端不跨worker共享，没有需要广播的失效
+        if settings.LOCAL_CACHE_ENABLED and cache_backend.shared and Cache._listener_task is None:
+            Cache._listener_task = asyncio.create_task(Cache._listen_invalidations())
+    
+    @staticmethod
+    async def close() -> None:
+        """停止订阅并关闭连接池"""
+        if Cache._listener_task is not None:
+            Cache._listener_task.cancel()
+            try:
+                await Cache._listener_task
+            except asyncio.CancelledError:
+                pass
+            Cache._listener_task = None
+        await cache_backend.close()
 
 class CacheKeys:
     """缓存key命名规范"""
     
     @staticmethod
-    def video_subtitle(video_url: str) -> str:
-        """视频字幕缓存key"""
-        return f"video:{video_url}:subtitle"
+    def video_subtitle(video_key: str) -> str:
+        """视频字幕缓存key，video_key为规范视频身份（见 VideoProcessor.video_key）"""
+        # v2：预处理规则修正后，旧规则误删过代码片段的缓存字幕不再被读取
+        return f"video:{video_key}:subtitle:v2"
     
     @staticmethod
     def session_result(session_id: str) -> str:
         """会话结果缓存key"""
         return f"session:{session_id}:result"
+    
+    @staticmethod
+    def session_subtitles(session_id: str) -> str:
+        """会话字幕轨道缓存key（分页查询字幕用）"""
+        return f"session:{session_id}:subtitles"
+    
+    @staticmethod
+    def sandbox_result(code_hash: str) -> str:
+        """代码沙箱执行结果缓存key，code_hash为代码的sha256"""
+        return f"sandbox:{code_hash}:result"
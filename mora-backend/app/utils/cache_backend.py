@@ -0,0 +1,727 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from app.utils.hash_ring import HashRing
+
+logger = logging.getLogger(__name__)
+
+# 视为Redis不可用的异常；命令错误等其它异常照常抛给调用方
+UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+# 仅在值仍等于token时删除，避免删掉别人续上的锁
+COMPARE_AND_DELETE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheBackend:
+    """
+    缓存存储后端接口 - Redis命令的一个子集（asyncio）
+
+    pipeline() 返回的对象支持与 redis-py 相同的链式调用和 execute()，
+    值统一以bytes返回。
+    """
+
+    # 是否在多个worker间共享（决定是否需要失效广播）
+    shared = True
+
+    @property
+    def mode(self) -> str:
+        raise NotImplementedError
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> bool:
+        raise NotImplementedError
+
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> int:
+        raise NotImplementedError
+
+    async def exists(self, *keys: str) -> int:
+        raise NotImplementedError
+
+    async def ttl(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def expire(self, key: str, ttl: int) -> bool:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def getbit(self, key: str, offset: int) -> int:
+        raise NotImplementedError
+
+    async def setbit(self, key: str, offset: int, value: int) -> int:
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: Any) -> int:
+        raise NotImplementedError
+
+    async def compare_and_delete(self, key: str, token: str) -> int:
+        """值等于token时删除key（释放锁）"""
+        raise NotImplementedError
+
+    async def ping(self) -> bool:
+        raise NotImplementedError
+
+    async def memory_used(self) -> int:
+        """后端当前占用的内存（字节）"""
+        raise NotImplementedError
+
+    def pipeline(self, transaction: bool = False):
+        raise NotImplementedError
+
+    def pubsub(self):
+        raise NotImplementedError
+
+    async def run_commands(self, commands: List[Tuple[str, tuple, dict]]) -> List[Any]:
+        """执行pipeline中记录的命令，默认逐条执行"""
+        return [await getattr(self, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode}
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBackend(CacheBackend):
+    """Redis后端，直接转发到 redis.asyncio 客户端"""
+
+    def __init__(self, pool: redis.ConnectionPool):
+        self.pool = pool
+        self.client = redis.Redis(connection_pool=pool)
+
+    @property
+    def mode(self) -> str:
+        return "redis"
+
+    async def get(self, key):
+        return await self.client.get(key)
+
+    async def mget(self, keys):
+        return await self.client.mget(keys)
+
+    async def set(self, key, value, ex=None, nx=False):
+        return bool(await self.client.set(key, value, ex=ex, nx=nx))
+
+    async def setex(self, key, ttl, value):
+        return bool(await self.client.setex(key, ttl, value))
+
+    async def delete(self, *keys):
+        return await self.client.delete(*keys)
+
+    async def exists(self, *keys):
+        return await self.client.exists(*keys)
+
+    async def ttl(self, key):
+        return await self.client.ttl(key)
+
+    async def expire(self, key, ttl):
+        return bool(await self.client.expire(key, ttl))
+
+    async def incr(self, key):
+        return await self.client.incr(key)
+
+    async def getbit(self, key, offset):
+        return await self.client.getbit(key, offset)
+
+    async def setbit(self, key, offset, value):
+        return await self.client.setbit(key, offset, value)
+
+    async def publish(self, channel, message):
+        return await self.client.publish(channel, message)
+
+    async def compare_and_delete(self, key, token):
+        return await self.client.eval(COMPARE_AND_DELETE_SCRIPT, 1, key, token)
+
+    async def ping(self):
+        return bool(await self.client.ping())
+
+    async def memory_used(self):
+        info = await self.client.info("memory")
+        return int(info.get("used_memory", 0))
+
+    def pipeline(self, transaction=False):
+        return CommandPipeline(self)
+
+    def pubsub(self):
+        return self.client.pubsub()
+
+    async def run_commands(self, commands):
+        # 用原生pipeline一次往返发送
+        pipe = self.client.pipeline(transaction=False)
+        for name, args, kwargs in commands:
+            if name == "compare_and_delete":
+                pipe.eval(COMPARE_AND_DELETE_SCRIPT, 1, *args)
+            else:
+                getattr(pipe, name)(*args, **kwargs)
+        return await pipe.execute()
+
+    async def close(self):
+        await self.pool.disconnect()
+
+
+def _to_bytes(value: Any) -> bytes:
+    """按Redis的规则把写入值转成bytes"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return str(value).encode("utf-8")
+
+
+class MemoryBackend(CacheBackend):
+    """
+    进程内后端 - 单机部署、测试和Redis故障期间使用
+
+    按条目数做LRU淘汰；发布消息没有订阅者，返回0。
+    """
+
+    shared = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # key -> (值, 过期时间或None)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+
+    @property
+    def mode(self) -> str:
+        return "memory"
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any, ttl: Optional[float], keep_ttl: bool = False) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        if keep_ttl and key in self._entries:
+            expires_at = self._entries[key][1]
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key):
+        value = self._lookup(key)
+        return bytes(value) if value is not None else None
+
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and self._lookup(key) is not None:
+            return False
+        self._store(key, _to_bytes(value), ex)
+        return True
+
+    async def setex(self, key, ttl, value):
+        self._store(key, _to_bytes(value), ttl)
+        return True
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._lookup(key) is not None:
+                del self._entries[key]
+                removed += 1
+        return removed
+
+    async def exists(self, *keys):
+        return sum(1 for key in keys if self._lookup(key) is not None)
+
+    async def ttl(self, key):
+        if self._lookup(key) is None:
+            return -2
+        expires_at = self._entries[key][1]
+        if expires_at is None:
+            return -1
+        return max(int(expires_at - time.monotonic()), 0)
+
+    async def expire(self, key, ttl):
+        value = self._lookup(key)
+        if value is None:
+            return False
+        self._store(key, value, ttl)
+        return True
+
+    async def incr(self, key):
+        value = self._lookup(key)
+        count = int(value) + 1 if value is not None else 1
+        self._store(key, _to_bytes(count), None, keep_ttl=True)
+        return count
+
+    async def getbit(self, key, offset):
+        value = self._lookup(key)
+        byte_index = offset >> 3
+        if value is None or byte_index >= len(value):
+            return 0
+        return (value[byte_index] >> (7 - (offset & 7))) & 1
+
+    async def setbit(self, key, offset, value):
+        current = self._lookup(key)
+        bitmap = bytearray(current) if current is not None else bytearray()
+        byte_index = offset >> 3
+        if byte_index >= len(bitmap):
+            bitmap.extend(b"\x00" * (byte_index + 1 - len(bitmap)))
+        mask = 1 << (7 - (offset & 7))
+        previous = 1 if bitmap[byte_index] & mask else 0
+        if value:
+            bitmap[byte_index] |= mask
+        else:
+            bitmap[byte_index] &= ~mask
+        self._store(key, bitmap, None, keep_ttl=True)
+        return previous
+
+    async def publish(self, channel, message):
+        return 0
+
+    async def compare_and_delete(self, key, token):
+        value = self._lookup(key)
+        if value is not None and bytes(value) == _to_bytes(token):
+            del self._entries[key]
+            return 1
+        return 0
+
+    async def ping(self):
+        return True
+
+    async def memory_used(self):
+        return sum(len(key) + len(value) for key, (value, _) in self._entries.items())
+
+    def pipeline(self, transaction=False):
+        return CommandPipeline(self)
+
+    def pubsub(self):
+        raise RuntimeError("Memory cache backend does not support pub/sub")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self):
+        return {"mode": self.mode, "entries": len(self._entries), "maxEntries": self.max_entries}
+
+
+class CommandPipeline:
+    """
+    通用pipeline：记录命令，execute() 时在目标后端上执行
+
+    与 redis-py 的pipeline一样支持链式调用和 async with。
+    """
+
+    COMMANDS = (
+        "get", "mget", "set", "setex", "delete", "exists", "ttl", "expire",
+        "incr", "getbit", "setbit", "publish", "compare_and_delete",
+    )
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if name not in CommandPipeline.COMMANDS:
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self.commands = self.commands, []
+        return await self.backend.run_commands(commands)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+
+class ShardedBackend(CacheBackend):
+    """
+    多个Redis节点的客户端分片 - 按一致性哈希把每个key路由到一个节点
+
+    - key中的 {...} 哈希标签决定路由，需要放在一起的key（如锁和它保护的值）使用相同标签
+    - pipeline按节点拆分，各节点的子pipeline并发发送；MGET等多key命令拆成单key命令
+    - 节点调用失败时该批命令立即改发到环上的后继节点；连续失败达到阈值后把节点
+      标记为下线，只有它负责的区间被后继接管，其它key的归属不变
+    - 下线节点由后台探测，恢复后重新加入；期间写入已转到后继节点，节点上的旧值
+      可能已过期，因此默认先 FLUSHDB 再加入
+    - 发布/订阅固定使用配置顺序中第一个在线节点
+    - 所有节点都不可用时抛出连接错误，由外层的 FailoverBackend 降级到进程内后端
+    """
+
+    def __init__(self, nodes: Dict[str, RedisBackend], virtual_nodes: int,
+                 failure_threshold: int, probe_interval: float, flush_on_rejoin: bool = True):
+        self.nodes = nodes
+        self.ring = HashRing(nodes.keys(), virtual_nodes)
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.flush_on_rejoin = flush_on_rejoin
+        self.failures: Dict[str, int] = {name: 0 for name in nodes}
+        self.last_errors: Dict[str, Optional[str]] = {name: None for name in nodes}
+        self.down: Set[str] = set()
+        self.node_losses = 0
+        self.rerouted_commands = 0
+        self._probe_tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def mode(self) -> str:
+        return "sharded"
+
+    def node_for(self, key: str, exclude: FrozenSet[str] = frozenset()) -> str:
+        node = self.ring.lookup(key, skip=self.down | exclude)
+        if node is None:
+            raise RedisConnectionError("No Redis node available")
+        return node
+
+    def _pubsub_node(self, exclude: FrozenSet[str] = frozenset()) -> str:
+        for name in self.nodes:
+            if name not in self.down and name not in exclude:
+                return name
+        raise RedisConnectionError("No Redis node available")
+
+    def _record_failure(self, node: str, error: Exception) -> None:
+        self.failures[node] += 1
+        self.last_errors[node] = f"{type(error).__name__}: {error}"
+        if node not in self.down and self.failures[node] >= self.failure_threshold:
+            self.down.add(node)
+            self.node_losses += 1
+            logger.error(f"Redis node {node} unavailable ({self.last_errors[node]}), removed from hash ring")
+            task = self._probe_tasks.get(node)
+            if task is None or task.done():
+                self._probe_tasks[node] = asyncio.create_task(self._probe(node))
+
+    async def _probe(self, node: str) -> None:
+        """定期探测下线节点，恢复后重新加入哈希环"""
+        while node in self.down:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.nodes[node].ping()
+                if self.flush_on_rejoin:
+                    await self.nodes[node].client.flushdb()
+            except Exception as e:
+                self.last_errors[node] = f"{type(e).__name__}: {e}"
+                continue
+            self.failures[node] = 0
+            self.down.discard(node)
+            logger.info(f"Redis node {node} recovered, rejoined hash ring")
+
+    @staticmethod
+    def _expand(commands: List[Tuple[str, tuple, dict]]) -> Tuple[List[Tuple[str, tuple, dict]], List[Tuple[str, List[int]]]]:
+        """把多key命令拆成单key命令，返回 (单key命令列表, 每条原命令的结果组装方式)"""
+        flat: List[Tuple[str, tuple, dict]] = []
+        plan: List[Tuple[str, List[int]]] = []
+        for name, args, kwargs in commands:
+            if name == "mget":
+                keys = list(args[0])
+                plan.append(("list", list(range(len(flat), len(flat) + len(keys)))))
+                flat.extend(("get", (key,), {}) for key in keys)
+            elif name in ("delete", "exists") and len(args) != 1:
+                plan.append(("sum", list(range(len(flat), len(flat) + len(args)))))
+                flat.extend((name, (key,), {}) for key in args)
+            else:
+                plan.append(("one", [len(flat)]))
+                flat.append((name, args, kwargs))
+        return flat, plan
+
+    async def _run_flat(self, flat: List[Tuple[str, tuple, dict]], exclude: FrozenSet[str]) -> List[Any]:
+        groups: Dict[str, List[int]] = {}
+        for index, (name, args, _) in enumerate(flat):
+            node = self._pubsub_node(exclude) if name == "publish" else self.node_for(args[0], exclude)
+            groups.setdefault(node, []).append(index)
+
+        results: List[Any] = [None] * len(flat)
+
+        async def run_group(node: str, indexes: List[int]) -> None:
+            group = [flat[i] for i in indexes]
+            try:
+                replies = await self.nodes[node].run_commands(group)
+                self.failures[node] = 0
+            except UNAVAILABLE_ERRORS as e:
+                # 立即改发到后继节点，不等节点被标记下线
+                self._record_failure(node, e)
+                self.rerouted_commands += len(group)
+                replies = await self._run_flat(group, exclude | {node})
+            for index, reply in zip(indexes, replies):
+                results[index] = reply
+
+        await asyncio.gather(*(run_group(node, indexes) for node, indexes in groups.items()))
+        return results
+
+    async def run_commands(self, commands):
+        flat, plan = ShardedBackend._expand(commands)
+        replies = await self._run_flat(flat, frozenset())
+        results = []
+        for kind, indexes in plan:
+            if kind == "list":
+                results.append([replies[i] for i in indexes])
+            elif kind == "sum":
+                results.append(sum(replies[i] for i in indexes))
+            else:
+                results.append(replies[indexes[0]])
+        return results
+
+    async def _one(self, name: str, *args, **kwargs) -> Any:
+        return (await self.run_commands([(name, args, kwargs)]))[0]
+
+    async def get(self, key):
+        return await self._one("get", key)
+
+    async def mget(self, keys):
+        return await self._one("mget", keys)
+
+    async def set(self, key, value, ex=None, nx=False):
+        return bool(await self._one("set", key, value, ex=ex, nx=nx))
+
+    async def setex(self, key, ttl, value):
+        return bool(await self._one("setex", key, ttl, value))
+
+    async def delete(self, *keys):
+        return await self._one("delete", *keys)
+
+    async def exists(self, *keys):
+        return await self._one("exists", *keys)
+
+    async def ttl(self, key):
+        return await self._one("ttl", key)
+
+    async def expire(self, key, ttl):
+        return bool(await self._one("expire", key, ttl))
+
+    async def incr(self, key):
+        return await self._one("incr", key)
+
+    async def getbit(self, key, offset):
+        return await self._one("getbit", key, offset)
+
+    async def setbit(self, key, offset, value):
+        return await self._one("setbit", key, offset, value)
+
+    async def publish(self, channel, message):
+        return await self._one("publish", channel, message)
+
+    async def compare_and_delete(self, key, token):
+        return await self._one("compare_and_delete", key, token)
+
+    async def ping(self):
+        """任一节点可用即视为可用（供 FailoverBackend 探测）"""
+        results = await asyncio.gather(
+            *(backend.ping() for backend in self.nodes.values()), return_exceptions=True
+        )
+        if all(isinstance(result, Exception) for result in results):
+            raise RedisConnectionError("No Redis node available")
+        return True
+
+    async def memory_used(self):
+        online = [backend for name, backend in self.nodes.items() if name not in self.down]
+        results = await asyncio.gather(*(backend.memory_used() for backend in online), return_exceptions=True)
+        return sum(result for result in results if not isinstance(result, Exception))
+
+    def pipeline(self, transaction=False):
+        return CommandPipeline(self)
+
+    def pubsub(self):
+        return self.nodes[self._pubsub_node()].pubsub()
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "virtualNodes": self.ring.virtual_nodes,
+            "nodeLosses": self.node_losses,
+            "reroutedCommands": self.rerouted_commands,
+            "nodes": [
+                {
+                    "node": name,
+                    "online": name not in self.down,
+                    "consecutiveFailures": self.failures[name],
+                    "lastError": self.last_errors[name],
+                }
+                for name in self.nodes
+            ],
+        }
+
+    async def close(self):
+        for task in self._probe_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._probe_tasks.values(), return_exceptions=True)
+        self._probe_tasks.clear()
+        await asyncio.gather(*(backend.close() for backend in self.nodes.values()))
+
+
+class FailoverBackend(CacheBackend):
+    """
+    带健康跟踪的故障切换后端 - 平时使用Redis（单节点或分片），连续失败后切到进程内后端
+
+    - Redis调用失败时本次操作立即改由进程内后端完成，调用方不会等第二次超时
+    - 连续失败达到阈值后熔断：之后的调用直接走进程内后端，不再访问Redis
+    - 熔断期间后台定期PING Redis，恢复后切回并清空进程内后端
+      （故障期间写入的值没有广播，不能带回）
+    """
+
+    def __init__(self, primary: CacheBackend, fallback: MemoryBackend,
+                 failure_threshold: int, probe_interval: float):
+        self.primary = primary
+        self.fallback = fallback
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.consecutive_failures = 0
+        self.tripped = False
+        self.trips = 0
+        self.fallback_calls = 0
+        self.last_error: Optional[str] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def mode(self) -> str:
+        return "degraded" if self.tripped else self.primary.mode
+
+    @property
+    def active(self) -> CacheBackend:
+        return self.fallback if self.tripped else self.primary
+
+    def _record_success(self) -> None:
+        self.consecutive_failures = 0
+
+    def _record_failure(self, error: Exception) -> None:
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if not self.tripped and self.consecutive_failures >= self.failure_threshold:
+            self.tripped = True
+            self.trips += 1
+            logger.error(f"Redis unavailable ({self.last_error}), switching cache to in-memory backend")
+            if self._probe_task is None or self._probe_task.done():
+                self._probe_task = asyncio.create_task(self._probe())
+
+    async def _probe(self) -> None:
+        """熔断期间定期探测Redis，恢复后切回"""
+        while self.tripped:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.primary.ping()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                continue
+            self.fallback.clear()
+            self.consecutive_failures = 0
+            self.tripped = False
+            logger.info("Redis recovered, switching cache back to Redis backend")
+
+    async def _call(self, name: str, *args, **kwargs) -> Any:
+        if not self.tripped:
+            try:
+                result = await getattr(self.primary, name)(*args, **kwargs)
+                self._record_success()
+                return result
+            except UNAVAILABLE_ERRORS as e:
+                self._record_failure(e)
+        self.fallback_calls += 1
+        return await getattr(self.fallback, name)(*args, **kwargs)
+
+    async def run_commands(self, commands: List[Tuple[str, tuple, dict]]) -> List[Any]:
+        if not self.tripped:
+            try:
+                results = await self.primary.run_commands(commands)
+                self._record_success()
+                return results
+            except UNAVAILABLE_ERRORS as e:
+                self._record_failure(e)
+        self.fallback_calls += 1
+        return await self.fallback.run_commands(commands)
+
+    async def get(self, key):
+        return await self._call("get", key)
+
+    async def mget(self, keys):
+        return await self._call("mget", keys)
+
+    async def set(self, key, value, ex=None, nx=False):
+        return await self._call("set", key, value, ex=ex, nx=nx)
+
+    async def setex(self, key, ttl, value):
+        return await self._call("setex", key, ttl, value)
+
+    async def delete(self, *keys):
+        return await self._call("delete", *keys)
+
+    async def exists(self, *keys):
+        return await self._call("exists", *keys)
+
+    async def ttl(self, key):
+        return await self._call("ttl", key)
+
+    async def expire(self, key, ttl):
+        return await self._call("expire", key, ttl)
+
+    async def incr(self, key):
+        return await self._call("incr", key)
+
+    async def getbit(self, key, offset):
+        return await self._call("getbit", key, offset)
+
+    async def setbit(self, key, offset, value):
+        return await self._call("setbit", key, offset, value)
+
+    async def publish(self, channel, message):
+        return await self._call("publish", channel, message)
+
+    async def compare_and_delete(self, key, token):
+        return await self._call("compare_and_delete", key, token)
+
+    async def ping(self):
+        return await self.primary.ping()
+
+    async def memory_used(self):
+        return await self._call("memory_used")
+
+    def pipeline(self, transaction=False):
+        return CommandPipeline(self)
+
+    def pubsub(self):
+        # 失效广播只有Redis能提供；熔断期间订阅失败由订阅方重试
+        return self.primary.pubsub()
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "tripped": self.tripped,
+            "trips": self.trips,
+            "consecutiveFailures": self.consecutive_failures,
+            "fallbackCalls": self.fallback_calls,
+            "lastError": self.last_error,
+            "primary": self.primary.stats(),
+            "fallback": self.fallback.stats(),
+        }
+
+    async def close(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        await self.primary.close()
@@ -0,0 +1,195 @@
+import base64
+import json
+import zlib
+from typing import Any, Callable, Dict, Optional
+from app.config import get_settings
+from app.utils.subtitle_track import SubtitleTrack
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，缺失时回退到JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，缺失时回退到zlib
+    zstandard = None
+
+settings = get_settings()
+
+# 编码格式: MAGIC + 版本 + 编解码器ID + 负载
+# 合法JSON文本不可能以 \x00 开头，无头部的值按旧版JSON解码
+MAGIC = b"\x00"
+FORMAT_VERSION = 1
+# 字幕轨道以自身的二进制格式嵌入：JSON中是带标记键的base64，msgpack中是扩展类型
+TRACK_JSON_KEY = "__subtitleTrack__"
+TRACK_EXT_TYPE = 1
+
+
+class ValueCodec:
+    """单个编解码器：序列化方式 + 可选压缩（两步分开，编码时序列化结果可以先用来判断大小）"""
+
+    def __init__(self, codec_id: int, name: str,
+                 serialize: Callable[[Any], bytes], deserialize: Callable[[bytes], Any],
+                 compress: Optional[Callable[[bytes], bytes]] = None,
+                 decompress: Optional[Callable[[bytes], bytes]] = None):
+        self.codec_id = codec_id
+        self.name = name
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.compress = compress
+        self.decompress = decompress
+
+    def dumps(self, value: Any) -> bytes:
+        data = self.serialize(value)
+        return self.compress(data) if self.compress else data
+
+    def loads(self, data: bytes) -> Any:
+        return self.deserialize(self.decompress(data) if self.decompress else data)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, SubtitleTrack):
+        return {TRACK_JSON_KEY: base64.b64encode(value.to_bytes()).decode("ascii")}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if TRACK_JSON_KEY in obj:
+        return SubtitleTrack.from_bytes(base64.b64decode(obj[TRACK_JSON_KEY]))
+    return obj
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, SubtitleTrack):
+        return msgpack.ExtType(TRACK_EXT_TYPE, value.to_bytes())
+    raise TypeError(f"Object of type {type(value).__name__} is not msgpack serializable")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == TRACK_EXT_TYPE:
+        return SubtitleTrack.from_bytes(data)
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True, default=_msgpack_default)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, ext_hook=_msgpack_ext_hook)
+
+
+CODECS: Dict[int, ValueCodec] = {}
+CODECS_BY_NAME: Dict[str, ValueCodec] = {}
+
+
+def register_codec(codec: ValueCodec) -> None:
+    """注册编解码器；ID一经使用不能复用，否则旧缓存无法解码"""
+    CODECS[codec.codec_id] = codec
+    CODECS_BY_NAME[codec.name] = codec
+
+
+def _zlib_compress(data: bytes) -> bytes:
+    return zlib.compress(data, settings.CACHE_COMPRESS_LEVEL)
+
+
+register_codec(ValueCodec(1, "json", _json_dumps, _json_loads))
+register_codec(ValueCodec(2, "json+zlib", _json_dumps, _json_loads, _zlib_compress, zlib.decompress))
+
+if msgpack is not None:
+    register_codec(ValueCodec(3, "msgpack+zlib", _msgpack_dumps, _msgpack_loads, _zlib_compress, zlib.decompress))
+
+if msgpack is not None and zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    register_codec(ValueCodec(
+        4, "msgpack+zstd", _msgpack_dumps, _msgpack_loads,
+        _zstd_compressor.compress, _zstd_decompressor.decompress
+    ))
+
+
+class CodecStats:
+    """编码统计：压缩前的序列化字节数与实际写入字节数"""
+
+    encoded_values = 0
+    compressed_values = 0
+    raw_bytes = 0
+    stored_bytes = 0
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        return {
+            "encodedValues": CodecStats.encoded_values,
+            "compressedValues": CodecStats.compressed_values,
+            "rawBytes": CodecStats.raw_bytes,
+            "storedBytes": CodecStats.stored_bytes,
+            "ratio": round(CodecStats.stored_bytes / CodecStats.raw_bytes, 4) if CodecStats.raw_bytes else 1.0,
+            "largeValueCodec": large_value_codec().name,
+        }
+
+
+def large_value_codec() -> ValueCodec:
+    """超过阈值的值使用的编解码器；auto 时选可用的最优组合"""
+    if settings.CACHE_CODEC != "auto":
+        return CODECS_BY_NAME.get(settings.CACHE_CODEC, CODECS_BY_NAME["json+zlib"])
+    for name in ("msgpack+zstd", "msgpack+zlib", "json+zlib"):
+        if name in CODECS_BY_NAME:
+            return CODECS_BY_NAME[name]
+    return CODECS_BY_NAME["json"]
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    编码缓存值：小值用带头部的JSON，超过阈值的值换用紧凑二进制+压缩
+
+    值只用大值编解码器的序列化方式序列化一次，由序列化结果的大小决定格式：
+    超过阈值时直接压缩这份结果；低于阈值且序列化方式不是JSON时，才对这个小值重新做一次JSON编码。
+    """
+    json_codec = CODECS_BY_NAME["json"]
+    candidate = large_value_codec()
+    serialized = candidate.serialize(value)
+
+    if len(serialized) < settings.CACHE_COMPRESS_THRESHOLD:
+        codec = json_codec
+        payload = serialized if candidate.serialize is _json_dumps else _json_dumps(value)
+    elif candidate.compress is None:
+        codec, payload = candidate, serialized
+    else:
+        compressed = candidate.compress(serialized)
+        # JSON压缩收益不明显时保留未压缩的JSON，解码更快；msgpack没有未压缩的编解码器，始终压缩
+        if candidate.serialize is _json_dumps and len(compressed) >= len(serialized):
+            codec, payload = json_codec, serialized
+        else:
+            codec, payload = candidate, compressed
+            CodecStats.compressed_values += 1
+
+    data = MAGIC + bytes((FORMAT_VERSION, codec.codec_id)) + payload
+    CodecStats.encoded_values += 1
+    CodecStats.raw_bytes += len(serialized)
+    CodecStats.stored_bytes += len(data)
+    return data
+
+
+def decode_value(data: Optional[bytes]) -> Any:
+    """解码缓存值，兼容没有头部的旧版JSON文本"""
+    if data is None:
+        return None
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        return _json_loads(data)
+
+    version, codec_id = data[1], data[2]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache value format version {version}")
+    codec = CODECS.get(codec_id)
+    if codec is None:
+        raise ValueError(f"Unknown cache codec id {codec_id}")
+    return codec.loads(data[3:])
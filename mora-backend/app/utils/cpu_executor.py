@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _timed(func: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Tuple[Any, float]:
+    """在执行器中运行并计时；模块级函数，进程池可以pickle"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+class CpuExecutorStats:
+    """CPU任务统计（本worker）"""
+
+    inline = 0
+    offloaded = 0
+    inline_seconds = 0.0
+    # 交给执行器的任务在执行器里花的时间，即事件循环省下的时间
+    offloaded_seconds = 0.0
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        return {
+            "mode": settings.CPU_EXECUTOR,
+            "inline": CpuExecutorStats.inline,
+            "offloaded": CpuExecutorStats.offloaded,
+            "inlineSeconds": round(CpuExecutorStats.inline_seconds, 3),
+            "loopSecondsSaved": round(CpuExecutorStats.offloaded_seconds, 3),
+        }
+
+
+class CpuExecutor:
+    """
+    CPU密集步骤的执行器 - 大输入交给线程池/进程池，小输入直接在事件循环里算
+
+    CPU_EXECUTOR:
+    - process: 进程池（forkserver启动，不继承事件循环和连接池），真正并行；
+      参数和结果需要pickle，只能提交模块级函数、静态方法和可序列化对象的方法
+    - thread: 线程池，没有序列化开销，但 ast.parse、正则匹配这类C实现的步骤执行期间不释放GIL，
+      事件循环仍会被整段阻塞，只适合zlib压缩等会释放GIL的步骤
+    - inline: 全部直接执行（调试用）
+
+    size 小于 CPU_OFFLOAD_MIN_BYTES 时直接执行，调度开销比计算本身还大。
+    """
+
+    _executor: Optional[Executor] = None
+
+    @staticmethod
+    def _get_executor() -> Executor:
+        if CpuExecutor._executor is None:
+            if settings.CPU_EXECUTOR == "process":
+                CpuExecutor._executor = ProcessPoolExecutor(
+                    max_workers=settings.CPU_EXECUTOR_WORKERS,
+                    mp_context=multiprocessing.get_context("forkserver")
+                )
+            else:
+                CpuExecutor._executor = ThreadPoolExecutor(
+                    max_workers=settings.CPU_EXECUTOR_WORKERS, thread_name_prefix="cpu"
+                )
+        return CpuExecutor._executor
+
+    @staticmethod
+    async def run(func: Callable, *args: Any, size: int = 0, **kwargs: Any) -> Any:
+        """
+        执行 func(*args, **kwargs)
+
+        Args:
+            size: 输入大小（字节/字符数的估计），决定是否交给执行器
+        """
+        if settings.CPU_EXECUTOR == "inline" or size < settings.CPU_OFFLOAD_MIN_BYTES:
+            result, elapsed = _timed(func, args, kwargs)
+            CpuExecutorStats.inline += 1
+            CpuExecutorStats.inline_seconds += elapsed
+            return result
+
+        loop = asyncio.get_running_loop()
+        result, elapsed = await loop.run_in_executor(
+            CpuExecutor._get_executor(), functools.partial(_timed, func, args, kwargs)
+        )
+        CpuExecutorStats.offloaded += 1
+        CpuExecutorStats.offloaded_seconds += elapsed
+        return result
+
+    @staticmethod
+    def shutdown() -> None:
+        if CpuExecutor._executor is not None:
+            CpuExecutor._executor.shutdown(wait=False, cancel_futures=True)
+            CpuExecutor._executor = None
+
+cpu_executor = CpuExecutor()
@@ -7,10 +7,13 @@ class ErrorCode(str, Enum):
     INVALID_VIDEO_URL = "1001"
     VIDEO_TOO_LONG = "1002"
     UNSUPPORTED_PLATFORM = "1003"
+    INVALID_SUBTITLE_FILE = "1004"
+    SUBTITLE_FILE_TOO_LARGE = "1005"
     
     BIBIGPT_API_ERROR = "2001"
     NO_SUBTITLE = "2002"
     DEEPSEEK_API_ERROR = "2003"
+    PART_LIST_ERROR = "2004"
     
     AI_GENERATION_FAILED = "3001"
     DATABASE_ERROR = "3002"
@@ -22,9 +25,12 @@ ERROR_MESSAGES: Dict[ErrorCode, str] = {
     ErrorCode.INVALID_VIDEO_URL: "视频URL不支持，请使用YouTube/Bilibili/TikTok链接",
     ErrorCode.VIDEO_TOO_LONG: "视频时长超过2小时，暂不支持",
     ErrorCode.UNSUPPORTED_PLATFORM: "不支持的视频平台",
+    ErrorCode.INVALID_SUBTITLE_FILE: "字幕文件格式不正确，请上传SRT、WebVTT或JSON文件",
+    ErrorCode.SUBTITLE_FILE_TOO_LARGE: "字幕文件过大",
     ErrorCode.BIBIGPT_API_ERROR: "字幕提取失败，请稍后重试",
     ErrorCode.NO_SUBTITLE: "该视频没有可用字幕",
     ErrorCode.DEEPSEEK_API_ERROR: "代码生成失败，请重试",
+    ErrorCode.PART_LIST_ERROR: "无法获取视频的分P列表，请稍后重试或直接指定分P",
     ErrorCode.AI_GENERATION_FAILED: "AI生成失败",
     ErrorCode.DATABASE_ERROR: "数据库操作失败",
     ErrorCode.CACHE_ERROR: "缓存操作失败",
@@ -0,0 +1,83 @@
+import bisect
+import hashlib
+from typing import Collection, Dict, Iterable, List, Optional
+
+
+def hash_tag(key: str) -> str:
+    """
+    取key中参与哈希的部分，规则与Redis Cluster相同：
+
+    key包含非空的 {...} 时只对第一个花括号内的内容哈希，
+    例如 "lock:{video:bilibili:BV1x:p1:subtitle}" 与 "video:bilibili:BV1x:p1:subtitle" 落在同一节点。
+    """
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def hash64(value: str) -> int:
+    """稳定的64位哈希（不能用内置hash()，它在每个进程中都不同）"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    带虚拟节点的一致性哈希环
+
+    每个节点在环上放 virtual_nodes 个点，key顺时针找到的第一个点所属节点即为归属节点。
+    增删一个节点只影响相邻区间内的key（约 1/N），虚拟节点让各节点负载更均匀。
+    """
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int):
+        self.virtual_nodes = virtual_nodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.virtual_nodes):
+            point = hash64(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def lookup(self, key: str, skip: Collection[str] = ()) -> Optional[str]:
+        """
+        返回key的归属节点；skip中的节点（例如已宕机）视为不在环上，
+        其区间由顺时针方向的下一个节点接管，其它key的归属不变
+        """
+        if not self._points:
+            return None
+
+        start = bisect.bisect(self._points, hash64(hash_tag(key)))
+        total = len(self._points)
+        for offset in range(total):
+            owner = self._owners[(start + offset) % total]
+            if owner not in skip:
+                return owner
+        return None
+
+    def distribution(self, keys: Iterable[str]) -> Dict[str, int]:
+        """统计一组key在各节点上的数量（基准测试用）"""
+        counts = {node: 0 for node in self.nodes}
+        for key in keys:
+            owner = self.lookup(key)
+            if owner is not None:
+                counts[owner] += 1
+        return counts
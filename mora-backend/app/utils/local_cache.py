@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalCache:
+    """
+    进程内LRU缓存 - 按条目数、估算字节数和TTL淘汰
+    
+    缓存的是反序列化后的对象，命中时既不走网络也不再json解析；
+    调用方必须把取到的值当作只读。
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> (value, 估算字节数, 过期时间)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """返回 (是否命中, 值)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        
+        value, _, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+    
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        """写入条目，size为序列化后的估算字节数；超过总预算的单个值不缓存"""
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        
+        ttl = min(ttl, self.default_ttl) if ttl else self.default_ttl
+        self._remove(key)
+        self._entries[key] = (value, size, time.monotonic() + ttl)
+        self._bytes += size
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def delete(self, key: str) -> None:
+        """删除条目"""
+        self._remove(key)
+    
+    def clear(self) -> None:
+        """清空全部条目"""
+        self._entries.clear()
+        self._bytes = 0
+    
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+    
+    def stats(self) -> Dict[str, Any]:
+        """命中率与内存占用统计"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
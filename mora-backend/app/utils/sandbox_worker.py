@@ -0,0 +1,191 @@
+"""
+代码沙箱worker - 由 app.services.code_sandbox 以 `python -I sandbox_worker.py` 预先启动
+
+独立脚本，不导入app包。从stdin逐行读取JSON请求 {"code", "timeout", "memoryMb", "outputLimit"}，
+每个请求fork一个子进程执行，向stdout逐行写回 {"exitCode", "stdout", "stderr", "timedOut", "durationMs"}。
+
+worker常驻并预先导入常用标准库，fork出的子进程直接继承已初始化的解释器，每次执行只有毫秒级开销；
+子进程执行完即退出，代码之间互不影响。子进程的限制：
+- rlimit：CPU时间、地址空间、写文件大小、打开文件数、进程数
+- 墙钟超时：超时后整个进程组被SIGKILL
+- 审计钩子：socket、子进程、fork/exec、ctypes 等事件直接抛出 PermissionError（不能移除）；
+  打开文件只允许临时目录内的路径，以及只读打开Python安装目录（标准库导入）
+- 工作目录为新建的临时目录，stdin为 /dev/null；环境变量由启动方清空
+
+只用于拦截生成代码的意外行为，不是针对恶意代码的安全边界。
+"""
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+# 预先导入，fork出的子进程不必再导入（教学代码常用）
+import collections  # noqa: F401
+import dataclasses  # noqa: F401
+import datetime  # noqa: F401
+import functools  # noqa: F401
+import itertools  # noqa: F401
+import math  # noqa: F401
+import random  # noqa: F401
+import re  # noqa: F401
+import string  # noqa: F401
+import typing  # noqa: F401
+
+BLOCKED_EVENTS = (
+    "socket.", "subprocess.", "os.system", "os.exec", "os.fork", "os.forkpty", "os.posix_spawn",
+    "os.spawn", "os.kill", "os.killpg", "pty.", "ctypes.", "sys.addaudithook", "webbrowser.",
+)
+
+
+# 允许只读打开的目录（标准库和已安装的包）
+READ_ONLY_ROOTS = tuple(
+    os.path.realpath(path) + os.sep for path in {sys.prefix, sys.base_prefix, sys.exec_prefix}
+)
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+_workdir = None
+
+
+def _check_open(path, flags):
+    if isinstance(path, int):
+        return
+    real = os.path.realpath(os.fsdecode(path))
+    if _workdir and (real + os.sep).startswith(_workdir):
+        return
+    if not flags & WRITE_FLAGS and real.startswith(READ_ONLY_ROOTS):
+        return
+    raise PermissionError(f"open {path!r} is not allowed in the sandbox")
+
+
+def _audit(event, args):
+    if event.startswith(BLOCKED_EVENTS):
+        raise PermissionError(f"{event} is not allowed in the sandbox")
+    if event == "open":
+        _check_open(args[0], args[2] if len(args) > 2 and isinstance(args[2], int) else 0)
+
+
+def _limit(name, value):
+    try:
+        resource.setrlimit(name, (value, value))
+    except (ValueError, OSError):
+        pass
+
+
+def _child(request, workdir, out_w, err_w):
+    """子进程：重定向输出、加限制、执行代码，不返回"""
+    status = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        os.setsid()
+        os.chdir(workdir)
+
+        cpu_seconds = max(1, int(request["timeout"] + 0.999))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        _limit(resource.RLIMIT_AS, request["memoryMb"] * 1024 * 1024)
+        _limit(resource.RLIMIT_FSIZE, request["outputLimit"])
+        _limit(resource.RLIMIT_NOFILE, 32)
+        _limit(resource.RLIMIT_NPROC, 0)
+        _limit(resource.RLIMIT_CORE, 0)
+
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", errors="replace", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", errors="replace", closefd=False)
+        global _workdir
+        _workdir = os.path.realpath(workdir) + os.sep
+        sys.addaudithook(_audit)
+
+        code = compile(request["code"], "<segment>", "exec")
+        try:
+            exec(code, {"__name__": "__main__", "__builtins__": __builtins__})
+            status = 0
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+        os._exit(status)
+
+
+def _run(request):
+    limit = request["outputLimit"]
+    workdir = tempfile.mkdtemp(prefix="mora-sandbox-")
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    started = time.monotonic()
+
+    pid = os.fork()
+    if pid == 0:
+        os.close(out_r)
+        os.close(err_r)
+        _child(request, workdir, out_w, err_w)
+    os.close(out_w)
+    os.close(err_w)
+
+    # 持续读空管道，子进程不会因为管道写满而卡住；超出上限的部分丢弃
+    buffers = {out_r: bytearray(), err_r: bytearray()}
+    open_fds = set(buffers)
+    timed_out = False
+    deadline = started + request["timeout"]
+    while open_fds:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                os.kill(pid, signal.SIGKILL)
+            break
+        ready, _, _ = select.select(list(open_fds), [], [], remaining)
+        for fd in ready:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                open_fds.discard(fd)
+            elif len(buffers[fd]) < limit:
+                buffers[fd] += chunk[:limit - len(buffers[fd])]
+
+    _, status = os.waitpid(pid, 0)
+    duration = time.monotonic() - started
+    for fd in buffers:
+        os.close(fd)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        # 被信号终止时为负数（如 -9 为SIGKILL，-24 为CPU时间超限）
+        "exitCode": os.waitstatus_to_exitcode(status),
+        "stdout": buffers[out_r].decode("utf-8", errors="replace"),
+        "stderr": buffers[err_r].decode("utf-8", errors="replace"),
+        "timedOut": timed_out,
+        "durationMs": round(duration * 1000, 1),
+    }
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = _run(json.loads(line))
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 时间轴行：SRT "00:00:01,000 --> 00:00:02,500"，WebVTT 可省略小时并带cue设置
+TIMING_LINE = re.compile(
+    r"^\s*((?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3})"
+)
+# WebVTT 的 <v Speaker>、<c.class>、<00:00:01.000> 等行内标签
+INLINE_TAG = re.compile(r"<[^>]*>")
+# JSON中字符串、转义和容器边界之外的字符都不影响结构，只扫描这些字符
+JSON_SPECIAL = re.compile(r'[\\"{}\[\]]')
+
+
+def parse_timestamp(value: str) -> float:
+    """解析 [hh:]mm:ss,mmm 或 [hh:]mm:ss.mmm，返回秒"""
+    clock, _, millis = value.replace(",", ".").partition(".")
+    seconds = 0
+    for part in clock.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds + int(millis.ljust(3, "0")[:3]) / 1000
+
+
+def subtitle_from_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """BibiGPT字幕项（end字段）或内部格式（endTime字段）转为内部字幕结构"""
+    return {
+        "startTime": item.get("startTime", 0),
+        "endTime": item.get("end", item.get("endTime", 0)),
+        "text": item.get("text", ""),
+    }
+
+
+class CueStreamParser:
+    """
+    SRT / WebVTT 流式解析器
+
+    逐块喂入文本，每遇到一个完整的cue（以空行结束）就产出一条字幕，
+    只保留未结束的一行和当前cue，内存与文件大小无关。
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._timing: Optional[Tuple[float, float]] = None
+        self._lines: List[str] = []
+        self._skip_block = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        cues = []
+        for line in lines:
+            cue = self._feed_line(line.rstrip("\r"))
+            if cue:
+                cues.append(cue)
+        return cues
+
+    def close(self) -> List[Dict[str, Any]]:
+        cues = []
+        if self._partial:
+            cue = self._feed_line(self._partial.rstrip("\r"))
+            if cue:
+                cues.append(cue)
+            self._partial = ""
+        cue = self._finish()
+        if cue:
+            cues.append(cue)
+        return cues
+
+    def _feed_line(self, line: str) -> Optional[Dict[str, Any]]:
+        if not line.strip():
+            self._skip_block = False
+            return self._finish()
+        if self._skip_block:
+            return None
+
+        if self._timing is None:
+            match = TIMING_LINE.match(line)
+            if match:
+                self._timing = (parse_timestamp(match.group(1)), parse_timestamp(match.group(2)))
+            elif line.startswith(("WEBVTT", "NOTE", "STYLE", "REGION")):
+                # 文件头和注释/样式块直到空行为止都跳过
+                self._skip_block = True
+            # 其余是SRT序号或VTT cue标识，忽略
+            return None
+
+        self._lines.append(INLINE_TAG.sub("", line).strip())
+        return None
+
+    def _finish(self) -> Optional[Dict[str, Any]]:
+        if self._timing is None:
+            self._lines = []
+            return None
+        start, end = self._timing
+        text = " ".join(line for line in self._lines if line)
+        self._timing, self._lines = None, []
+        return {"startTime": start, "endTime": end, "text": text}
+
+
+class JsonArrayStreamParser:
+    """
+    JSON数组推送式解析器
+
+    逐块喂入字节，在第一个键名属于 array_keys 的数组（或顶层数组）中，每读完一个元素
+    就解析并产出，整个数组从不同时驻留内存。数组以外的部分原样保留，数组本身替换成 []，
+    close() 时解析为元数据（例如标题、时长）。
+    """
+
+    def __init__(self, array_keys: Sequence[str]):
+        self._key_pattern = re.compile(
+            r'(?:^|"(?:' + "|".join(re.escape(key) for key in array_keys) + r')"\s*:)\s*$'
+        )
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._remainder: List[str] = []
+        self._item: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape_next = False
+        # seek: 查找目标数组；array: 在数组内；done: 目标数组已结束
+        self._state = "seek"
+        self._array_depth = 0
+        self._capturing = False
+
+    def feed(self, data: bytes) -> List[Any]:
+        return self._scan(self._decoder.decode(data))
+
+    def close(self) -> Any:
+        """结束输入，返回数组以外部分解析出的元数据"""
+        self._scan(self._decoder.decode(b"", final=True))
+        if self._state == "array" or self._depth != 0:
+            raise ValueError("Truncated JSON document")
+        remainder = "".join(self._remainder).strip()
+        return json.loads(remainder) if remainder else None
+
+    def _tail(self) -> str:
+        """已保留文本的末尾（只用于判断数组前的键名）"""
+        tail = ""
+        for part in reversed(self._remainder):
+            tail = part + tail
+            if len(tail) >= 256:
+                break
+        return tail[-256:]
+
+    def _scan(self, text: str) -> List[Any]:
+        items: List[Any] = []
+        if not text:
+            return items
+
+        # 当前块中尚未归入 remainder 或 item 的起点
+        start = 0
+        # 被反斜杠转义的字符位置；上一块以反斜杠结尾时是本块第一个字符
+        skip = 0 if self._escape_next else -1
+        self._escape_next = False
+
+        for match in JSON_SPECIAL.finditer(text):
+            index = match.start()
+            char = match.group()
+            if index == skip:
+                continue
+
+            if self._in_string:
+                if char == "\\":
+                    skip = index + 1
+                    self._escape_next = skip >= len(text)
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._state == "seek" and char == "[":
+                    self._remainder.append(text[start:index])
+                    start = index
+                    if self._key_pattern.search(self._tail()):
+                        self._remainder.append("[")
+                        self._state = "array"
+                        self._array_depth = self._depth
+                        start = index + 1
+                elif self._state == "array" and self._depth == self._array_depth + 1:
+                    self._capturing = True
+                    self._item = []
+                    start = index
+            else:
+                if self._state == "array" and self._capturing and self._depth == self._array_depth + 1:
+                    self._item.append(text[start:index + 1])
+                    items.append(json.loads("".join(self._item)))
+                    self._item = []
+                    self._capturing = False
+                    start = index + 1
+                elif self._state == "array" and self._depth == self._array_depth:
+                    self._state = "done"
+                    start = index
+                self._depth -= 1
+
+        if self._state == "array":
+            if self._capturing:
+                self._item.append(text[start:])
+        else:
+            self._remainder.append(text[start:])
+        return items
@@ -0,0 +1,216 @@
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# 序列化格式: MAGIC + 版本 + 条数，之后是zlib压缩的
+# 开始时间(ms) + 结束时间(ms) + 每条文本的字符数 + UTF-8文本
+MAGIC = b"STRK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBI")
+COMPRESS_LEVEL = 6
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class SubtitleTrack:
+    """
+    列式字幕轨道 - 进程内的字幕表示
+
+    开始/结束时间保存在 array 中并按开始时间排序，所有文本拼成一个字符串、按偏移量切分，
+    数千条字幕只占几个连续的缓冲区，而不是数千个dict。按时间范围取字幕是二分查找，
+    提示词格式（"[12.3s] text"）的整轨渲染只生成一次，任意范围的渲染都是一次字符串切片。
+    轨道创建后不可修改，可以被本地缓存和多个会话共享。
+    """
+
+    __slots__ = ("starts", "ends", "text", "offsets", "_prompt", "_prompt_offsets")
+
+    def __init__(self, starts: array, ends: array, text: str, offsets: array):
+        self.starts = starts
+        self.ends = ends
+        self.text = text
+        # 第i条文本是 text[offsets[i]:offsets[i + 1]]
+        self.offsets = offsets
+        self._prompt: Optional[str] = None
+        self._prompt_offsets: Optional[array] = None
+
+    @classmethod
+    def from_subtitles(cls, subtitles: List[Dict[str, Any]]) -> "SubtitleTrack":
+        """由 {"startTime", "endTime", "text"} 列表构建"""
+        ordered = sorted(subtitles, key=lambda sub: sub.get("startTime", 0))
+        starts, ends, offsets = array("d"), array("d"), array("I", [0])
+        texts = []
+        position = 0
+        for sub in ordered:
+            text = sub.get("text") or ""
+            starts.append(sub.get("startTime", 0))
+            ends.append(sub.get("endTime", 0))
+            texts.append(text)
+            position += len(text)
+            offsets.append(position)
+        return cls(starts, ends, "".join(texts), offsets)
+
+    @classmethod
+    def of(cls, subtitle_data: Dict[str, Any]) -> "SubtitleTrack":
+        """取字幕数据中的轨道；字幕仍是列表（旧缓存、旧数据）时现场构建"""
+        subtitles = subtitle_data.get("subtitles")
+        if isinstance(subtitles, SubtitleTrack):
+            return subtitles
+        return cls.from_subtitles(subtitles or [])
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return {"startTime": self.starts[index], "endTime": self.ends[index], "text": self.text_at(index)}
+
+    def text_at(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def plain_text(self) -> str:
+        """每条一行的纯文本（全文检索用）"""
+        return "\n".join(self.text_at(index) for index in range(len(self)))
+
+    def to_list(self, lo: int = 0, hi: Optional[int] = None) -> List[Dict[str, Any]]:
+        """转回字典列表（SSE、API响应等JSON边界使用）"""
+        hi = len(self) if hi is None else hi
+        return [self[index] for index in range(lo, hi)]
+
+    def end_time(self) -> float:
+        return max(self.ends) if self.ends else 0.0
+
+    def window(self, start: float, end: float) -> Tuple[int, int]:
+        """开始时间落在 [start, end] 内的字幕下标范围 [lo, hi)"""
+        return bisect_left(self.starts, start), bisect_right(self.starts, end)
+
+    def _build_prompt(self) -> None:
+        lines = []
+        offsets = array("I", [0])
+        position = 0
+        for index in range(len(self)):
+            line = f"[{self.starts[index]:.1f}s] {self.text_at(index)}\n"
+            lines.append(line)
+            position += len(line)
+            offsets.append(position)
+        self._prompt = "".join(lines)
+        self._prompt_offsets = offsets
+
+    def render(self, lo: int = 0, hi: Optional[int] = None, step: int = 1) -> str:
+        """把 [lo, hi) 渲染成提示词中的 "[12.3s] text" 行，step>1 时每step条取一条"""
+        if self._prompt is None:
+            self._build_prompt()
+        hi = len(self) if hi is None else min(hi, len(self))
+        if lo >= hi:
+            return ""
+        offsets = self._prompt_offsets
+        if step == 1:
+            return self._prompt[offsets[lo]:offsets[hi] - 1]
+        return "".join(
+            self._prompt[offsets[index]:offsets[index + 1]] for index in range(lo, hi, step)
+        )[:-1]
+
+    def render_window(self, start: float, end: float, limit: Optional[int] = None) -> str:
+        """渲染开始时间落在 [start, end] 内的字幕，最多 limit 条"""
+        lo, hi = self.window(start, end)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.render(lo, hi)
+
+    def to_bytes(self) -> bytes:
+        """紧凑的二进制序列化（缓存和数据库共用），时间精度为毫秒"""
+        lengths = array("I", (self.offsets[index + 1] - self.offsets[index] for index in range(len(self))))
+        body = b"".join((
+            _little_endian(array("I", (max(0, round(value * 1000)) for value in self.starts))),
+            _little_endian(array("I", (max(0, round(value * 1000)) for value in self.ends))),
+            _little_endian(lengths),
+            self.text.encode("utf-8"),
+        ))
+        return HEADER.pack(MAGIC, FORMAT_VERSION, len(self)) + zlib.compress(body, COMPRESS_LEVEL)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SubtitleTrack":
+        magic, version, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a subtitle track")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported subtitle track format version {version}")
+
+        body = zlib.decompress(data[HEADER.size:])
+        width = count * 4
+        starts = array("d", (value / 1000 for value in _from_little_endian("I", body[:width])))
+        ends = array("d", (value / 1000 for value in _from_little_endian("I", body[width:2 * width])))
+        lengths = _from_little_endian("I", body[2 * width:3 * width])
+        offsets = array("I", [0])
+        position = 0
+        for length in lengths:
+            position += length
+            offsets.append(position)
+        return cls(starts, ends, body[3 * width:].decode("utf-8"), offsets)
+
+
+# 列表形式的字幕按每条的平均字符数估算大小，不为了估算而构建轨道
+AVERAGE_CUE_CHARS = 40
+
+
+def text_size(subtitle_data: Dict[str, Any]) -> int:
+    """字幕文本大小的廉价估算（决定CPU步骤是否交给执行器）"""
+    subtitles = subtitle_data.get("subtitles")
+    if isinstance(subtitles, SubtitleTrack):
+        return len(subtitles.text)
+    return len(subtitles or []) * AVERAGE_CUE_CHARS
+
+
+def render_subtitles(subtitle_data: Dict[str, Any], step: int = 1) -> str:
+    """整轨渲染提示词；字幕仍是列表时轨道在调用方（执行器）中构建"""
+    return SubtitleTrack.of(subtitle_data).render(step=step)
+
+
+def with_track(subtitle_data: Dict[str, Any]) -> Dict[str, Any]:
+    """把字幕数据中的列表换成轨道（已经是轨道时原样返回）"""
+    if isinstance(subtitle_data.get("subtitles"), SubtitleTrack):
+        return subtitle_data
+    return {**subtitle_data, "subtitles": SubtitleTrack.of(subtitle_data)}
+
+
+def split_columns(subtitle_data: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+    """拆成数据库的两列：subtitles（只含元数据的JSONB）和 subtitle_track（二进制轨道）"""
+    metadata = {key: value for key, value in subtitle_data.items() if key != "subtitles"}
+    return metadata, SubtitleTrack.of(subtitle_data).to_bytes()
+
+
+def from_columns(subtitles: Optional[Dict[str, Any]], track: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """
+    由数据库的两列还原字幕数据
+
+    subtitle_track 为空的旧行，subtitles 列中仍是完整的字幕列表。
+    """
+    if not subtitles and not track:
+        return None
+    subtitle_data = dict(subtitles or {})
+    if track:
+        subtitle_data["subtitles"] = SubtitleTrack.from_bytes(bytes(track))
+        return subtitle_data
+    return with_track(subtitle_data)
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from app.utils.cache import CacheKeys, _redis_backend
+from app.utils.cache_backend import ShardedBackend
+from app.utils.hash_ring import HashRing, hash64
+
+
+def sample_keys(count: int) -> list:
+    """模拟字幕缓存key"""
+    return [CacheKeys.video_subtitle(f"youtube:{i:011d}") for i in range(count)]
+
+
+def owners(ring: HashRing, keys: list) -> list:
+    return [ring.lookup(key) for key in keys]
+
+
+def moved_ratio(before: list, after: list) -> float:
+    return sum(1 for a, b in zip(before, after) if a != b) / len(before)
+
+
+def print_distribution(ring: HashRing, keys: list) -> None:
+    counts = ring.distribution(keys)
+    mean = len(keys) / len(counts)
+    for node, count in counts.items():
+        print(f"  {node:<28} {count:>9} ({count / mean:6.1%} of mean)")
+    print(f"  stddev/mean: {statistics.pstdev(counts.values()) / mean:.2%}   max/mean: {max(counts.values()) / mean:.3f}")
+
+
+def offline_benchmark(node_count: int, virtual_nodes: int, key_count: int) -> None:
+    """只计算路由，不访问Redis：负载分布与增删节点时的key迁移比例"""
+    nodes = [f"redis://node{i}:6379/0" for i in range(node_count)]
+    keys = sample_keys(key_count)
+
+    ring = HashRing(nodes, virtual_nodes)
+    print(f"== {node_count} nodes x {virtual_nodes} virtual nodes, {key_count} keys")
+    started = time.perf_counter()
+    before = owners(ring, keys)
+    elapsed = time.perf_counter() - started
+    print(f"lookup: {key_count / elapsed:,.0f} keys/s")
+    print_distribution(ring, keys)
+
+    lost = nodes[-1]
+    ring.remove(lost)
+    after_loss = owners(ring, keys)
+    stray = sum(1 for a, b in zip(before, after_loss) if a != b and a != lost)
+    print(f"\n-- remove {lost}")
+    print(f"  moved: {moved_ratio(before, after_loss):.2%} (ideal {1 / node_count:.2%}), "
+          f"moved from surviving nodes: {stray}")
+
+    ring.add(lost)
+    extra = f"redis://node{node_count}:6379/0"
+    ring.add(extra)
+    after_add = owners(ring, keys)
+    print(f"-- add {extra}")
+    print(f"  moved: {moved_ratio(before, after_add):.2%} (ideal {1 / (node_count + 1):.2%})")
+
+    modulo_before = [hash64(key) % node_count for key in keys]
+    modulo_after = [hash64(key) % (node_count - 1) for key in keys]
+    print(f"-- modulo hashing, remove one node")
+    print(f"  moved: {moved_ratio(modulo_before, modulo_after):.2%}")
+
+    print(f"\n-- max/mean load by virtual node count")
+    for replicas in (1, 10, 40, 160, 640):
+        counts = HashRing(nodes, replicas).distribution(keys[:20000])
+        mean = 20000 / node_count
+        print(f"  {replicas:>4} vnodes: {max(counts.values()) / mean:.3f}")
+
+
+async def live_benchmark(urls: list, virtual_nodes: int, key_count: int) -> None:
+    """对真实Redis节点写入、读取，并模拟一个节点下线"""
+    backend = ShardedBackend(
+        {url: _redis_backend(url) for url in urls},
+        virtual_nodes=virtual_nodes,
+        failure_threshold=3,
+        probe_interval=1.0,
+        flush_on_rejoin=False
+    )
+    keys = sample_keys(key_count)
+    batch = 500
+
+    async def write_all() -> float:
+        started = time.perf_counter()
+        for offset in range(0, key_count, batch):
+            async with backend.pipeline() as pipe:
+                for key in keys[offset:offset + batch]:
+                    pipe.setex(key, 600, b"x")
+                await pipe.execute()
+        return time.perf_counter() - started
+
+    async def hit_ratio() -> tuple:
+        started = time.perf_counter()
+        hits = 0
+        for offset in range(0, key_count, batch):
+            values = await backend.mget(keys[offset:offset + batch])
+            hits += sum(1 for value in values if value is not None)
+        return hits / key_count, time.perf_counter() - started
+
+    try:
+        elapsed = await write_all()
+        print(f"== live: {len(urls)} nodes, {key_count} keys")
+        print(f"write: {key_count / elapsed:,.0f} keys/s")
+        ratio, elapsed = await hit_ratio()
+        print(f"read:  {key_count / elapsed:,.0f} keys/s, hit ratio {ratio:.2%}")
+
+        lost = urls[-1]
+        backend.down.add(lost)
+        ratio, _ = await hit_ratio()
+        print(f"-- {lost} marked down: hit ratio {ratio:.2%} (ideal {1 - 1 / len(urls):.2%})")
+
+        backend.down.discard(lost)
+        ratio, _ = await hit_ratio()
+        print(f"-- {lost} rejoined: hit ratio {ratio:.2%}")
+        await backend.delete(*keys)
+    finally:
+        await backend.close()
+
+
+def main():
+    """一致性哈希分片的负载分布与再平衡基准测试"""
+    parser = argparse.ArgumentParser(description="Redis分片路由与节点增删时的key迁移基准测试")
+    parser.add_argument("--nodes", type=int, default=4, help="离线模式的节点数")
+    parser.add_argument("--vnodes", type=int, default=160, help="每个节点的虚拟节点数")
+    parser.add_argument("--keys", type=int, default=100000, help="测试key数量")
+    parser.add_argument("--redis", nargs="+", metavar="URL",
+                        help="在这些真实Redis节点上测试，例如 redis://localhost:7001/0 redis://localhost:7002/0")
+    args = parser.parse_args()
+
+    if args.redis:
+        if len(args.redis) < 2:
+            print("❌ 至少需要两个Redis节点")
+            sys.exit(1)
+        asyncio.run(live_benchmark(args.redis, args.vnodes, args.keys))
+    else:
+        offline_benchmark(args.nodes, args.vnodes, args.keys)
+
+
+if __name__ == "__main__":
+    main()
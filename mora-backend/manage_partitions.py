@@ -0,0 +1,31 @@
+import argparse
+import logging
+import sys
+
+from app.services.partition_manager import partition_manager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def main():
+    """sessions分区维护（建议通过cron每天执行一次）"""
+    parser = argparse.ArgumentParser(description="预建未来分区，归档并删除过期分区")
+    parser.add_argument("--dry-run", action="store_true", help="只打印将要过期的分区，不做修改")
+    args = parser.parse_args()
+
+    try:
+        result = partition_manager.run_maintenance(dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ 分区维护失败: {e}")
+        sys.exit(1)
+
+    print(f"✅ 新建分区: {', '.join(result['created']) or '无'}")
+    label = "将过期分区" if args.dry_run else "已归档/删除分区"
+    print(f"✅ {label}: {', '.join(result['expired']) or '无'}")
+
+
+if __name__ == "__main__":
+    main()
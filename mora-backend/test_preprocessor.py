@@ -0,0 +1,39 @@
+from app.services.subtitle_preprocessor import _clean
+
+
+def test_code_like_text_is_preserved():
+    """编程字幕中的下标、调用和标识符不能被当作噪声或语气词删掉"""
+    samples = [
+        "print(a[0]) and list[1]",
+        "arr[i] = arr[j]",
+        "使用 f(x) 函数",
+        "if err != nil return err",
+        "那个变量叫做 count",
+        "就是说明文档里写的",
+        "额外的参数 (可选)",
+        "um.value 和 hmm_count",
+    ]
+    for text in samples:
+        assert _clean(text) == text, f"{text!r} -> {_clean(text)!r}"
+
+
+def test_noise_and_fillers_are_removed():
+    """真正的ASR标注和独立的语气词仍然会被清理"""
+    cases = {
+        "[音乐]": "",
+        "(Applause) welcome back": "welcome back",
+        "【掌声】大家好": "大家好",
+        "嗯，我们开始": "我们开始",
+        "那个，这里要注意": "这里要注意",
+        "就是说 列表是可变的": "列表是可变的",
+        "um, so the loop ends": "so the loop ends",
+        "the loop uh ends": "the loop ends",
+    }
+    for text, expected in cases.items():
+        assert _clean(text) == expected, f"{text!r} -> {_clean(text)!r}"
+
+
+if __name__ == "__main__":
+    test_code_like_text_is_preserved()
+    test_noise_and_fillers_are_removed()
+    print("subtitle preprocessor OK")
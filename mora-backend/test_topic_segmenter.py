@@ -0,0 +1,49 @@
+import random
+
+from app.services.topic_segmenter import topic_segmenter
+
+COMMON = "we now function call value code example line write run print result return variable 我们 这里 代码".split()
+TOPICS = {
+    "decorators": "decorator wraps functools closure wrapper inner outer decorate args kwargs cache timer 装饰器 闭包".split(),
+    "pandas": "pandas dataframe groupby merge column index series csv join aggregate pivot iloc 数据框 分组".split(),
+    "asyncio": "asyncio await coroutine event loop task gather future sleep semaphore queue 协程 事件循环".split(),
+}
+CUE_SECONDS = 5
+
+
+def make_transcript(topics, cues_per_topic, seed=0):
+    """每个话题连续讲 cues_per_topic 条字幕，每条混入话题词和通用词"""
+    rng = random.Random(seed)
+    subtitles = []
+    for topic in topics:
+        for _ in range(cues_per_topic):
+            words = rng.choices(TOPICS[topic], k=6) + rng.choices(COMMON, k=4)
+            start = len(subtitles) * CUE_SECONDS
+            subtitles.append({"startTime": start, "endTime": start + CUE_SECONDS, "text": " ".join(words)})
+    return {"duration": len(subtitles) * CUE_SECONDS, "subtitles": subtitles}
+
+
+def boundaries(subtitle_data):
+    return [segment["startTime"] for segment in topic_segmenter.segment(subtitle_data)[1:]]
+
+
+def test_single_topic_has_no_internal_boundaries():
+    """只讲一个话题的视频不切分，不因相似度的小波动补足段数"""
+    for seed in range(5):
+        assert boundaries(make_transcript(["decorators"], 600, seed)) == [], seed
+
+
+def test_topic_shifts_are_found_exactly():
+    """两个话题恰好一个边界，三个话题恰好两个，边界就在话题切换处"""
+    for seed in range(5):
+        assert boundaries(make_transcript(["decorators", "pandas"], 120, seed)) == [600], seed
+        assert boundaries(make_transcript(["decorators", "pandas", "asyncio"], 120, seed)) == [600, 1200], seed
+
+
+if __name__ == "__main__":
+    if not topic_segmenter.available():
+        print("NumPy not installed, topic segmenter skipped")
+    else:
+        test_single_topic_has_no_internal_boundaries()
+        test_topic_shifts_are_found_exactly()
+        print("topic segmenter OK")